@@ -0,0 +1,61 @@
+"""Parse/encode time per record for each JSON backend that is importable.
+
+Decodes a corpus of real-shaped CAD SNS messages and encodes the Slack payload
+rendered for each of them. Install orjson/ujson locally to compare them with
+the standard library:
+
+    python bench/bench_codec.py [--n 5000] [--repeat 5]
+"""
+import argparse
+import os
+import sys
+import timeit
+
+sys.path[:0] = [os.path.dirname(__file__), os.path.join(os.path.dirname(__file__), "..", "lambda")]
+os.environ.setdefault("DEDUPE_BACKEND", "none")
+
+import codec  # noqa: E402
+import corpus  # noqa: E402
+import main as notifier  # noqa: E402
+from anomaly import normalize  # noqa: E402
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--n", type=int, default=5000, help="messages in the corpus")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    bodies = corpus.messages(args.n)
+    payloads = []
+    for body in bodies:
+        raw = notifier._parse_message(body)
+        payloads.append(notifier._build_payload(normalize(raw) if raw else None, body))
+
+    print(f"{'backend':<8} {'parse us/rec':>13} {'encode us/rec':>14}")
+    for name in ("json", "ujson", "orjson"):
+        try:
+            c = codec.get_codec(name)
+        except ImportError:
+            print(f"{name:<8} {'not installed':>13}")
+            continue
+
+        def parse(loads=c.loads):
+            for body in bodies:
+                try:
+                    loads(body)
+                except ValueError:
+                    pass
+
+        def encode(dumps_bytes=c.dumps_bytes):
+            for payload in payloads:
+                dumps_bytes(payload)
+
+        t_parse = min(timeit.repeat(parse, number=1, repeat=args.repeat)) / len(bodies)
+        t_encode = min(timeit.repeat(encode, number=1, repeat=args.repeat)) / len(payloads)
+        print(f"{name:<8} {t_parse * 1e6:13.2f} {t_encode * 1e6:14.2f}")
+    print(f"selected backend: {codec.BACKEND}")
+
+
+if __name__ == "__main__":
+    main()
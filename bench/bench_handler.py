@@ -0,0 +1,160 @@
+"""Throughput and per-stage latency of the notifier handler against local sink stand-ins.
+
+Generates synthetic CAD notifications (TitleCase SNS-direct, camelCase
+EventBridge `detail` and malformed messages), invokes `main.handler` with them
+and reports records/sec plus p50/p95/p99 for each stage:
+
+    parse   SNS message -> normalized Anomaly (_parse_message + normalize)
+    render  Anomaly -> sink payload (_build_sink_payload)
+    post    destination round trip (_post)
+
+Run from the repository root, e.g.
+
+    python bench/bench_handler.py --events 50 --records 20 --latency-ms 40 --workers 4
+    python bench/bench_handler.py --error-rate 0.05 --rate-limit-rate 0.05
+    python bench/bench_handler.py --sinks slack,slack_api,teams,webhook,pagerduty
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import threading
+import time
+from typing import Callable, Dict, List
+
+sys.path[:0] = [os.path.dirname(__file__), os.path.join(os.path.dirname(__file__), "..", "lambda")]
+
+import corpus  # noqa: E402
+from slack_stub import SlackStub  # noqa: E402
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    if not samples:
+        return float("nan")
+    ordered = sorted(samples)
+    rank = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[rank]
+
+
+class StageTimer:
+    """Wraps module functions so every call's duration is recorded under a stage name."""
+
+    def __init__(self) -> None:
+        self.samples: Dict[str, List[float]] = {}
+        self._lock = threading.Lock()
+
+    def wrap(self, module, attr: str, stage: str) -> None:
+        fn: Callable = getattr(module, attr)
+
+        def timed(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - started
+                with self._lock:
+                    self.samples.setdefault(stage, []).append(elapsed)
+
+        setattr(module, attr, timed)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--events", type=int, default=50, help="handler invocations")
+    parser.add_argument("--records", type=int, default=10, help="records per invocation")
+    parser.add_argument("--malformed-ratio", type=float, default=0.05)
+    parser.add_argument("--workers", type=int, default=4, help="DELIVERY_WORKERS")
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="stand-in response latency")
+    parser.add_argument("--jitter-ms", type=float, default=5.0)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction answered with 500")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="fraction answered with 429")
+    parser.add_argument("--digest", action="store_true", help="DIGEST_MODE: pack records into digest messages")
+    parser.add_argument("--rate", type=float, default=0.0,
+                        help="SLACK_RATE_PER_SECOND per webhook (0 = unlimited)")
+    parser.add_argument("--burst", type=float, default=4.0, help="SLACK_BURST")
+    parser.add_argument("--retries", type=int, default=3, help="SLACK_MAX_RETRIES")
+    parser.add_argument("--retry-after", type=int, default=1, help="Retry-After seconds sent with 429s")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--sinks", default="slack",
+                        help="comma-separated stand-ins every record is delivered to: slack, slack_api, teams, webhook, pagerduty")
+    parser.add_argument("--show-logs", action="store_true", help="print the handler's log lines")
+    args = parser.parse_args()
+
+    stubs = [
+        SlackStub(args.latency_ms, args.jitter_ms, args.error_rate, args.rate_limit_rate,
+                  retry_after=args.retry_after, seed=args.seed + n, kind=kind.strip()).start()
+        for n, kind in enumerate(args.sinks.split(","))
+    ]
+    destinations = [stub.destination for stub in stubs]
+    os.environ.update({
+        "SLACK_WEBHOOK_URL": destinations[0],
+        # One catch-all route fans every record out to all stand-ins
+        "ROUTING_TABLE": json.dumps([{"webhook_urls": destinations}]) if len(stubs) > 1 else "",
+        "PAGERDUTY_EVENTS_URL": next((s.url for s in stubs if s.kind == "pagerduty"), ""),
+        "SLACK_API_URL": next((s.url for s in stubs if s.kind == "slack_api"), ""),
+        "SLACK_BOT_TOKEN": "xoxb-bench" if any(s.kind == "slack_api" for s in stubs) else "",
+        "DELIVERY_WORKERS": str(args.workers),
+        "DEDUPE_BACKEND": "none",
+        "LOG_LEVEL": "ERROR",
+        "DIGEST_MODE": "true" if args.digest else "false",
+        "SLACK_RATE_PER_SECOND": str(args.rate),
+        "SLACK_BURST": str(args.burst),
+        "SLACK_MAX_RETRIES": str(args.retries),
+    })
+    import main as notifier  # configured from the environment at import time
+
+    timer = StageTimer()
+    timer.wrap(notifier, "_parse_message", "parse")
+    timer.wrap(notifier, "normalize", "normalize")
+    timer.wrap(notifier, "_build_sink_payload", "render")
+    timer.wrap(notifier, "_post", "post")
+
+    bodies = corpus.messages(args.events * args.records, seed=args.seed, malformed_ratio=args.malformed_ratio)
+    events = [corpus.sns_event(bodies[i:i + args.records]) for i in range(0, len(bodies), args.records)]
+
+    invocation_times = []
+    failed_invocations = 0
+    started = time.perf_counter()
+    for event in events:
+        sink = contextlib.ExitStack()
+        if not args.show_logs:
+            # Log and EMF metric lines are still produced (their cost is measured), just not shown
+            sink.enter_context(contextlib.redirect_stdout(io.StringIO()))
+            sink.enter_context(contextlib.redirect_stderr(io.StringIO()))
+        t0 = time.perf_counter()
+        try:
+            with sink:
+                notifier.handler(event, None)
+        except Exception:
+            failed_invocations += 1
+        invocation_times.append(time.perf_counter() - t0)
+    wall = time.perf_counter() - started
+    for stub in stubs:
+        stub.stop()
+
+    # parse covers JSON decoding and normalization together
+    parse = timer.samples.get("parse", [])
+    normalize = timer.samples.get("normalize", [])
+    timer.samples["parse"] = [p + n for p, n in zip(parse, normalize + [0.0] * (len(parse) - len(normalize)))]
+    timer.samples.pop("normalize", None)
+    timer.samples["invocation"] = invocation_times
+
+    print(f"records: {len(bodies)} in {len(events)} invocations, workers={args.workers}, "
+          f"stand-in latency={args.latency_ms}±{args.jitter_ms} ms")
+    print(f"throughput: {len(bodies) / wall:,.1f} records/s ({wall:.2f} s wall)")
+    for stub in stubs:
+        print(f"{stub.kind} calls: {sum(stub.status_counts.values())}, "
+              f"stand-in responses: {dict(sorted(stub.status_counts.items()))}"
+              + (f", methods: {stub.methods}" if stub.methods else ""))
+    print(f"failed invocations: {failed_invocations}")
+    print(f"{'stage':<11} {'count':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for stage in ("parse", "render", "post", "invocation"):
+        samples = timer.samples.get(stage, [])
+        print(f"{stage:<11} {len(samples):>7} "
+              + " ".join(f"{percentile(samples, p) * 1000:9.3f}" for p in (50, 95, 99)))
+
+
+if __name__ == "__main__":
+    main()
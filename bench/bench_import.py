@@ -0,0 +1,74 @@
+"""Cold-start import cost of the handler module, with a budget check.
+
+Runs `python -X importtime -c "import main"` in fresh interpreters (best of
+--runs), prints the heaviest imports pulled in by main.py and exits with
+status 1 when main's cumulative import time exceeds --budget-ms. Numbers are
+machine-dependent: calibrate the budget on the machine that runs the check.
+
+    python bench/bench_import.py [--budget-ms 100] [--runs 7] [--top 12]
+"""
+import argparse
+import os
+import subprocess
+import sys
+from typing import List, Tuple
+
+LAMBDA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "lambda")
+
+
+def measure() -> Tuple[int, List[Tuple[int, int, str]]]:
+    """Return (main cumulative us, [(cumulative us, self us, module)] for main's direct imports)."""
+    env = dict(
+        os.environ,
+        SLACK_WEBHOOK_URL="https://hooks.slack.com/services/T000/B000/XXXX",
+        WARMUP_ON_INIT="false",
+        PYTHONDONTWRITEBYTECODE="1",
+    )
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        cwd=LAMBDA_DIR, env=env, capture_output=True, text=True, check=True,
+    )
+    children = []
+    total = 0
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        if not self_us.strip().isdigit():
+            continue  # header line
+        depth = (len(name) - len(name.lstrip())) // 2
+        if depth == 0:
+            # Children are printed before their parent: keep only main's block
+            if name.strip() == "main":
+                total = int(cumulative_us)
+                break
+            children = []
+        elif depth == 1:
+            children.append((int(cumulative_us), int(self_us), name.strip()))
+    return total, children
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--budget-ms", type=float, default=100.0)
+    parser.add_argument("--runs", type=int, default=7)
+    parser.add_argument("--top", type=int, default=12)
+    args = parser.parse_args()
+
+    best_total, best_children = None, []
+    for _ in range(args.runs):
+        total, children = measure()
+        if best_total is None or total < best_total:
+            best_total, best_children = total, children
+
+    print(f"{'cumulative ms':>13} {'self ms':>8}  module (direct imports of main)")
+    for cumulative, self_us, name in sorted(best_children, reverse=True)[: args.top]:
+        print(f"{cumulative / 1000:13.2f} {self_us / 1000:8.2f}  {name}")
+    print(f"main: {best_total / 1000:.2f} ms (best of {args.runs}), budget {args.budget_ms:.0f} ms")
+    if best_total / 1000 > args.budget_ms:
+        print("FAIL: import time budget exceeded", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
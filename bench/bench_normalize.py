@@ -0,0 +1,88 @@
+"""Per-anomaly parse cost: legacy key-path probing vs the one-pass normalizer.
+
+The legacy side replays the lookups the renderer used to make against the raw
+dict (`_get_any`/`_safe_get` for every field, RootCauses and TotalImpact read
+several times). Run from the repository root:
+
+    python bench/bench_normalize.py [--n 20000] [--repeat 5]
+"""
+import argparse
+import json
+import os
+import sys
+import timeit
+
+sys.path[:0] = [os.path.dirname(__file__), os.path.join(os.path.dirname(__file__), "..", "lambda")]
+
+import corpus  # noqa: E402
+from anomaly import normalize  # noqa: E402
+
+
+def _safe_get(d, path, default=None):
+    cur = d
+    try:
+        for k in path:
+            if cur is None:
+                return default
+            cur = cur.get(k)
+        return cur if cur is not None else default
+    except Exception:
+        return default
+
+
+def _get_any(d, paths, default=None):
+    for p in paths:
+        val = _safe_get(d, p, None)
+        if val is not None:
+            return val
+    return default
+
+
+def legacy_extract(a):
+    """The field lookups _build_payload/_build_blocks_for_anomaly/_get_account_info performed."""
+    _get_any(a, [["AnomalyId"], ["anomalyId"]])
+    _get_any(a, [["Impact", "TotalImpact"], ["impact", "totalImpact"]])
+    _get_any(a, [["Impact", "TotalImpact"], ["impact", "totalImpact"]])
+    _get_any(a, [["Impact", "TotalImpactPercentage"], ["impact", "totalImpactPercentage"]])
+    _get_any(a, [["AnomalyStartDate"], ["anomalyStartDate"]])
+    _get_any(a, [["AnomalyEndDate"], ["anomalyEndDate"]])
+    rcs = _get_any(a, [["RootCauses"], ["rootCauses"]], []) or []
+    if rcs and isinstance(rcs, list):
+        rc = rcs[0] or {}
+        for key in ("Service", "LinkedAccount", "Region", "UsageType"):
+            _get_any(rc, [[key], [key[0].lower() + key[1:]]])
+    _get_any(a, [["AnomalyId"], ["anomalyId"]])
+    rcs = _get_any(a, [["RootCauses"], ["rootCauses"]], []) or []
+    if rcs and isinstance(rcs, list):
+        rc = rcs[0] or {}
+        _get_any(rc, [["LinkedAccount"], ["linkedAccount"]])
+        _get_any(rc, [["LinkedAccountName"], ["linkedAccountName"]])
+    _get_any(a, [["anomalyDetailsLink"], ["AnomalyDetailsLink"]], "")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--n", type=int, default=20000, help="anomalies in the corpus")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    anomalies = []
+    for body in corpus.messages(args.n, malformed_ratio=0.0):
+        parsed = json.loads(body)
+        anomalies.append(parsed.get("detail", parsed))
+
+    def run_legacy():
+        for a in anomalies:
+            legacy_extract(a)
+
+    def run_normalize():
+        for a in anomalies:
+            normalize(a)
+
+    for name, fn in (("legacy _get_any probes", run_legacy), ("normalize()", run_normalize)):
+        best = min(timeit.repeat(fn, number=1, repeat=args.repeat))
+        print(f"{name:<24} {best / len(anomalies) * 1e6:8.2f} us/anomaly")
+
+
+if __name__ == "__main__":
+    main()
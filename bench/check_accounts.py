@@ -0,0 +1,99 @@
+"""Check the account directory (lambda/accounts.py) against a local Organizations stub.
+
+Runs the real boto3 loaders against bench/organizations_stub.py and verifies
+that lookups are memory hits, that the /tmp copy spares a new container the
+API call, that names are reloaded once the TTL expires, that an unavailable
+API keeps the last known names, and that accounts missing from the list are
+shown by ID and resolved with DescribeAccount by the next ensure_fresh(),
+falling back to the raw account ID when that fails.
+Exits with status 1 on the first failed check. Needs boto3.
+
+    python bench/check_accounts.py
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "lambda"))
+# The stub ignores credentials
+for name, value in (("AWS_ACCESS_KEY_ID", "stub"), ("AWS_SECRET_ACCESS_KEY", "stub"),
+                    ("AWS_DEFAULT_REGION", "us-east-1")):
+    os.environ.setdefault(name, value)
+
+import accounts  # noqa: E402
+import sinks  # noqa: E402
+from organizations_stub import OrganizationsStub  # noqa: E402
+
+ACCOUNTS = {f"1111111111{i:02d}": f"team-{i}" for i in range(5)}
+
+
+def check(condition: bool, what: str) -> None:
+    print(f"{'ok  ' if condition else 'FAIL'} {what}")
+    if not condition:
+        sys.exit(1)
+
+
+def directory(stub: OrganizationsStub, cache_path: str, ttl: float) -> accounts.AccountDirectory:
+    return accounts.AccountDirectory(
+        accounts.organizations_loader(stub.url),
+        cache_path=cache_path,
+        ttl=ttl,
+        retry_after=60,
+        describe=accounts.organizations_describer(stub.url),
+    )
+
+
+def main() -> None:
+    cache_path = os.path.join(tempfile.mkdtemp(), "accounts.json")
+    with OrganizationsStub(ACCOUNTS, page_size=2) as stub:
+        names = directory(stub, cache_path, ttl=0.5)
+        names.ensure_fresh()
+        check(len(names) == 5 and stub.calls.get("ListAccounts") == 3, "ListAccounts paged through once")
+        for _ in range(100):
+            names.name("111111111103")
+        names.ensure_fresh()
+        check(names.name("111111111103") == "team-3" and stub.calls.get("ListAccounts") == 3,
+              "lookups and fresh ensure_fresh() calls are memory hits")
+
+        cold = directory(stub, cache_path, ttl=0.5)
+        cold.ensure_fresh()
+        check(cold.name("111111111100") == "team-0" and cold.stats["file_loads"] == 1
+              and stub.calls.get("ListAccounts") == 3, "a new container loads the /tmp copy, not the API")
+
+        stub.accounts["111111111199"] = "team-new"
+        time.sleep(0.6)
+        names.ensure_fresh()
+        check(names.name("111111111199") == "team-new" and stub.calls.get("ListAccounts") == 6,
+              "names are reloaded once the TTL expires")
+
+        stub.fail.add("ListAccounts")
+        time.sleep(0.6)
+        names.ensure_fresh()
+        names.ensure_fresh()
+        check(names.name("111111111101") == "team-1" and names.stats["api_errors"] == 1,
+              "an unavailable API keeps the cached names and delays the retry")
+
+        stub.accounts["222222222222"] = "joined-later"
+        check(names.name("222222222222") is None and stub.calls.get("DescribeAccount") is None,
+              "an account missing from the list is shown by ID without an API call")
+        names.ensure_fresh()
+        check(names.name("222222222222") == "joined-later" and stub.calls.get("DescribeAccount") == 1,
+              "the next ensure_fresh() resolves it with DescribeAccount")
+        names.ensure_fresh()
+        check(stub.calls.get("DescribeAccount") == 1, "the described name is remembered")
+
+        stub.fail.add("DescribeAccount")
+        missing = names.name("333333333333")
+        names.ensure_fresh()
+        names.name("333333333333")
+        names.ensure_fresh()
+        facts = sinks.Facts("HIGH", 0, "333333333333", missing, "https://console")
+        check(missing is None and sinks._account(facts) == "Account: 333333333333"
+              and stub.calls.get("DescribeAccount") == 2 and names.stats["describe_errors"] == 1,
+              "a failed DescribeAccount falls back to the raw account ID, asked once")
+    print("all checks passed")
+
+
+if __name__ == "__main__":
+    main()
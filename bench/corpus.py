@@ -0,0 +1,113 @@
+"""Synthetic Cost Anomaly Detection messages shaped like real notifications.
+
+Three shapes are produced: TitleCase anomalies as CAD publishes them to SNS,
+EventBridge events carrying a camelCase anomaly under `detail`, and malformed
+or plain-text messages that exercise the fallback path.
+"""
+import json
+import random
+from typing import Any, Dict, List, Optional
+
+SERVICES = [
+    "Amazon Elastic Compute Cloud - Compute",
+    "Amazon Simple Storage Service",
+    "Amazon Relational Database Service",
+    "AWS Lambda",
+    "Amazon CloudWatch",
+    "Amazon DynamoDB",
+    "AWS Data Transfer",
+]
+REGIONS = ["us-east-1", "us-west-2", "eu-west-1", "eu-central-1", "ap-southeast-2"]
+USAGE_TYPES = ["BoxUsage:m5.xlarge", "TimedStorage-ByteHrs", "DataTransfer-Out-Bytes",
+               "Request-Tier1", "InstanceUsage:db.r6g.large", "Lambda-GB-Second"]
+
+
+def _root_causes(rng: random.Random, camel: bool, n: int) -> List[Dict[str, Any]]:
+    out = []
+    for _ in range(n):
+        rc = {
+            "Service": rng.choice(SERVICES),
+            "Region": rng.choice(REGIONS),
+            "UsageType": rng.choice(USAGE_TYPES),
+            "LinkedAccount": str(rng.randrange(10**11, 10**12)),
+            "LinkedAccountName": rng.choice(["prod", "staging", "data", None]),
+        }
+        if rc["LinkedAccountName"] is None:
+            del rc["LinkedAccountName"]
+        if camel:
+            rc = {k[0].lower() + k[1:]: v for k, v in rc.items()}
+            rc["impact"] = {"contribution": round(rng.lognormvariate(2, 1.5), 2)}
+        else:
+            rc["Impact"] = {"Contribution": round(rng.lognormvariate(2, 1.5), 2)}
+        out.append(rc)
+    return out
+
+
+def anomaly(rng: random.Random, camel: bool = False, root_causes: Optional[int] = None) -> Dict[str, Any]:
+    """One anomaly dict; TitleCase keys unless `camel`."""
+    day = rng.randrange(1, 28)
+    impact = round(rng.lognormvariate(4, 1.2), 2)
+    a = {
+        "AccountId": str(rng.randrange(10**11, 10**12)),
+        "AnomalyDetailsLink": "https://console.aws.amazon.com/cost-management/home#/anomaly-detection/monitors/abc/anomalies/"
+        + str(rng.getrandbits(64)),
+        "AnomalyEndDate": f"2025-11-{day + 1:02d}T00:00:00Z",
+        "AnomalyId": f"{rng.getrandbits(128):032x}",
+        "AnomalyScore": {"CurrentScore": round(rng.random(), 3), "MaxScore": round(rng.random(), 3)},
+        "AnomalyStartDate": f"2025-11-{day:02d}T00:00:00Z",
+        "DimensionalValue": rng.choice(SERVICES),
+        "Impact": {
+            "MaxImpact": impact / 2,
+            "TotalActualSpend": impact * 3,
+            "TotalExpectedSpend": impact * 2,
+            "TotalImpact": impact,
+            "TotalImpactPercentage": round(rng.uniform(5, 400), 2),
+        },
+        "MonitorArn": "arn:aws:ce::123456789012:anomalymonitor/" + f"{rng.getrandbits(64):016x}",
+        "RootCauses": _root_causes(rng, camel, root_causes if root_causes is not None else rng.randrange(1, 4)),
+        "SubscriptionId": f"{rng.getrandbits(64):016x}",
+        "SubscriptionName": "finops-cad-subscription",
+    }
+    if camel:
+        a = {k[0].lower() + k[1:]: v for k, v in a.items()}
+        a["impact"] = {k[0].lower() + k[1:]: v for k, v in a["impact"].items()}
+        a["anomalyDetailsLink"] = a.pop("anomalyDetailsLink")
+    return a
+
+
+def message(rng: random.Random, malformed_ratio: float = 0.05) -> str:
+    """One SNS Message body: direct TitleCase, EventBridge camelCase, or malformed."""
+    roll = rng.random()
+    if roll < malformed_ratio:
+        return rng.choice([
+            "AWS Cost Anomaly Detection test notification",
+            '{"AnomalyId": ',
+            json.dumps({"unexpected": True}),
+        ])
+    if roll < 0.5:
+        return json.dumps(anomaly(rng))
+    return json.dumps({
+        "version": "0",
+        "id": f"{rng.getrandbits(128):032x}",
+        "detail-type": "Anomaly Detected",
+        "source": "aws.ce",
+        "detail": anomaly(rng, camel=True),
+    })
+
+
+def messages(n: int, seed: int = 7, malformed_ratio: float = 0.05) -> List[str]:
+    rng = random.Random(seed)
+    return [message(rng, malformed_ratio) for _ in range(n)]
+
+
+def sns_event(bodies: List[str]) -> Dict[str, Any]:
+    """Lambda event for an SNS subscription delivering `bodies`."""
+    return {
+        "Records": [
+            {
+                "EventSource": "aws:sns",
+                "Sns": {"MessageId": f"msg-{i}", "Message": body, "TopicArn": "arn:aws:sns:us-east-1:123456789012:cad"},
+            }
+            for i, body in enumerate(bodies)
+        ]
+    }
@@ -0,0 +1,101 @@
+"""Local HTTP server impersonating the AWS Organizations API.
+
+Speaks the AWS JSON 1.1 protocol boto3 uses for Organizations
+(`X-Amz-Target: AWSOrganizationsV20161128.<Operation>`), for ListAccounts
+(paginated by `page_size`, with NextToken) and DescribeAccount. Point
+ORGANIZATIONS_ENDPOINT_URL, or `endpoint_url` of the loaders in
+lambda/accounts.py, at `url`. `fail` makes the named operations answer 500
+(ServiceException), to see how the notifier behaves when the API is down.
+"""
+import http.server
+import json
+import threading
+from typing import Dict, Optional, Set
+
+_TARGET_PREFIX = "AWSOrganizationsV20161128."
+
+
+class OrganizationsStub:
+    def __init__(self, accounts: Optional[Dict[str, str]] = None, page_size: int = 20) -> None:
+        # Account ID -> name; DescribeAccount also answers for accounts added here later
+        self.accounts: Dict[str, str] = dict(accounts or {})
+        self.page_size = page_size
+        self.fail: Set[str] = set()
+        # Operation -> requests received
+        self.calls: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_port}"
+
+    @staticmethod
+    def _account(account_id: str, name: str) -> Dict[str, str]:
+        return {
+            "Id": account_id,
+            "Arn": f"arn:aws:organizations::000000000000:account/o-stub/{account_id}",
+            "Email": f"{account_id}@example.com",
+            "Name": name,
+            "Status": "ACTIVE",
+        }
+
+    def _answer(self, operation: str, request: Dict[str, str]):
+        with self._lock:
+            self.calls[operation] = self.calls.get(operation, 0) + 1
+            accounts = sorted(self.accounts.items())
+            failing = operation in self.fail
+        if failing:
+            return 500, {"__type": "ServiceException", "Message": "stub failure"}
+        if operation == "ListAccounts":
+            start = int(request.get("NextToken") or 0)
+            page = accounts[start:start + self.page_size]
+            reply = {"Accounts": [self._account(i, n) for i, n in page]}
+            if start + self.page_size < len(accounts):
+                reply["NextToken"] = str(start + self.page_size)
+            return 200, reply
+        if operation == "DescribeAccount":
+            account_id = request.get("AccountId", "")
+            if account_id not in self.accounts:
+                return 400, {"__type": "AccountNotFoundException", "Message": f"{account_id} not found"}
+            return 200, {"Account": self._account(account_id, self.accounts[account_id])}
+        return 400, {"__type": "UnknownOperationException", "Message": operation}
+
+    def _handler_class(self):
+        stub = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                operation = self.headers.get("X-Amz-Target", "").replace(_TARGET_PREFIX, "")
+                status, reply = stub._answer(operation, json.loads(body or b"{}"))
+                data = json.dumps(reply).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/x-amz-json-1.1")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def start(self) -> "OrganizationsStub":
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "OrganizationsStub":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
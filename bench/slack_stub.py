@@ -0,0 +1,141 @@
+"""Local HTTP server impersonating a Slack Incoming Webhook or another sink.
+
+`kind` selects what is impersonated: "slack" (200 "ok"), "slack_api"
+(chat.postMessage/chat.update replying {"ok": true, "ts": ...}; point
+SLACK_API_URL at `url`), "teams" (202, empty body, like Workflows webhooks),
+"webhook" (204) or "pagerduty" (202 with an Events API v2 JSON body; point
+PAGERDUTY_EVENTS_URL at `url`). `destination`
+is the string to configure in the notifier. Latency, 5xx errors and 429 rate
+limiting can be injected to see how the notifier behaves when the sink is slow
+or degraded.
+"""
+import http.server
+import json
+import random
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+# kind -> (success status, success body)
+_SUCCESS: Dict[str, Tuple[int, bytes]] = {
+    "slack": (200, b"ok"),
+    "slack_api": (200, b""),
+    "teams": (202, b""),
+    "webhook": (204, b""),
+    "pagerduty": (202, b'{"status":"success","message":"Event processed"}'),
+}
+_PATHS = {"slack": "/services/T000/B000/XXXX", "slack_api": "/api", "teams": "/workflows/XXXX/triggers/manual/run",
+          "webhook": "/hooks/cost-anomalies", "pagerduty": "/v2/enqueue"}
+
+
+class SlackStub:
+    def __init__(
+        self,
+        latency_ms: float = 0.0,
+        jitter_ms: float = 0.0,
+        error_rate: float = 0.0,
+        rate_limit_rate: float = 0.0,
+        retry_after: int = 1,
+        seed: Optional[int] = None,
+        kind: str = "slack",
+    ) -> None:
+        self.kind = kind
+        self.success = _SUCCESS[kind]
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after = retry_after
+        self.rng = random.Random(seed)
+        self.bodies: List[bytes] = []
+        # Web API method -> calls answered ok
+        self.methods: Dict[str, int] = {}
+        self._ts = 0
+        self.status_counts = {}
+        self._lock = threading.Lock()
+        self._server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_port}{_PATHS[self.kind]}"
+
+    @property
+    def destination(self) -> str:
+        if self.kind == "slack":
+            return self.url
+        if self.kind == "pagerduty":
+            return "pagerduty://R0UT1NGKEY0000000000000000000000"
+        if self.kind == "slack_api":
+            return "slack-api://C0STUB0000"
+        return f"{self.kind}+{self.url}"
+
+    def _decide(self):
+        with self._lock:
+            delay = max(0.0, self.latency_ms + self.rng.uniform(-self.jitter_ms, self.jitter_ms)) / 1000
+            roll = self.rng.random()
+        if roll < self.rate_limit_rate:
+            return delay, 429
+        if roll < self.rate_limit_rate + self.error_rate:
+            return delay, 500
+        return delay, self.success[0]
+
+    def _record(self, status: int, body: bytes) -> None:
+        with self._lock:
+            self.status_counts[status] = self.status_counts.get(status, 0) + 1
+            if status < 300:
+                self.bodies.append(body)
+
+    def _api_reply(self, path: str, body: bytes) -> bytes:
+        request = json.loads(body or b"{}")
+        method = path.rsplit("/", 1)[-1]
+        with self._lock:
+            self.methods[method] = self.methods.get(method, 0) + 1
+            self._ts += 1
+            ts = request.get("ts") if method == "chat.update" else f"1700000000.{self._ts:06d}"
+        return json.dumps({"ok": True, "channel": request.get("channel"), "ts": ts}).encode()
+
+    def _handler_class(self):
+        stub = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Reply promptly; Nagle + delayed ACK would add ~40 ms per request
+            disable_nagle_algorithm = True
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                delay, status = stub._decide()
+                if delay:
+                    time.sleep(delay)
+                stub._record(status, body)
+                reply = {429: b"rate_limited", 500: b"internal_error"}.get(status, stub.success[1])
+                if stub.kind == "slack_api" and status < 300:
+                    reply = stub._api_reply(self.path, body)
+                self.send_response(status)
+                if status == 429:
+                    self.send_header("Retry-After", str(stub.retry_after))
+                self.send_header("Content-Type", "application/json" if stub.kind in ("pagerduty", "slack_api") and status < 300 else "text/plain")
+                self.send_header("Content-Length", str(len(reply)))
+                self.end_headers()
+                self.wfile.write(reply)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def start(self) -> "SlackStub":
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "SlackStub":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
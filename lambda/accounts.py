@@ -0,0 +1,198 @@
+"""Linked-account names from AWS Organizations, cached across warm invocations.
+
+CAD rarely includes LinkedAccountName in root causes. The directory bulk-loads
+every account once via the paginated ListAccounts API into an in-memory dict
+(account ID -> name) and mirrors it to a JSON file in /tmp, so a new container
+on the same execution environment skips the API call. Refreshes happen at most
+once per TTL and only at the start of an invocation; per-anomaly lookups are
+always a dict hit. When the API is unavailable the last known names are kept
+and the next attempt is delayed.
+
+An account missing from the loaded list (e.g. created since the last load) is
+shown by its ID and noted; the next ensure_fresh() asks DescribeAccount about
+at most DESCRIBES_PER_REFRESH noted accounts, so later anomalies show its name.
+An account DescribeAccount fails for isn't asked about again for a while.
+"""
+import json
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+import log
+
+Loader = Callable[[], Dict[str, str]]
+Describer = Callable[[str], Optional[str]]
+
+# Bounds the API time ensure_fresh() can take from an invocation
+DESCRIBES_PER_REFRESH = 5
+
+
+def _client(endpoint_url: Optional[str]) -> Any:
+    import boto3  # provided by the Lambda runtime; only needed for this feature
+    from botocore.config import Config
+
+    # Short timeouts and no retries: a slow API must not eat the delivery budget
+    config = Config(connect_timeout=2, read_timeout=5, retries={"total_max_attempts": 1})
+    return boto3.client("organizations", endpoint_url=endpoint_url, config=config)
+
+
+def organizations_loader(endpoint_url: Optional[str] = None) -> Loader:
+    """Loader that pages through organizations:ListAccounts."""
+    def load() -> Dict[str, str]:
+        client = _client(endpoint_url)
+        names: Dict[str, str] = {}
+        for page in client.get_paginator("list_accounts").paginate():
+            for account in page.get("Accounts", []):
+                names[str(account["Id"])] = account.get("Name") or str(account["Id"])
+        return names
+
+    return load
+
+
+def organizations_describer(endpoint_url: Optional[str] = None) -> Describer:
+    """Name of one account via organizations:DescribeAccount."""
+    clients = []
+
+    def describe(account_id: str) -> Optional[str]:
+        if not clients:
+            clients.append(_client(endpoint_url))
+        account = clients[0].describe_account(AccountId=account_id).get("Account") or {}
+        return account.get("Name")
+
+    return describe
+
+
+class AccountDirectory:
+    """Account ID -> name, loaded by ListAccounts and looked up from memory only."""
+
+    def __init__(
+        self,
+        loader: Loader,
+        cache_path: Optional[str] = None,
+        ttl: float = 86400,
+        retry_after: float = 300,
+        describe: Optional[Describer] = None,
+    ) -> None:
+        self._loader = loader
+        self._describe = describe
+        self.cache_path = cache_path
+        self.ttl = ttl
+        self.retry_after = retry_after
+        self._names: Dict[str, str] = {}
+        self._fetched_at = 0.0
+        self._next_attempt = 0.0
+        # Account IDs looked up but missing, for DescribeAccount at the next refresh
+        self._missing: Dict[str, None] = {}
+        # Account ID -> when DescribeAccount may be asked about it again
+        self._unknown: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self.stats = {"api_loads": 0, "file_loads": 0, "api_errors": 0, "describes": 0, "describe_errors": 0}
+
+    def name(self, account_id: Optional[str]) -> Optional[str]:
+        """Name from memory only; a missing account is noted for the next ensure_fresh()."""
+        if not account_id:
+            return None
+        name = self._names.get(account_id)
+        if name is None and self._describe is not None and len(self._missing) < 1024:
+            self._missing[account_id] = None
+        return name
+
+    def _describe_missing(self, describe: Describer, now: float) -> None:
+        """Ask DescribeAccount about noted accounts; stops at the first failure (the API is likely down)."""
+        asked = 0
+        for account_id in list(self._missing):
+            if asked >= DESCRIBES_PER_REFRESH:
+                return
+            del self._missing[account_id]
+            if account_id in self._names or now < self._unknown.get(account_id, 0.0):
+                continue
+            asked += 1
+            try:
+                name = describe(account_id)
+            except Exception as e:
+                self.stats["describe_errors"] += 1
+                self._unknown[account_id] = now + self.retry_after
+                log.warning("DescribeAccount failed; showing the account ID", account_id=account_id, error=repr(e))
+                return
+            self.stats["describes"] += 1
+            if not name:
+                self._unknown[account_id] = now + self.retry_after
+                continue
+            # Copy-on-write: readers use self._names without the lock
+            self._names = dict(self._names, **{account_id: name})
+            self._write_file()
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def _read_file(self) -> bool:
+        if not self.cache_path:
+            return False
+        try:
+            with open(self.cache_path, encoding="utf-8") as f:
+                cached = json.load(f)
+            fetched_at = float(cached["fetched_at"])
+            names = dict(cached["accounts"])
+        except (OSError, ValueError, KeyError, TypeError):
+            return False
+        if fetched_at > self._fetched_at:
+            self._names, self._fetched_at = names, fetched_at
+            self.stats["file_loads"] += 1
+        return True
+
+    def _write_file(self) -> None:
+        if not self.cache_path:
+            return
+        tmp = f"{self.cache_path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"fetched_at": self._fetched_at, "accounts": self._names}, f)
+            os.replace(tmp, self.cache_path)
+        except OSError as e:
+            log.warning("Could not write account cache", path=self.cache_path, error=repr(e))
+
+    def ensure_fresh(self) -> None:
+        """Reload names if older than the TTL (/tmp copy first, then the API), then describe noted accounts.
+
+        Call it at the start of an invocation, never while rendering.
+        """
+        now = time.time()
+        if now - self._fetched_at >= self.ttl:
+            self._reload(now)
+        if self._missing and self._describe is not None:
+            with self._lock:
+                self._describe_missing(self._describe, now)
+
+    def _reload(self, now: float) -> None:
+        with self._lock:
+            if not self._names:
+                self._read_file()
+            if now - self._fetched_at < self.ttl or now < self._next_attempt:
+                return
+            try:
+                names = self._loader()
+            except Exception as e:
+                self.stats["api_errors"] += 1
+                self._next_attempt = now + self.retry_after
+                log.warning("Account name lookup unavailable; using cached names",
+                            error=repr(e), cached=len(self._names))
+                return
+            self._names, self._fetched_at = names, now
+            self._unknown.clear()
+            self.stats["api_loads"] += 1
+            self._write_file()
+            log.info("Loaded account names", accounts=len(names))
+
+
+def from_env() -> Optional[AccountDirectory]:
+    """Directory configured by ACCOUNT_NAMES* variables; None when disabled."""
+    if os.environ.get("ACCOUNT_NAMES", "false").strip().lower() not in ("1", "true", "yes", "on"):
+        return None
+    endpoint_url = os.environ.get("ORGANIZATIONS_ENDPOINT_URL") or None
+    return AccountDirectory(
+        organizations_loader(endpoint_url),
+        cache_path=os.environ.get("ACCOUNT_NAMES_CACHE_PATH", "/tmp/cad-account-names.json"),
+        ttl=log.env_float("ACCOUNT_NAMES_TTL_SECONDS", 86400.0),
+        describe=organizations_describer(endpoint_url),
+    )
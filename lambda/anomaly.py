@@ -0,0 +1,143 @@
+"""Normalized, typed view of a Cost Anomaly Detection payload.
+
+CAD sends TitleCase keys when publishing to SNS directly and camelCase keys in
+EventBridge `detail` objects. `normalize` resolves both spellings once per
+anomaly so that rendering, routing and dedupe read plain attributes instead of
+re-probing key paths on the raw dict.
+
+The records are plain `__slots__` classes treated as read-only once built.
+They are neither frozen (frozen construction costs roughly a third of the
+normalization time, see bench/bench_normalize.py) nor dataclasses (importing
+`dataclasses` pulls in `inspect`, which shows up in cold starts).
+"""
+import heapq
+from typing import Any, Dict, Optional, Tuple
+
+
+class _Record:
+    __slots__ = ()
+
+    def __repr__(self) -> str:
+        fields = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.__slots__)
+        return f"{type(self).__name__}({fields})"
+
+    def __eq__(self, other: object) -> bool:
+        if type(other) is not type(self):
+            return NotImplemented
+        return all(getattr(self, n) == getattr(other, n) for n in self.__slots__)
+
+
+class RootCause(_Record):
+    __slots__ = (
+        "service", "region", "usage_type", "linked_account", "linked_account_name", "contribution",
+    )
+
+    def __init__(
+        self,
+        service: Optional[str] = None,
+        region: Optional[str] = None,
+        usage_type: Optional[str] = None,
+        linked_account: Optional[str] = None,
+        linked_account_name: Optional[str] = None,
+        contribution: Optional[float] = None,
+    ) -> None:
+        self.service = service
+        self.region = region
+        self.usage_type = usage_type
+        self.linked_account = linked_account
+        self.linked_account_name = linked_account_name
+        # USD share of the total impact attributed to this root cause, when CAD sends it
+        self.contribution = contribution
+
+
+class Anomaly(_Record):
+    __slots__ = (
+        "anomaly_id", "total_impact", "total_impact_pct", "start_date", "end_date",
+        "details_link", "root_causes",
+    )
+
+    def __init__(
+        self,
+        anomaly_id: Optional[str] = None,
+        total_impact: Optional[float] = None,
+        total_impact_pct: Optional[float] = None,
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None,
+        details_link: Optional[str] = None,
+        root_causes: Tuple[RootCause, ...] = (),
+    ) -> None:
+        self.anomaly_id = anomaly_id
+        self.total_impact = total_impact
+        self.total_impact_pct = total_impact_pct
+        self.start_date = start_date
+        self.end_date = end_date
+        self.details_link = details_link
+        self.root_causes = root_causes
+
+    def top_root_causes(self, n: int) -> Tuple[RootCause, ...]:
+        """The `n` root causes contributing most, largest first.
+
+        Root causes without a contribution rank after those with one; ties keep
+        CAD's order. Uses a bounded heap, so long lists cost O(len * log n).
+        """
+        causes = self.root_causes
+        if len(causes) <= 1 or n <= 0:
+            return causes[:max(n, 0)]
+        ranked = heapq.nsmallest(n, range(len(causes)), key=lambda i: _rank(causes[i], i))
+        return tuple(causes[i] for i in ranked)
+
+    @property
+    def top_root_cause(self) -> Optional[RootCause]:
+        top = self.top_root_causes(1)
+        return top[0] if top else None
+
+
+def _rank(rc: RootCause, position: int) -> Tuple[int, float, int]:
+    if rc.contribution is None:
+        return (1, 0.0, position)
+    return (0, -rc.contribution, position)
+
+
+def _pick(d: Any, title: str, camel: str) -> Any:
+    """Value under the TitleCase key, else the camelCase key; None if d isn't a dict."""
+    if not isinstance(d, dict):
+        return None
+    val = d.get(title)
+    return val if val is not None else d.get(camel)
+
+
+def _number(val: Any) -> Optional[float]:
+    return val if isinstance(val, (int, float)) else None
+
+
+def _root_cause(rc: Any) -> RootCause:
+    if not isinstance(rc, dict):
+        return RootCause()
+    account = _pick(rc, "LinkedAccount", "linkedAccount")
+    impact = _pick(rc, "Impact", "impact")
+    return RootCause(
+        service=_pick(rc, "Service", "service"),
+        region=_pick(rc, "Region", "region"),
+        usage_type=_pick(rc, "UsageType", "usageType"),
+        linked_account=str(account).strip() if account else None,
+        linked_account_name=_pick(rc, "LinkedAccountName", "linkedAccountName"),
+        contribution=_number(_pick(impact, "Contribution", "contribution")),
+    )
+
+
+def normalize(raw: Dict[str, Any]) -> Anomaly:
+    """Convert a raw CAD anomaly dict (either key casing) into an `Anomaly`."""
+    impact = _pick(raw, "Impact", "impact")
+    root_causes = _pick(raw, "RootCauses", "rootCauses")
+    anomaly_id = _pick(raw, "AnomalyId", "anomalyId")
+    return Anomaly(
+        anomaly_id=str(anomaly_id) if anomaly_id else None,
+        total_impact=_number(_pick(impact, "TotalImpact", "totalImpact")),
+        total_impact_pct=_number(_pick(impact, "TotalImpactPercentage", "totalImpactPercentage")),
+        start_date=_pick(raw, "AnomalyStartDate", "anomalyStartDate"),
+        end_date=_pick(raw, "AnomalyEndDate", "anomalyEndDate"),
+        # EventBridge uses camelCase for the link, so it is preferred here
+        details_link=_pick(raw, "anomalyDetailsLink", "AnomalyDetailsLink"),
+        root_causes=tuple(_root_cause(rc) for rc in root_causes)
+        if isinstance(root_causes, list) else (),
+    )
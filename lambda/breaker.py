@@ -0,0 +1,119 @@
+"""Per-destination circuit breakers, shared by every worker thread of a warm container.
+
+After `failure_threshold` consecutive failed attempts (transport errors and
+5xx; any other HTTP response proves the endpoint is up and counts as success)
+a breaker opens and sends to that destination fail immediately with CircuitOpen
+instead of waiting out connection timeouts. After `reset_timeout` seconds one
+probe request is let through (half-open): success closes the breaker, failure
+opens it again for another `reset_timeout`. A probe that ends without an
+answer from the endpoint (rate-limit wait or deadline, a local error) is
+released, so the next send probes instead.
+"""
+import hashlib
+import threading
+import time
+from typing import Dict
+
+import log
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpen(Exception):
+    """The destination's breaker is open; the send was not attempted."""
+
+
+def destination_id(url: str) -> str:
+    """Loggable name for a destination: host plus a short hash (webhook paths and keys are secrets)."""
+    scheme, sep, rest = url.partition("://")
+    # "teams+https://host/..." names its host; "pagerduty://<key>" only its sink type
+    host = (rest.split("/", 1)[0] if scheme.endswith(("http", "https")) else scheme) if sep else ""
+    return f"{host}#{hashlib.sha256(url.encode('utf-8')).hexdigest()[:8]}"
+
+
+class CircuitBreaker:
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0) -> None:
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+        self.stats = {"trips": 0, "recoveries": 0, "rejected": 0, "probes": 0}
+
+    def allow(self) -> bool:
+        """Raise CircuitOpen unless a request may be sent now; True when the request is the half-open probe."""
+        with self._lock:
+            if self.state == CLOSED:
+                return False
+            if self.state == OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                self.state = HALF_OPEN
+                self._probing = False
+            if self.state == HALF_OPEN and not self._probing:
+                # Exactly one in-flight probe; everyone else keeps failing fast
+                self._probing = True
+                self.stats["probes"] += 1
+                return True
+            self.stats["rejected"] += 1
+            retry_in = max(0.0, self.reset_timeout - (time.monotonic() - self._opened_at))
+        raise CircuitOpen(f"circuit open for {self.name}; next probe in {retry_in:.0f}s")
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            if self.state == CLOSED:
+                return
+            self.state = CLOSED
+            self._probing = False
+            self.stats["recoveries"] += 1
+            outage = time.monotonic() - self._opened_at
+        log.info("Circuit closed", destination=self.name, outage_seconds=round(outage, 1))
+
+    def release(self) -> None:
+        """End a probe that got no verdict, leaving the breaker half-open for the next send."""
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self._probing = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self.state == HALF_OPEN or (self.state == CLOSED and self._failures >= self.failure_threshold):
+                if self.state == CLOSED:
+                    self.stats["trips"] += 1
+                self.state = OPEN
+                self._opened_at = time.monotonic()
+                self._probing = False
+                failures = self._failures
+            else:
+                return
+        log.warning("Circuit opened", destination=self.name, consecutive_failures=failures,
+                    reset_seconds=self.reset_timeout)
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def breaker_for(url: str, failure_threshold: int, reset_timeout: float) -> CircuitBreaker:
+    with _breakers_lock:
+        breaker = _breakers.get(url)
+        if breaker is None:
+            breaker = _breakers[url] = CircuitBreaker(destination_id(url), failure_threshold, reset_timeout)
+        return breaker
+
+
+def stats() -> Dict[str, object]:
+    """Totals over all destinations plus the ones currently not closed."""
+    with _breakers_lock:
+        breakers = list(_breakers.values())
+    totals: Dict[str, object] = {"trips": 0, "recoveries": 0, "rejected": 0, "probes": 0}
+    for b in breakers:
+        for key, value in b.stats.items():
+            totals[key] = int(totals[key]) + value  # type: ignore[call-overload]
+    totals["open"] = sorted(b.name for b in breakers if b.state != CLOSED)
+    return totals
@@ -0,0 +1,70 @@
+"""JSON encode/decode with an optional fast backend.
+
+orjson (or ujson) is used when it has been bundled into the deployment zip,
+otherwise the standard library. Encoding always returns UTF-8 bytes ready to be
+sent as a request body. Set JSON_BACKEND=orjson|ujson|json to force a backend.
+"""
+import json
+import os
+import sys
+from typing import Any, Callable, NamedTuple, Optional
+
+
+class Codec(NamedTuple):
+    name: str
+    loads: Callable[[Any], Any]
+    dumps_bytes: Callable[[Any], bytes]
+
+
+def _stdlib() -> Codec:
+    encoder = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"))
+    return Codec("json", json.loads, lambda obj: encoder.encode(obj).encode("utf-8"))
+
+
+def _orjson() -> Codec:
+    import orjson
+
+    return Codec("orjson", orjson.loads, orjson.dumps)
+
+
+def _ujson() -> Codec:
+    import ujson
+
+    def dumps_bytes(obj: Any) -> bytes:
+        return ujson.dumps(obj, ensure_ascii=False, escape_forward_slashes=False).encode("utf-8")
+
+    return Codec("ujson", ujson.loads, dumps_bytes)
+
+
+_FACTORIES = {"orjson": _orjson, "ujson": _ujson, "json": _stdlib}
+
+
+def get_codec(name: Optional[str] = None) -> Codec:
+    """Return the named backend, or the fastest importable one when name is empty."""
+    if name:
+        return _FACTORIES[name]()
+    for factory in (_orjson, _ujson):
+        try:
+            return factory()
+        except ImportError:
+            continue
+    return _stdlib()
+
+
+def _select() -> Codec:
+    requested = os.environ.get("JSON_BACKEND", "").strip().lower() or None
+    try:
+        return get_codec(requested)
+    except (ImportError, KeyError) as e:
+        print(f"JSON_BACKEND={requested!r} unavailable ({e!r}); using the default", file=sys.stderr)
+        return get_codec()
+
+
+CODEC = _select()
+BACKEND = CODEC.name
+loads = CODEC.loads
+dumps_bytes = CODEC.dumps_bytes
+
+
+def dumps(obj: Any) -> str:
+    return dumps_bytes(obj).decode("utf-8")
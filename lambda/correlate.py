@@ -0,0 +1,119 @@
+"""Alert-storm correlation: group anomalies that share root-cause dimensions and overlap in time.
+
+When a shared dependency spikes, CAD raises many anomalies with the same
+service/region and overlapping windows. Within one batch, anomalies are
+bucketed by their top root cause's correlation dimensions (STORM_CORRELATE_BY,
+service and region by default) and each bucket is swept in start-date order
+into groups of transitively overlapping [AnomalyStartDate, AnomalyEndDate]
+windows. Anomalies delivered shortly before (the history store's recent
+window) are looked up once per bucket through an interval index and counted
+towards the group they overlap, so a storm spread over several invocations is
+still recognized.
+"""
+from bisect import bisect_right
+from typing import Callable, Dict, Generic, List, NamedTuple, Optional, Sequence, Tuple, TypeVar
+
+from anomaly import Anomaly
+
+T = TypeVar("T")
+
+# End of an open (still ongoing) anomaly window
+OPEN_END = "9999-12-31"
+
+DIMENSIONS = ("account", "service", "region")
+
+Key = Tuple[Optional[str], Optional[str], Optional[str]]
+
+
+def _day(value: Optional[str]) -> Optional[str]:
+    """YYYY-MM-DD part of an ISO timestamp, so both CAD date formats compare as strings."""
+    return value[:10] if isinstance(value, str) and len(value) >= 10 else None
+
+
+class IntervalIndex(Generic[T]):
+    """Static set of [start, end] intervals (ISO day strings) sorted by start."""
+
+    def __init__(self, intervals: Sequence[Tuple[str, str, T]]) -> None:
+        self._items = sorted(intervals, key=lambda i: i[0])
+        self._starts = [i[0] for i in self._items]
+
+    def overlapping(self, start: str, end: str) -> List[T]:
+        """Values whose interval intersects [start, end]."""
+        stop = bisect_right(self._starts, end)
+        return [value for s, e, value in self._items[:stop] if e >= start]
+
+    def clusters(self) -> List[Tuple[str, str, List[T]]]:
+        """Maximal groups of transitively overlapping intervals, as (start, end, values)."""
+        out: List[Tuple[str, str, List[T]]] = []
+        for start, end, value in self._items:
+            if out and start <= out[-1][1]:
+                s, e, values = out[-1]
+                values.append(value)
+                out[-1] = (s, max(e, end), values)
+            else:
+                out.append((start, end, [value]))
+        return out
+
+
+class Group(NamedTuple):
+    key: Key
+    start: Optional[str]
+    end: Optional[str]
+    # Positions in the input sequence
+    members: List[int]
+    # Overlapping anomalies with the same key delivered in the recent window
+    earlier: List[str]
+
+
+def parse_dimensions(text: Optional[str]) -> Tuple[str, ...]:
+    names = tuple(n.strip().lower() for n in (text or "").split(",") if n.strip())
+    unknown = set(names) - set(DIMENSIONS)
+    if unknown or not names:
+        raise ValueError(f"correlation dimensions must be some of {', '.join(DIMENSIONS)}")
+    return names
+
+
+def _key(anomaly: Anomaly, by: Tuple[str, ...]) -> Optional[Key]:
+    rc = anomaly.top_root_cause
+    if rc is None:
+        return None
+    values = {"account": rc.linked_account, "service": rc.service, "region": rc.region}
+    if any(not values[d] for d in by):
+        return None
+    return tuple(values[d] if d in by else None for d in DIMENSIONS)  # type: ignore[return-value]
+
+
+def correlate(
+    anomalies: Sequence[Anomaly],
+    by: Tuple[str, ...],
+    recent: Optional[Callable[[Key], List[Tuple[str, Optional[str], Optional[str]]]]] = None,
+) -> List[Group]:
+    """Partition `anomalies` into correlated groups; every anomaly is in exactly one group.
+
+    Anomalies without a start date or missing a correlation dimension stay
+    alone. `recent(key)` returns (anomaly_id, start, end) of anomalies with
+    that key delivered shortly before this batch.
+    """
+    buckets: Dict[Key, List[Tuple[str, str, int]]] = {}
+    groups: List[Group] = []
+    for pos, anomaly in enumerate(anomalies):
+        key = _key(anomaly, by)
+        start = _day(anomaly.start_date)
+        if key is None or start is None:
+            groups.append(Group((None, None, None), start, _day(anomaly.end_date), [pos], []))
+            continue
+        buckets.setdefault(key, []).append((start, _day(anomaly.end_date) or OPEN_END, pos))
+
+    batch_ids = {a.anomaly_id for a in anomalies}
+    for key, intervals in buckets.items():
+        earlier_index: Optional[IntervalIndex[str]] = None
+        if recent is not None:
+            earlier_index = IntervalIndex([
+                (_day(s) or "", _day(e) or OPEN_END, anomaly_id)
+                for anomaly_id, s, e in recent(key)
+                if anomaly_id not in batch_ids and _day(s)
+            ])
+        for start, end, members in IntervalIndex(intervals).clusters():
+            earlier = earlier_index.overlapping(start, end) if earlier_index else []
+            groups.append(Group(key, start, None if end == OPEN_END else end, sorted(members), earlier))
+    return groups
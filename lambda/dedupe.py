@@ -0,0 +1,293 @@
+"""Idempotent delivery: remember which anomaly versions were already posted.
+
+CAD re-publishes the same anomaly as its impact grows and SNS is
+at-least-once, so the notifier keys every delivery on (AnomalyId, payload
+fingerprint). A warm-container LRU answers most lookups; a persistent backend
+(DynamoDB in production, SQLite for local runs) covers cold starts.
+
+Records fanned out to several destinations are also tracked per destination
+(`was_sent` / `mark_sent`), so the redelivery of a partially failed record
+only goes to the destinations that missed it.
+
+`ChangeFilter` goes further for long-running anomalies: it remembers the last
+delivered impact per AnomalyId in the same store and suppresses new versions
+whose impact moved less than MIN_IMPACT_CHANGE_USD / MIN_IMPACT_CHANGE_PERCENT.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+import log
+
+
+def fingerprint(anomaly: Dict[str, Any]) -> str:
+    """Stable hash of the anomaly payload; changes whenever CAD sends new content."""
+    canonical = json.dumps(anomaly, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class LRUCache:
+    """Thread-safe bounded mapping that evicts the least recently used key."""
+
+    def __init__(self, capacity: int = 1024) -> None:
+        self.capacity = capacity
+        self._data: "OrderedDict[str, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Any:
+        with self._lock:
+            if key not in self._data:
+                return None
+            self._data.move_to_end(key)
+            return self._data[key]
+
+    def put(self, key: str, value: Any) -> None:
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.capacity:
+                self._data.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class NullBackend:
+    """No persistence; only the warm-container LRU is consulted."""
+
+    def get(self, key: str) -> Optional[str]:
+        return None
+
+    def put(self, key: str, value: str, ttl: int) -> None:
+        pass
+
+
+class SQLiteBackend:
+    """Local-file stand-in for the DynamoDB table (tests, local runs, /tmp cache)."""
+
+    def __init__(self, path: str) -> None:
+        import sqlite3  # only needed for this backend
+
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._lock = threading.Lock()
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS dedupe ("
+            " pk TEXT PRIMARY KEY, fingerprint TEXT NOT NULL, expires_at INTEGER NOT NULL)"
+        )
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT fingerprint FROM dedupe WHERE pk = ? AND expires_at > ?",
+                (key, int(time.time())),
+            ).fetchone()
+        return row[0] if row else None
+
+    def put(self, key: str, value: str, ttl: int) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO dedupe (pk, fingerprint, expires_at) VALUES (?, ?, ?)",
+                (key, value, int(time.time()) + ttl),
+            )
+
+
+class DynamoDBBackend:
+    """DynamoDB table with string partition key `pk` and TTL attribute `expires_at`."""
+
+    def __init__(self, table_name: str) -> None:
+        import boto3  # provided by the Lambda runtime; only needed for this backend
+
+        self._table = boto3.resource("dynamodb").Table(table_name)
+
+    def get(self, key: str) -> Optional[str]:
+        item = self._table.get_item(Key={"pk": key}, ConsistentRead=True).get("Item")
+        if not item or int(item.get("expires_at", 0)) <= time.time():
+            return None
+        return item.get("fingerprint")
+
+    def put(self, key: str, value: str, ttl: int) -> None:
+        self._table.put_item(
+            Item={"pk": key, "fingerprint": value, "expires_at": int(time.time()) + ttl}
+        )
+
+
+class Deduper:
+    """Answers "was this exact anomaly version already delivered?", overall or to one destination."""
+
+    SENT_PREFIX = "sent#"
+
+    def __init__(self, backend: Any = None, lru_size: int = 1024, ttl: int = 14 * 86400) -> None:
+        self.backend = backend or NullBackend()
+        self.ttl = ttl
+        self._lru = LRUCache(lru_size)
+        self._lock = threading.Lock()
+        # Per-destination (sent#) lookups are counted apart, so the hit rates stay those of whole anomalies
+        self._stats = {
+            "lru_hits": 0, "store_hits": 0, "misses": 0, "sent_hits": 0, "sent_misses": 0, "store_errors": 0,
+        }
+
+    def _bump(self, name: str) -> None:
+        with self._lock:
+            self._stats[name] += 1
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._stats, lru_size=len(self._lru))
+
+    def _lookup(self, key: str, fp: str) -> Optional[str]:
+        """Where `fp` was found stored under `key`: "lru", "store", or None."""
+        if self._lru.get(key) == fp:
+            return "lru"
+        try:
+            stored = self.backend.get(key)
+        except Exception as e:
+            # A broken store must never block delivery; worst case is a repeat post
+            log.warning("Dedupe store lookup failed", error=repr(e))
+            self._bump("store_errors")
+            stored = None
+        if stored is not None and stored == fp:
+            self._lru.put(key, fp)
+            return "store"
+        return None
+
+    def _remember(self, key: str, fp: str) -> None:
+        self._lru.put(key, fp)
+        try:
+            self.backend.put(key, fp, self.ttl)
+        except Exception as e:
+            log.warning("Dedupe store write failed", error=repr(e))
+            self._bump("store_errors")
+
+    def is_duplicate(self, anomaly_id: str, fp: str) -> bool:
+        found = self._lookup(anomaly_id, fp)
+        self._bump(f"{found}_hits" if found else "misses")
+        return found is not None
+
+    def mark_delivered(self, anomaly_id: str, fp: str) -> None:
+        self._remember(anomaly_id, fp)
+
+    @classmethod
+    def _sent_key(cls, anomaly_id: str, destination: str) -> str:
+        # Destination URLs carry secrets (webhook paths, integration keys); store a hash
+        digest = hashlib.sha256(destination.encode("utf-8")).hexdigest()[:16]
+        return f"{cls.SENT_PREFIX}{digest}#{anomaly_id}"
+
+    def was_sent(self, anomaly_id: str, fp: str, destination: str) -> bool:
+        found = self._lookup(self._sent_key(anomaly_id, destination), fp)
+        self._bump("sent_hits" if found else "sent_misses")
+        return found is not None
+
+    def mark_sent(self, anomaly_id: str, fp: str, destination: str) -> None:
+        self._remember(self._sent_key(anomaly_id, destination), fp)
+
+
+class ChangeFilter:
+    """Answers "did this anomaly's impact change enough since it was last delivered?".
+
+    A new version is minor, and not worth a message, when its total impact
+    moved by less than `min_change_usd` or by less than `min_change_pct`
+    percent of the last delivered impact (a disabled threshold is 0). A
+    change of severity tier is never minor.
+    """
+
+    KEY_PREFIX = "impact#"
+
+    def __init__(
+        self,
+        backend: Any = None,
+        min_change_usd: float = 0.0,
+        min_change_pct: float = 0.0,
+        lru_size: int = 1024,
+        ttl: int = 14 * 86400,
+    ) -> None:
+        self.backend = backend or NullBackend()
+        self.min_change_usd = min_change_usd
+        self.min_change_pct = min_change_pct
+        self.ttl = ttl
+        self._lru = LRUCache(lru_size)
+        self._lock = threading.Lock()
+        self._stats = {"suppressed": 0, "passed": 0, "lru_hits": 0, "store_hits": 0, "store_errors": 0}
+
+    def _bump(self, name: str) -> None:
+        with self._lock:
+            self._stats[name] += 1
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._stats, lru_size=len(self._lru))
+
+    def _last(self, anomaly_id: str) -> Optional[Tuple[float, Optional[float], Optional[str]]]:
+        """(impact, impact %, severity) last delivered for the anomaly."""
+        key = self.KEY_PREFIX + anomaly_id
+        value = self._lru.get(key)
+        if value is not None:
+            self._bump("lru_hits")
+        else:
+            try:
+                value = self.backend.get(key)
+            except Exception as e:
+                log.warning("Impact store lookup failed", error=repr(e))
+                self._bump("store_errors")
+                return None
+            if value is None:
+                return None
+            self._lru.put(key, value)
+            self._bump("store_hits")
+        impact, impact_pct, severity = json.loads(value)
+        return impact, impact_pct, severity
+
+    def is_minor(
+        self, anomaly_id: str, impact: Optional[float], impact_pct: Optional[float], severity: Optional[str]
+    ) -> bool:
+        last = self._last(anomaly_id) if impact is not None else None
+        minor = False
+        if last is not None and last[0] is not None and last[2] == severity:
+            change = abs(impact - last[0])  # type: ignore[operator]
+            minor = change < self.min_change_usd or (
+                self.min_change_pct > 0 and change < abs(last[0]) * self.min_change_pct / 100
+            )
+        self._bump("suppressed" if minor else "passed")
+        return minor
+
+    def mark_delivered(
+        self, anomaly_id: str, impact: Optional[float], impact_pct: Optional[float], severity: Optional[str]
+    ) -> None:
+        key = self.KEY_PREFIX + anomaly_id
+        value = json.dumps([impact, impact_pct, severity])
+        self._lru.put(key, value)
+        try:
+            self.backend.put(key, value, self.ttl)
+        except Exception as e:
+            log.warning("Impact store write failed", error=repr(e))
+            self._bump("store_errors")
+
+
+def backend_from_env() -> Any:
+    """The persistent store named by DEDUPE_BACKEND (memory and none persist nothing)."""
+    kind = os.environ.get("DEDUPE_BACKEND", "memory").strip().lower()
+    if kind == "dynamodb":
+        return DynamoDBBackend(os.environ["DEDUPE_TABLE"])
+    if kind == "sqlite":
+        return SQLiteBackend(os.environ.get("DEDUPE_SQLITE_PATH", "/tmp/cad-dedupe.sqlite3"))
+    return NullBackend()
+
+
+def from_env(backend: Any, lru_size: int = 1024, ttl: int = 14 * 86400) -> Optional[Deduper]:
+    """Deduper over the shared `backend` (see backend_from_env); None when DEDUPE_BACKEND disables it."""
+    kind = os.environ.get("DEDUPE_BACKEND", "memory").strip().lower()
+    if kind in ("", "none", "off", "disabled"):
+        return None
+    return Deduper(backend, lru_size=lru_size, ttl=ttl)
+
+
+def change_filter(
+    backend: Any, min_change_usd: float, min_change_pct: float, lru_size: int = 1024, ttl: int = 14 * 86400
+) -> Optional[ChangeFilter]:
+    """ChangeFilter over the shared `backend`; None when both thresholds are 0."""
+    if min_change_usd <= 0 and min_change_pct <= 0:
+        return None
+    return ChangeFilter(backend, min_change_usd, min_change_pct, lru_size=lru_size, ttl=ttl)
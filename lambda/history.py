@@ -0,0 +1,304 @@
+"""Anomaly history: every delivered anomaly version, queryable by account, service and region.
+
+Nothing else in the notifier outlives an invocation, so this is what answers
+"how many times has this service spiked in this account this month", both for
+the Slack message (see `History.count_this_month`) and for ad-hoc reports.
+
+SQLite keeps an append-only log with one row per delivery, indexed on
+(account, start_date), (service, start_date) and (region, start_date). The
+DynamoDB table stores one item per (dimension, anomaly) instead, so a count is
+a single Query on the partition key with a start-date range on the sort key;
+re-deliveries of the same anomaly overwrite their items.
+"""
+import os
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import log
+from anomaly import Anomaly
+
+# Query shape: (account, service, region); None leaves a dimension unconstrained
+Dimensions = Tuple[Optional[str], Optional[str], Optional[str]]
+
+# (anomaly_id, start_date, end_date)
+Interval = Tuple[str, Optional[str], Optional[str]]
+
+# How far back `recent` looks by anomaly start date in DynamoDB, bounding the Query
+RECENT_START_LOOKBACK_DAYS = 90
+
+
+def month_range(start_date: Optional[str]) -> Optional[Tuple[str, str]]:
+    """[first day of the month, first day of the next) of an ISO date, as strings."""
+    if not start_date or len(start_date) < 7 or start_date[4] != "-":
+        return None
+    year, month = int(start_date[:4]), int(start_date[5:7])
+    nxt = f"{year + 1:04d}-01" if month == 12 else f"{year:04d}-{month + 1:02d}"
+    return f"{start_date[:7]}-01", f"{nxt}-01"
+
+
+def _dimensions(anomaly: Anomaly) -> Dimensions:
+    rc = anomaly.top_root_cause
+    if rc is None:
+        return None, None, None
+    return rc.linked_account, rc.service, rc.region
+
+
+class SQLiteHistory:
+    """Append-only local history (tests, local runs, reports over an exported copy)."""
+
+    def __init__(self, path: str) -> None:
+        import sqlite3  # only needed for this backend
+
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._lock = threading.Lock()
+        self._conn.executescript(
+            "CREATE TABLE IF NOT EXISTS anomaly_history ("
+            " anomaly_id TEXT NOT NULL, recorded_at INTEGER NOT NULL, start_date TEXT,"
+            " end_date TEXT, account TEXT, service TEXT, region TEXT, usage_type TEXT,"
+            " impact REAL, impact_pct REAL, severity TEXT);"
+            "CREATE INDEX IF NOT EXISTS anomaly_history_account ON anomaly_history (account, start_date);"
+            "CREATE INDEX IF NOT EXISTS anomaly_history_service ON anomaly_history (service, start_date);"
+            "CREATE INDEX IF NOT EXISTS anomaly_history_region ON anomaly_history (region, start_date);"
+            "CREATE INDEX IF NOT EXISTS anomaly_history_start ON anomaly_history (start_date);"
+            "CREATE INDEX IF NOT EXISTS anomaly_history_recorded ON anomaly_history (recorded_at);"
+        )
+
+    def record(self, anomaly: Anomaly, severity: Optional[str]) -> None:
+        rc = anomaly.top_root_cause
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO anomaly_history VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    anomaly.anomaly_id, int(time.time()), anomaly.start_date, anomaly.end_date,
+                    rc.linked_account if rc else None, rc.service if rc else None,
+                    rc.region if rc else None, rc.usage_type if rc else None,
+                    anomaly.total_impact, anomaly.total_impact_pct, severity,
+                ),
+            )
+
+    def count(self, dims: Dimensions, since: str, until: str, exclude: Optional[str] = None) -> int:
+        where, args = ["start_date >= ?", "start_date < ?"], [since, until]
+        for column, value in zip(("account", "service", "region"), dims):
+            if value is not None:
+                where.append(f"{column} = ?")
+                args.append(value)
+        if exclude:
+            where.append("anomaly_id != ?")
+            args.append(exclude)
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT COUNT(DISTINCT anomaly_id) FROM anomaly_history WHERE {' AND '.join(where)}",
+                args,
+            ).fetchone()
+        return int(row[0])
+
+    def recent(self, dims: Dimensions, recorded_since: int) -> List[Interval]:
+        where, args = ["recorded_at >= ?"], [recorded_since]
+        for column, value in zip(("account", "service", "region"), dims):
+            if value is not None:
+                where.append(f"{column} = ?")
+                args.append(value)
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT anomaly_id, MIN(start_date), MAX(end_date) FROM anomaly_history"
+                f" WHERE {' AND '.join(where)} GROUP BY anomaly_id",
+                args,
+            ).fetchall()
+        return [(r[0], r[1], r[2]) for r in rows]
+
+    def rows(self, since: str, until: str) -> List[Dict[str, Any]]:
+        """Latest version of every anomaly that started in [since, until), for reports."""
+        with self._lock:
+            cursor = self._conn.execute(
+                "SELECT * FROM anomaly_history WHERE start_date >= ? AND start_date < ?"
+                " ORDER BY recorded_at, rowid",
+                (since, until),
+            )
+            names = [d[0] for d in cursor.description]
+            latest = {row[0]: dict(zip(names, row)) for row in cursor.fetchall()}
+        return list(latest.values())
+
+
+class DynamoDBHistory:
+    """DynamoDB table with string keys `pk` (dimension) / `sk` (start date#id) and TTL `expires_at`."""
+
+    def __init__(self, table_name: str, ttl: int) -> None:
+        import boto3  # provided by the Lambda runtime; only needed for this backend
+
+        self._table = boto3.resource("dynamodb").Table(table_name)
+        self.ttl = ttl
+
+    @staticmethod
+    def _partitions(dims: Dimensions) -> Iterable[str]:
+        account, service, region = dims
+        if account and service:
+            yield f"account-service#{account}#{service}"
+        if account:
+            yield f"account#{account}"
+        if service:
+            yield f"service#{service}"
+        if region:
+            yield f"region#{region}"
+
+    @classmethod
+    def _partition(cls, dims: Dimensions) -> str:
+        account, service, region = dims
+        if region and (account or service):
+            raise ValueError("DynamoDB history counts by region alone, or by account and/or service")
+        return next(iter(cls._partitions(dims)))
+
+    def record(self, anomaly: Anomaly, severity: Optional[str]) -> None:
+        rc = anomaly.top_root_cause
+        now = int(time.time())
+        item = {
+            "anomaly_id": anomaly.anomaly_id,
+            "recorded_at": now,
+            "expires_at": now + self.ttl,
+            "start_date": anomaly.start_date,
+            "end_date": anomaly.end_date,
+            "account": rc.linked_account if rc else None,
+            "service": rc.service if rc else None,
+            "region": rc.region if rc else None,
+            "usage_type": rc.usage_type if rc else None,
+            # DynamoDB rejects floats; store amounts as strings like the console export
+            "impact": None if anomaly.total_impact is None else str(anomaly.total_impact),
+            "impact_pct": None if anomaly.total_impact_pct is None else str(anomaly.total_impact_pct),
+            "severity": severity,
+        }
+        item = {k: v for k, v in item.items() if v is not None}
+        sk = f"{anomaly.start_date or ''}#{anomaly.anomaly_id}"
+        with self._table.batch_writer() as batch:
+            for pk in self._partitions(_dimensions(anomaly)):
+                batch.put_item(Item=dict(item, pk=pk, sk=sk))
+
+    def count(self, dims: Dimensions, since: str, until: str, exclude: Optional[str] = None) -> int:
+        from boto3.dynamodb.conditions import Key
+
+        condition = Key("pk").eq(self._partition(dims)) & Key("sk").between(since, until)
+        kwargs: Dict[str, Any] = {"KeyConditionExpression": condition, "ProjectionExpression": "sk"}
+        n = 0
+        while True:
+            page = self._table.query(**kwargs)
+            # `until` is a date, so "until#..." keys (the next period) sort after it and are excluded
+            n += sum(1 for item in page.get("Items", []) if not exclude or not item["sk"].endswith(f"#{exclude}"))
+            if "LastEvaluatedKey" not in page:
+                return n
+            kwargs["ExclusiveStartKey"] = page["LastEvaluatedKey"]
+
+    def recent(self, dims: Dimensions, recorded_since: int) -> List[Interval]:
+        from boto3.dynamodb.conditions import Attr, Key
+
+        account, service, region = dims
+        pk = next(iter(self._partitions((account, service, None if account or service else region))))
+        lookback = time.strftime(
+            "%Y-%m-%d", time.gmtime(recorded_since - RECENT_START_LOOKBACK_DAYS * 86400)
+        )
+        filters = Attr("recorded_at").gte(recorded_since)
+        if region and (account or service):
+            filters = filters & Attr("region").eq(region)
+        kwargs: Dict[str, Any] = {
+            "KeyConditionExpression": Key("pk").eq(pk) & Key("sk").gte(lookback),
+            "FilterExpression": filters,
+            "ProjectionExpression": "anomaly_id, start_date, end_date",
+        }
+        out: List[Interval] = []
+        while True:
+            page = self._table.query(**kwargs)
+            out.extend(
+                (i["anomaly_id"], i.get("start_date"), i.get("end_date")) for i in page.get("Items", [])
+            )
+            if "LastEvaluatedKey" not in page:
+                return out
+            kwargs["ExclusiveStartKey"] = page["LastEvaluatedKey"]
+
+
+class History:
+    """Records deliveries and answers per-month counts, caching counts per warm container."""
+
+    def __init__(self, backend: Any) -> None:
+        self.backend = backend
+        self._counts: Dict[Tuple[Dimensions, str, Optional[str]], int] = {}
+        self._lock = threading.Lock()
+        self._stats = {"records": 0, "queries": 0, "cache_hits": 0, "errors": 0}
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._stats)
+
+    def _bump(self, name: str) -> None:
+        with self._lock:
+            self._stats[name] += 1
+
+    def record(self, anomaly: Anomaly, severity: Optional[str]) -> None:
+        if not anomaly.anomaly_id:
+            return
+        try:
+            self.backend.record(anomaly, severity)
+        except Exception as e:
+            # History is informational; never let it fail a delivery
+            log.warning("History write failed", error=repr(e))
+            self._bump("errors")
+            return
+        self._bump("records")
+        with self._lock:
+            self._counts.clear()
+
+    def count_this_month(self, anomaly: Anomaly, dims: Optional[Dimensions] = None) -> Optional[int]:
+        """Other anomalies starting in the same month with the same account and service.
+
+        None when the anomaly has no usable start date or the store can't be queried.
+        """
+        period = month_range(anomaly.start_date)
+        if period is None:
+            return None
+        if dims is None:
+            account, service, _ = _dimensions(anomaly)
+            dims = (account, service, None)
+        if not any(dims):
+            return None
+        key = (dims, period[0], anomaly.anomaly_id)
+        with self._lock:
+            cached = self._counts.get(key)
+        if cached is not None:
+            self._bump("cache_hits")
+            return cached
+        try:
+            n = self.backend.count(dims, period[0], period[1], exclude=anomaly.anomaly_id)
+        except Exception as e:
+            log.warning("History query failed", error=repr(e))
+            self._bump("errors")
+            return None
+        self._bump("queries")
+        with self._lock:
+            if len(self._counts) >= 4096:
+                self._counts.clear()
+            self._counts[key] = n
+        return n
+
+    def recent(self, dims: Dimensions, window_seconds: float) -> List[Interval]:
+        """Anomalies with these dimensions delivered in the last `window_seconds`; [] on errors."""
+        if not any(dims):
+            return []
+        try:
+            out = self.backend.recent(dims, int(time.time() - window_seconds))
+        except Exception as e:
+            log.warning("History query failed", error=repr(e))
+            self._bump("errors")
+            return []
+        self._bump("queries")
+        return out
+
+
+def from_env() -> Optional[History]:
+    """Build the history store from HISTORY_* environment variables; None when disabled."""
+    kind = os.environ.get("HISTORY_BACKEND", "none").strip().lower()
+    if kind in ("", "none", "off", "disabled"):
+        return None
+    if kind == "dynamodb":
+        ttl = log.env_int("HISTORY_TTL_SECONDS", 400 * 86400)
+        return History(DynamoDBHistory(os.environ["HISTORY_TABLE"], ttl))
+    if kind == "sqlite":
+        return History(SQLiteHistory(os.environ.get("HISTORY_SQLITE_PATH", "/tmp/cad-history.sqlite3")))
+    log.warning("Unknown HISTORY_BACKEND; history disabled", backend=kind)
+    return None
@@ -0,0 +1,210 @@
+"""Keep-alive HTTP(S) connection pool shared across warm Lambda invocations.
+
+Connections are keyed by (scheme, host, port) and kept open between requests
+so that consecutive Slack posts reuse one TCP/TLS session instead of paying
+DNS + TCP + TLS handshake every time.
+"""
+import http.client
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Mapping, NamedTuple, Optional, Tuple
+from urllib.parse import urlsplit
+
+# Errors writing a request to a pooled connection the peer closed while idle.
+# The request never reached the server whole, so it is safe to resend on a new one.
+_STALE_ERRORS = (
+    BrokenPipeError,
+    ConnectionResetError,
+    ConnectionAbortedError,
+)
+
+PoolKey = Tuple[str, str, int]
+
+
+class TransportError(Exception):
+    """The request could not be completed (DNS, connect, TLS, timeout, reset)."""
+
+    def __init__(self, reason: BaseException) -> None:
+        super().__init__(reason)
+        self.reason = reason
+
+
+class HTTPStatusError(Exception):
+    """The server answered with a 4xx/5xx status."""
+
+    def __init__(self, url: str, code: int, reason: str, headers: Dict[str, str], body: bytes) -> None:
+        super().__init__(f"HTTP Error {code}: {reason}")
+        self.url = url
+        self.code = code
+        self.reason = reason
+        # Lower-cased header names
+        self.headers = headers
+        self.body = body
+
+
+class Response(NamedTuple):
+    status: int
+    reason: str
+    headers: Dict[str, str]
+    body: bytes
+
+
+class ConnectionPool:
+    """Bounded pool of idle keep-alive connections per (scheme, host, port)."""
+
+    def __init__(
+        self,
+        max_idle_per_host: int = 4,
+        idle_timeout: float = 30.0,
+        timeout: float = 10.0,
+    ) -> None:
+        self.max_idle_per_host = max_idle_per_host
+        self.idle_timeout = idle_timeout
+        self.timeout = timeout
+        self._idle: Dict[PoolKey, Deque[Tuple[http.client.HTTPConnection, float]]] = {}
+        self._lock = threading.Lock()
+        self._stats = {
+            "new_connections": 0,
+            "reused_connections": 0,
+            "stale_reconnects": 0,
+            "evicted_idle": 0,
+        }
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._stats)
+
+    def _bump(self, name: str, n: int = 1) -> None:
+        with self._lock:
+            self._stats[name] += n
+
+    def _acquire(self, key: PoolKey, timeout: float) -> Tuple[http.client.HTTPConnection, bool]:
+        """Return (connection, reused). Idle connections past their TTL are closed."""
+        now = time.monotonic()
+        conn = None
+        evicted = []
+        with self._lock:
+            idle = self._idle.get(key)
+            while idle:
+                candidate, last_used = idle.pop()
+                if now - last_used > self.idle_timeout:
+                    evicted.append(candidate)
+                    continue
+                conn = candidate
+                break
+            self._stats["evicted_idle"] += len(evicted)
+        for c in evicted:
+            c.close()
+
+        if conn is not None:
+            conn.timeout = timeout
+            if conn.sock is not None:
+                conn.sock.settimeout(timeout)
+            self._bump("reused_connections")
+            return conn, True
+
+        scheme, host, port = key
+        if scheme == "https":
+            conn = http.client.HTTPSConnection(host, port, timeout=timeout)
+        else:
+            conn = http.client.HTTPConnection(host, port, timeout=timeout)
+        self._bump("new_connections")
+        return conn, False
+
+    def _release(self, key: PoolKey, conn: http.client.HTTPConnection) -> None:
+        with self._lock:
+            idle = self._idle.setdefault(key, deque())
+            if len(idle) < self.max_idle_per_host:
+                idle.append((conn, time.monotonic()))
+                return
+        conn.close()
+
+    def close_all(self) -> None:
+        with self._lock:
+            conns = [c for idle in self._idle.values() for c, _ in idle]
+            self._idle.clear()
+        for c in conns:
+            c.close()
+
+    def request(
+        self,
+        method: str,
+        url: str,
+        body: Optional[bytes] = None,
+        headers: Optional[Mapping[str, str]] = None,
+        timeout: Optional[float] = None,
+    ) -> Response:
+        """Send a request over a pooled connection and return the fully-read response.
+
+        Raises HTTPStatusError for 4xx/5xx responses and TransportError for
+        network failures. (urllib.error is avoided: it pulls in tempfile and
+        friends at import time, which shows up in cold starts.)
+        """
+        parts = urlsplit(url)
+        scheme = parts.scheme or "https"
+        port = parts.port or (443 if scheme == "https" else 80)
+        key: PoolKey = (scheme, parts.hostname or "", port)
+        path = parts.path or "/"
+        if parts.query:
+            path = f"{path}?{parts.query}"
+        timeout = self.timeout if timeout is None else timeout
+
+        # A stale reused connection is dropped and the request resent only when
+        # the server can't have acted on it: writing it failed, or the peer closed
+        # before a single byte of response. Any other failure (a reset mid-response,
+        # a garbled status line, a fresh connection) is surfaced to the caller,
+        # whose retry policy and dedupe decide whether to send again.
+        while True:
+            conn, reused = self._acquire(key, timeout)
+            sent = False
+            try:
+                conn.request(method, path, body=body, headers=dict(headers or {}))
+                sent = True
+                resp = conn.getresponse()
+                data = resp.read()
+            except (OSError, http.client.HTTPException) as e:
+                conn.close()
+                stale = isinstance(e, http.client.RemoteDisconnected) if sent else isinstance(e, _STALE_ERRORS)
+                if reused and stale:
+                    self._bump("stale_reconnects")
+                    continue
+                raise TransportError(e) from e
+            break
+
+        if resp.will_close:
+            conn.close()
+        else:
+            self._release(key, conn)
+
+        result = Response(resp.status, resp.reason, {k.lower(): v for k, v in resp.getheaders()}, data)
+        if result.status >= 400:
+            raise HTTPStatusError(url, result.status, result.reason, result.headers, data)
+        return result
+
+    def warm(self, url: str, timeout: float = 2.0) -> None:
+        """Open (TCP + TLS) a connection to url's host and park it in the pool."""
+        parts = urlsplit(url)
+        scheme = parts.scheme or "https"
+        key: PoolKey = (scheme, parts.hostname or "", parts.port or (443 if scheme == "https" else 80))
+        conn, reused = self._acquire(key, timeout)
+        if not reused:
+            try:
+                conn.connect()
+            except OSError:
+                conn.close()
+                raise
+        self._release(key, conn)
+
+
+# Module-level so the pool survives across warm invocations of the container.
+POOL = ConnectionPool()
+
+
+def post(url: str, body: bytes, headers: Optional[Mapping[str, str]] = None,
+         timeout: Optional[float] = None) -> Response:
+    return POOL.request("POST", url, body=body, headers=headers, timeout=timeout)
+
+
+def stats() -> Dict[str, Any]:
+    return POOL.stats()
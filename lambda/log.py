@@ -0,0 +1,101 @@
+"""Minimal structured logger: one JSON object per line on stdout.
+
+CloudWatch Logs bills per ingested byte, so string fields are truncated to
+LOG_MAX_FIELD_CHARS and the full Lambda event is only dumped for a sampled
+fraction of invocations (LOG_EVENT_SAMPLE_RATE, or always at LOG_LEVEL=DEBUG).
+"""
+import os
+import random
+import sys
+from typing import Any, Dict
+
+import codec
+
+LEVELS = {"DEBUG": 10, "INFO": 20, "WARNING": 30, "ERROR": 40}
+
+
+LEVEL = LEVELS.get(os.environ.get("LOG_LEVEL", "INFO").strip().upper(), LEVELS["INFO"])
+# Until LOG_MAX_FIELD_CHARS is read below; a warning about it is clipped with this
+MAX_FIELD_CHARS = 1000
+
+
+def env_int(name: str, default: int, minimum: int = 1) -> int:
+    """Integer setting from the environment; a malformed value is logged and `default` used."""
+    try:
+        return max(minimum, int(os.environ.get(name, default)))
+    except (TypeError, ValueError):
+        warning("Ignoring invalid environment value", name=name, value=os.environ.get(name))
+        return default
+
+
+def env_float(name: str, default: float, minimum: float = 0.0) -> float:
+    """Float setting from the environment; a malformed value is logged and `default` used."""
+    try:
+        return max(minimum, float(os.environ.get(name, default)))
+    except (TypeError, ValueError):
+        warning("Ignoring invalid environment value", name=name, value=os.environ.get(name))
+        return default
+
+
+def truncate(value: str, limit: int) -> str:
+    if len(value) <= limit:
+        return value
+    return f"{value[:limit]}...(+{len(value) - limit} chars)"
+
+
+def _clip(value: Any) -> Any:
+    if isinstance(value, str):
+        return truncate(value, MAX_FIELD_CHARS)
+    return value
+
+
+def enabled(level: str) -> bool:
+    return LEVELS[level] >= LEVEL
+
+
+def emit(level: str, msg: str, **fields: Any) -> None:
+    if LEVELS[level] < LEVEL:
+        return
+    record: Dict[str, Any] = {"level": level, "msg": msg}
+    for key, value in fields.items():
+        record[key] = _clip(value)
+    try:
+        line = codec.dumps(record)
+    except TypeError:
+        line = codec.dumps({k: v if isinstance(v, (int, float, bool, type(None))) else str(v)
+                            for k, v in record.items()})
+    print(line, file=sys.stderr if LEVELS[level] >= LEVELS["WARNING"] else sys.stdout)
+
+
+def debug(msg: str, **fields: Any) -> None:
+    emit("DEBUG", msg, **fields)
+
+
+def info(msg: str, **fields: Any) -> None:
+    emit("INFO", msg, **fields)
+
+
+def warning(msg: str, **fields: Any) -> None:
+    emit("WARNING", msg, **fields)
+
+
+def error(msg: str, **fields: Any) -> None:
+    emit("ERROR", msg, **fields)
+
+
+def event(event_obj: Any) -> None:
+    """Dump the raw Lambda event for a sampled fraction of invocations, size-capped."""
+    if LEVEL > LEVELS["DEBUG"] and (EVENT_SAMPLE_RATE <= 0 or random.random() >= EVENT_SAMPLE_RATE):
+        return
+    try:
+        dumped = codec.dumps(event_obj)
+    except TypeError:
+        dumped = repr(event_obj)
+    # Level is bypassed on purpose: sampling already decided this line is wanted
+    print(codec.dumps({"level": "DEBUG", "msg": "event", "event": truncate(dumped, MAX_EVENT_CHARS)}))
+
+
+# Read once warning() exists, so invalid values are reported like any other setting's
+MAX_FIELD_CHARS = env_int("LOG_MAX_FIELD_CHARS", 1000)
+MAX_EVENT_CHARS = env_int("LOG_MAX_EVENT_CHARS", 16384)
+EVENT_SAMPLE_RATE = env_float("LOG_EVENT_SAMPLE_RATE", 0.0)
@@ -1,66 +1,120 @@
-import json
 import os
-import sys
-import urllib.request
-import urllib.error
-from typing import Any, Dict, List, Optional, Sequence, Tuple
-
-def _post_to_slack(webhook_url: str, payload: dict) -> None:
-    data = json.dumps(payload).encode("utf-8")
-    req = urllib.request.Request(
-        webhook_url,
-        data=data,
-        headers={"Content-Type": "application/json"},
-        method="POST",
-    )
-    try:
-        with urllib.request.urlopen(req, timeout=10) as resp:
-            resp.read()  # force request execution
-    except urllib.error.HTTPError as e:
-        print(f"Slack webhook HTTPError: {e.code} {e.reason}", file=sys.stderr)
-        raise
-    except urllib.error.URLError as e:
-        print(f"Slack webhook URLError: {e.reason}", file=sys.stderr)
-        raise
-
-
-def _get_severity_details(impact: Optional[float]) -> Dict[str, str]:
-    if impact is None:
-        return {"color": "#78909C", "emoji": ":information_source:", "label": "UNKNOWN"}
-    
-    if impact > 100:
-        return {"color": "#C62828", "emoji": ":rotating_light:", "label": "HIGH"}
-    elif impact > 50:
-        # Amber/Yellow
-        return {"color": "#FFC107", "emoji": ":warning:", "label": "MEDIUM"}
-    else:
-        # Blue (Low)
-        return {"color": "#2196F3", "emoji": ":information_source:", "label": "LOW"}
+import time
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple, Union
 
+import accounts
+import breaker
+import codec
+import correlate
+import dedupe
+import history
+import http_pool
+import log
+import messages
+import metrics
+import profiling
+import ratelimit
+import routing
+import severity
+import sinks
+import spill
+import tables
+from anomaly import Anomaly, RootCause, normalize
 
-def _safe_get(d: Dict[str, Any], path: Sequence[str], default: Any = None) -> Any:
-    cur = d
-    try:
-        for k in path:
-            if cur is None:
-                return default
-            cur = cur.get(k)
-        return cur if cur is not None else default
-    except Exception:
-        return default
+CONSOLE_ANOMALIES_URL = "https://console.aws.amazon.com/cost-management/home?#/anomaly-detection/anomalies"
 
 
-def _get_any(d: Dict[str, Any], paths: Sequence[Sequence[str]], default: Any = None) -> Any:
-    """Return the first non-None value among multiple possible key-paths.
+def _post(
+    destination: str, payload: Union[dict, bytes], deadline: Optional[float] = None
+) -> Optional[Dict[str, Any]]:
+    """POST a payload (dict, or JSON already encoded to bytes) to a destination, rate limited and retried.
 
-    Helps support both TitleCase (e.g., AnomalyId) and camelCase (e.g., anomalyId)
-    variants from different AWS payloads (SNS direct vs EventBridge/detail).
+    The HTTP engine shared by every sink (see sinks.py): sends go through the
+    destination's token bucket and circuit breaker. 429 (honoring
+    Retry-After), 5xx and transport errors are retried with jittered
+    exponential backoff, but never past `deadline` (a time.monotonic() value):
+    request timeouts shrink to the time left, and once less than
+    MIN_REQUEST_SECONDS remain, ratelimit.DeadlineExceeded is raised without
+    sending. Returns the Slack Web API reply for slack-api destinations (sinks.APIError
+    when it isn't ok), else None.
     """
-    for p in paths:
-        val = _safe_get(d, p, None)
-        if val is not None:
-            return val
-    return default
+    data = payload if isinstance(payload, bytes) else codec.dumps_bytes(payload)
+    sink = sinks.parse(destination)
+    # One bucket and breaker per channel, whichever Web API method is called
+    base = sinks.base(destination)
+    bucket = (
+        ratelimit.bucket_for(base, SLACK_RATE_PER_SECOND, SLACK_BURST)
+        if SLACK_RATE_PER_SECOND > 0 else None
+    )
+    circuit = (
+        breaker.breaker_for(base, BREAKER_FAILURE_THRESHOLD, BREAKER_RESET_SECONDS)
+        if BREAKER_FAILURE_THRESHOLD > 0 else None
+    )
+    attempt = 0
+    while True:
+        attempt += 1
+        if deadline is not None and deadline - time.monotonic() < MIN_REQUEST_SECONDS:
+            # Leave the rest to a redelivery rather than be killed mid-request
+            raise ratelimit.DeadlineExceeded("not enough time left in the invocation to send")
+        if bucket is not None:
+            bucket.acquire(deadline)
+        # Raises CircuitOpen without touching the network while the webhook is down
+        probe = circuit.allow() if circuit is not None else False
+        timeout = HTTP_TIMEOUT_SECONDS
+        if deadline is not None:
+            timeout = max(MIN_REQUEST_SECONDS, min(timeout, deadline - time.monotonic()))
+        wait: Optional[float] = None
+        try:
+            # Pooled keep-alive connection: warm invocations reuse the TLS session
+            resp = http_pool.post(sink.url, data, sinks.headers(sink), timeout=timeout)
+            if circuit is not None:
+                circuit.record_success()
+            return sinks.api_reply(resp.body) if sink.kind == sinks.SLACK_API else None
+        except http_pool.HTTPStatusError as e:
+            log.error("Delivery HTTPError", sink=sink.kind, code=e.code, reason=str(e.reason), attempt=attempt)
+            if circuit is not None:
+                # The endpoint answered; only 5xx says it is unhealthy
+                if e.code >= 500:
+                    circuit.record_failure()
+                else:
+                    circuit.record_success()
+            if e.code != 429 and e.code < 500:
+                raise
+            error: Exception = e
+            if e.code == 429:
+                wait = ratelimit.parse_retry_after(e.headers.get("retry-after"))
+        except http_pool.TransportError as e:
+            log.error("Delivery URLError", sink=sink.kind, reason=str(e.reason), attempt=attempt)
+            if circuit is not None:
+                circuit.record_failure()
+            error = e
+        finally:
+            if probe and circuit is not None:
+                # A probe the endpoint never answered (e.g. an invalid URL) must not stay in flight
+                circuit.release()
+
+        if attempt > SLACK_MAX_RETRIES:
+            raise error
+        if wait is None:
+            wait = ratelimit.backoff_delay(attempt)
+        if deadline is not None and time.monotonic() + wait >= deadline:
+            raise error
+        if bucket is not None and isinstance(error, http_pool.HTTPStatusError) and error.code == 429:
+            # Every thread posting to this destination backs off, not just this one
+            bucket.block_for(wait)
+        else:
+            time.sleep(wait)
+
+
+def _get_severity_details(anomaly: Anomaly) -> severity.Tier:
+    """Severity tier of the anomaly, using any override for its top root cause."""
+    rc = anomaly.top_root_cause
+    return SEVERITY.classify(
+        anomaly.total_impact,
+        anomaly.total_impact_pct,
+        rc.linked_account if rc else None,
+        rc.service if rc else None,
+    )
 
 
 def _format_date(date_str: Optional[str]) -> Optional[str]:
@@ -74,56 +128,69 @@ def _format_date(date_str: Optional[str]) -> Optional[str]:
     return date_str
 
 
-def _get_account_info(anomaly: Dict[str, Any]) -> Tuple[Optional[str], Optional[str]]:
-    """Return (account_id, account_name) from the anomaly root cause."""
-    root_causes = _get_any(anomaly, [["RootCauses"], ["rootCauses"]], []) or []
-    if not root_causes or not isinstance(root_causes, list):
+def _get_account_info(anomaly: Anomaly) -> Tuple[Optional[str], Optional[str]]:
+    """Return (account_id, account_name) of the largest-contributing root cause."""
+    rc = anomaly.top_root_cause
+    if rc is None or not rc.linked_account:
         return None, None
-    
-    rc = root_causes[0] or {}
-    account_id = _get_any(rc, [["LinkedAccount"], ["linkedAccount"]])
-    if not account_id:
-        return None, None
-    
-    # Try to resolve account name from payload
-    # Check for "LinkedAccountName" or "linkedAccountName" in the root cause
-    acct_name = _get_any(rc, [["LinkedAccountName"], ["linkedAccountName"]])
-    
-    clean_acct = str(account_id).strip()
-    return clean_acct, acct_name
-
-
-def _build_blocks_for_anomaly(anomaly: Dict[str, Any]) -> List[Dict[str, Any]]:
-    impact_total = _get_any(
-        anomaly,
-        [["Impact", "TotalImpact"], ["impact", "totalImpact"]],
-    )
-    
-    # Determine severity
-    sev_details = _get_severity_details(
-        impact_total if isinstance(impact_total, (int, float)) else None
-    )
-    emoji = sev_details["emoji"]
-    label = sev_details["label"]
+    # Prefer LinkedAccountName from the payload, else the Organizations directory
+    name = rc.linked_account_name or (ACCOUNTS.name(rc.linked_account) if ACCOUNTS else None)
+    return rc.linked_account, name
 
 
-    impact_text = f"${impact_total:,.2f}" if isinstance(impact_total, (int, float)) else "n/a"
-    impact_pct = _get_any(
-        anomaly,
-        [["Impact", "TotalImpactPercentage"], ["impact", "totalImpactPercentage"]],
-    )
-    impact_pct_text = f"{impact_pct:,.2f}%" if isinstance(impact_pct, (int, float)) else "n/a"
+def _root_cause_line(rc: RootCause, account_id: Optional[str]) -> str:
+    parts = [
+        f"{label}: {value}"
+        for label, value in (("Service", rc.service), ("Region", rc.region), ("Usage", rc.usage_type))
+        if value
+    ]
+    # The account is in the section text already; only name a different one
+    if rc.linked_account and rc.linked_account != account_id:
+        name = rc.linked_account_name or (ACCOUNTS.name(rc.linked_account) if ACCOUNTS else None)
+        parts.append(f"{name} ({rc.linked_account})" if name else f"Account: {rc.linked_account}")
+    line = " | ".join(parts)
+    if rc.contribution is not None:
+        line = f"{line} · ${rc.contribution:,.2f}" if line else f"${rc.contribution:,.2f}"
+    return line
+
+
+def _root_causes_text(anomaly: Anomaly) -> Optional[str]:
+    """mrkdwn list of the top ROOT_CAUSES_SHOWN root causes plus a "+K more" line."""
+    top = anomaly.top_root_causes(ROOT_CAUSES_SHOWN)
+    account_id = top[0].linked_account if top else None
+    lines = [line for line in (_root_cause_line(rc, account_id) for rc in top) if line]
+    if not lines:
+        return None
+    title = "*Root cause*" if len(anomaly.root_causes) == 1 else "*Top root causes*"
+    if len(lines) == 1 and len(anomaly.root_causes) == 1:
+        return f"{title}\n{lines[0]}"
+    text = f"{title}\n" + "\n".join(f"• {line}" for line in lines)
+    more = len(anomaly.root_causes) - len(top)
+    if more > 0:
+        text += f"\n+{more} more"
+    return text
+
+
+def _build_blocks_for_anomaly(anomaly: Anomaly) -> List[Dict[str, Any]]:
+    impact_total = anomaly.total_impact
+
+    # Determine severity
+    sev_details = _get_severity_details(anomaly)
+    emoji = sev_details.emoji
+    label = sev_details.label
+
+    impact_text = f"${impact_total:,.2f}" if impact_total is not None else "n/a"
+    impact_pct = anomaly.total_impact_pct
+    impact_pct_text = f"{impact_pct:,.2f}%" if impact_pct is not None else "n/a"
 
     fields = []
     # Time window
-    start = _get_any(anomaly, [["AnomalyStartDate"], ["anomalyStartDate"]])
-    end = _get_any(anomaly, [["AnomalyEndDate"], ["anomalyEndDate"]])
-    start_fmt = _format_date(start)
-    end_fmt = _format_date(end)
+    start = anomaly.start_date
+    end = anomaly.end_date
     if start or end:
         fields.append({
             "type": "mrkdwn",
-            "text": f"*Window*\n{start_fmt or '-'} → {end_fmt or '-'}",
+            "text": f"*Window*\n{_format_date(start) or '-'} → {_format_date(end) or '-'}",
         })
 
     # Impact
@@ -138,35 +205,27 @@ def _build_blocks_for_anomaly(anomaly: Dict[str, Any]) -> List[Dict[str, Any]]:
         "text": f"*Impact %*\n{impact_pct_text}",
     })
 
-    # Root cause summary (top item)
-    root_causes = _get_any(anomaly, [["RootCauses"], ["rootCauses"]], []) or []
-    if root_causes and isinstance(root_causes, list):
-        rc = root_causes[0] or {}
-        rc_parts = []
-        # Try both TitleCase and camelCase keys per field
-        service = _get_any(rc, [["Service"], ["service"]])
-        account = _get_any(rc, [["LinkedAccount"], ["linkedAccount"]])
-        region = _get_any(rc, [["Region"], ["region"]])
-        usage = _get_any(rc, [["UsageType"], ["usageType"]])
-        if service:
-            rc_parts.append(f"Service: {service}")
-
-        if region:
-            rc_parts.append(f"Region: {region}")
-        if usage:
-            rc_parts.append(f"Usage: {usage}")
-        if rc_parts:
-            fields.append({
-                "type": "mrkdwn",
-                "text": "*Root cause*\n" + " | ".join(rc_parts),
-            })
+    # Root causes ranked by contribution; the top few listed, the rest counted
+    rc_text = _root_causes_text(anomaly)
+    if rc_text:
+        fields.append({
+            "type": "mrkdwn",
+            "text": _truncate(rc_text, MAX_FIELD_TEXT),
+        })
+
+    # How often this service spiked in this account during the anomaly's month
+    seen = HISTORY.count_this_month(anomaly) if HISTORY else None
+    if seen is not None:
+        fields.append({
+            "type": "mrkdwn",
+            "text": f"*Same service & account*\n{seen} other anomal{'y' if seen == 1 else 'ies'} this month",
+        })
 
     # Anomaly ID
-    anomaly_id = _get_any(anomaly, [["AnomalyId"], ["anomalyId"]])
-    if anomaly_id:
+    if anomaly.anomaly_id:
         fields.append({
             "type": "mrkdwn",
-            "text": f"*Anomaly ID*\n{anomaly_id}",
+            "text": f"*Anomaly ID*\n{anomaly.anomaly_id}",
         })
 
     # Title shown once in the bold header, now with Severity
@@ -190,11 +249,7 @@ def _build_blocks_for_anomaly(anomaly: Dict[str, Any]) -> List[Dict[str, Any]]:
     ]
 
     # Link to AWS console; prefer anomalyDetailsLink when provided
-    console_url = _get_any(
-        anomaly,
-        [["anomalyDetailsLink"], ["AnomalyDetailsLink"]],
-        "https://console.aws.amazon.com/cost-management/home?#/anomaly-detection/anomalies",
-    )
+    console_url = anomaly.details_link or CONSOLE_ANOMALIES_URL
     blocks.append({
         "type": "actions",
         "elements": [
@@ -218,15 +273,14 @@ def _build_blocks_for_anomaly(anomaly: Dict[str, Any]) -> List[Dict[str, Any]]:
     return blocks
 
 
-def _build_payload(anomaly: Optional[Dict[str, Any]], raw_text: str) -> Dict[str, Any]:
-    if anomaly and _get_any(anomaly, [["AnomalyId"], ["anomalyId"]]):
-        impact = _get_any(anomaly, [["Impact", "TotalImpact"], ["impact", "totalImpact"]])  # may be None
-        sev_details = _get_severity_details(impact if isinstance(impact, (int, float)) else None)
+def _build_payload(anomaly: Optional[Anomaly], raw_text: str) -> Dict[str, Any]:
+    if anomaly and anomaly.anomaly_id:
+        sev_details = _get_severity_details(anomaly)
         return {
             # Use an attachment for the color bar; detailed content comes from Block Kit
             "attachments": [
                 {
-                    "color": sev_details["color"],
+                    "color": sev_details.color,
                     "blocks": _build_blocks_for_anomaly(anomaly),
                 }
             ],
@@ -239,38 +293,821 @@ def _build_payload(anomaly: Optional[Dict[str, Any]], raw_text: str) -> Dict[str
         ],
     }
 
+
+def _facts(anomaly: Anomaly) -> sinks.Facts:
+    tier = _get_severity_details(anomaly)
+    rank = _severity_rank(tier)
+    acct_id, acct_name = _get_account_info(anomaly)
+    return sinks.Facts(
+        tier.label,
+        None if rank < 0 else len(SEVERITY.tiers) - 1 - rank,
+        acct_id,
+        acct_name,
+        anomaly.details_link or CONSOLE_ANOMALIES_URL,
+        HISTORY.count_this_month(anomaly) if HISTORY else None,
+    )
+
+
+def _notification_text(anomaly: Optional[Anomaly]) -> str:
+    if anomaly is None or not anomaly.anomaly_id:
+        return "AWS Cost Anomaly Notification"
+    impact = f"${anomaly.total_impact:,.2f}" if anomaly.total_impact is not None else "n/a"
+    return f"AWS Cost Anomaly Detected: {_get_severity_details(anomaly).label} · {impact} USD"
+
+
+def _build_sink_payload(sink: sinks.Destination, anomaly: Optional[Anomaly], raw_text: str) -> Dict[str, Any]:
+    """Payload of one anomaly (or unparsed message) for a destination of any sink type."""
+    if sink.kind == sinks.SLACK:
+        return _build_payload(anomaly, raw_text)
+    if sink.kind == sinks.SLACK_API:
+        payload = _build_payload(anomaly, raw_text)
+        # Notification and screen-reader text; the attachment carries the content
+        payload["text"] = _notification_text(anomaly)
+        payload["channel"] = sink.key
+        return payload
+    if anomaly and anomaly.anomaly_id:
+        return sinks.render(sink, anomaly, _facts(anomaly), ROOT_CAUSES_SHOWN)
+    return sinks.render_unparsed(sink, raw_text)
+
+
+# Slack Block Kit limits that bound a digest message
+MAX_BLOCKS_PER_MESSAGE = 50
+MAX_SECTION_TEXT = 3000
+MAX_FIELD_TEXT = 2000
+MAX_HEADER_TEXT = 150
+
+
+def _truncate(text: str, limit: int) -> str:
+    return text if len(text) <= limit else text[: limit - 1] + "…"
+
+
+def _digest_text(anomaly: Anomaly) -> str:
+    """Compact multi-line mrkdwn summary of one anomaly for a digest section."""
+    sev = _get_severity_details(anomaly)
+    impact = f"${anomaly.total_impact:,.2f}" if anomaly.total_impact is not None else "n/a"
+    pct = f" ({anomaly.total_impact_pct:,.2f}%)" if anomaly.total_impact_pct is not None else ""
+    lines = [f"{sev.emoji} *{sev.label}* · *{impact} USD*{pct}"]
+
+    details = []
+    rc = anomaly.top_root_cause
+    if rc is not None:
+        details.extend(v for v in (rc.service, rc.region, rc.usage_type) if v)
+    acct_id, acct_name = _get_account_info(anomaly)
+    if acct_id:
+        details.append(f"{acct_name} ({acct_id})" if acct_name else f"Account: {acct_id}")
+    if len(anomaly.root_causes) > 1:
+        details.append(f"+{len(anomaly.root_causes) - 1} more root causes")
+    if details:
+        lines.append(" | ".join(details))
+
+    window = ""
+    if anomaly.start_date or anomaly.end_date:
+        window = f"{_format_date(anomaly.start_date) or '-'} → {_format_date(anomaly.end_date) or '-'} · "
+    lines.append(f"{window}<{anomaly.details_link or CONSOLE_ANOMALIES_URL}|{anomaly.anomaly_id}>")
+    return _truncate("\n".join(lines), MAX_SECTION_TEXT)
+
+
+def _build_digest_payloads(anomalies: List[Anomaly]) -> List[Tuple[List[int], Dict[str, Any]]]:
+    """Pack anomalies into as few Slack messages as Block Kit allows, largest impact first.
+
+    Each anomaly becomes one section block; a message holds a header, up to
+    MAX_BLOCKS_PER_MESSAGE - 2 anomalies and a footer. Returns, per message,
+    the positions in `anomalies` it covers and the payload.
+    """
+    order = sorted(
+        range(len(anomalies)),
+        key=lambda i: anomalies[i].total_impact if anomalies[i].total_impact is not None else float("-inf"),
+        reverse=True,
+    )
+    per_message = MAX_BLOCKS_PER_MESSAGE - 2
+    chunks = [order[i:i + per_message] for i in range(0, len(order), per_message)]
+
+    out = []
+    for n, chunk in enumerate(chunks, 1):
+        total = sum(anomalies[i].total_impact or 0 for i in chunk)
+        title = f":rotating_light: {len(chunk)} AWS Cost Anomalies · ${total:,.2f} USD"
+        if len(chunks) > 1:
+            title += f" ({n}/{len(chunks)})"
+        blocks: List[Dict[str, Any]] = [
+            {"type": "header", "text": {"type": "plain_text", "text": _truncate(title, MAX_HEADER_TEXT), "emoji": True}},
+        ]
+        blocks.extend(
+            {"type": "section", "text": {"type": "mrkdwn", "text": _digest_text(anomalies[i])}}
+            for i in chunk
+        )
+        blocks.append({
+            "type": "context",
+            "elements": [
+                {"type": "mrkdwn", "text": "Sent by Cost Anomaly Detection → SNS → Lambda → Slack"}
+            ],
+        })
+        # Color bar follows the largest anomaly, which is listed first
+        color = _get_severity_details(anomalies[chunk[0]]).color
+        out.append((chunk, {"attachments": [{"color": color, "blocks": blocks}]}))
+    return out
+
+
+def _severity_rank(tier: severity.Tier) -> int:
+    return SEVERITY.tiers.index(tier) if tier in SEVERITY.tiers else -1
+
+
+def _build_storm_payload(anomalies: List[Anomaly], group: correlate.Group) -> Dict[str, Any]:
+    """One message for a correlated group: shared dimensions, combined impact, top members."""
+    ranked = sorted(anomalies, key=lambda a: a.total_impact if a.total_impact is not None else float("-inf"), reverse=True)
+    total = sum(a.total_impact or 0 for a in anomalies)
+    where = " · ".join(v for v in group.key if v) or "shared root cause"
+    noun = "AWS Cost Anomaly" if len(anomalies) == 1 else "AWS Cost Anomalies"
+    status = "continues" if group.earlier else "detected"
+    title = f":rotating_light: Alert storm {status}: {len(anomalies)} {noun} · {where}"
+
+    summary = [f"*${total:,.2f} USD* combined · {group.start or '-'} → {group.end or 'ongoing'}"]
+    if group.earlier:
+        minutes = round(STORM_WINDOW_SECONDS / 60)
+        summary.append(f"{len(group.earlier)} overlapping anomalies with the same root cause were already posted in the last {minutes} min")
+
+    lines = []
+    for a in ranked[:STORM_LIST_LIMIT]:
+        sev = _get_severity_details(a)
+        impact = f"${a.total_impact:,.2f}" if a.total_impact is not None else "n/a"
+        acct_id, acct_name = _get_account_info(a)
+        account = f" · {acct_name or acct_id}" if acct_id else ""
+        lines.append(f"{sev.emoji} {impact}{account} · <{a.details_link or CONSOLE_ANOMALIES_URL}|{a.anomaly_id}>")
+    if len(ranked) > STORM_LIST_LIMIT:
+        lines.append(f"+{len(ranked) - STORM_LIST_LIMIT} more")
+
+    top = max((_get_severity_details(a) for a in anomalies), key=_severity_rank)
+    blocks: List[Dict[str, Any]] = [
+        {"type": "header", "text": {"type": "plain_text", "text": _truncate(title, MAX_HEADER_TEXT), "emoji": True}},
+        {"type": "section", "text": {"type": "mrkdwn", "text": _truncate("\n".join(summary), MAX_SECTION_TEXT)}},
+        {"type": "section", "text": {"type": "mrkdwn", "text": _truncate("\n".join(lines), MAX_SECTION_TEXT)}},
+        {
+            "type": "context",
+            "elements": [
+                {"type": "mrkdwn", "text": "Sent by Cost Anomaly Detection → SNS → Lambda → Slack"}
+            ],
+        },
+    ]
+    return {"attachments": [{"color": top.color, "blocks": blocks}]}
+
+
+def _parse_message(msg_str: str) -> Optional[Dict[str, Any]]:
+    """Extract the CAD anomaly dict from an SNS message body, or None when it isn't one."""
+    try:
+        parsed = codec.loads(msg_str)
+        # If AWS wraps the anomaly in another object, try to extract
+        if isinstance(parsed, dict) and (
+            parsed.get("AnomalyId") or parsed.get("anomalyId")
+        ):
+            return parsed
+        elif isinstance(parsed, dict):
+            detail = parsed.get("detail", {}) if isinstance(parsed.get("detail"), dict) else {}
+            if detail.get("AnomalyId") or detail.get("anomalyId"):
+                return detail
+    except Exception:
+        pass
+    return None
+
+
+# Sustained sends per second and burst size per webhook; 0 disables limiting
+SLACK_RATE_PER_SECOND = log.env_float("SLACK_RATE_PER_SECOND", 1.0)
+SLACK_BURST = log.env_float("SLACK_BURST", 4.0, minimum=1.0)
+# Retries after the first attempt for 429, 5xx and transport errors
+SLACK_MAX_RETRIES = log.env_int("SLACK_MAX_RETRIES", 3, minimum=0)
+# Stop starting work this long before Lambda would time out, leaving time to
+# record results and answer with the records that still need delivering
+DEADLINE_MARGIN_SECONDS = log.env_float("DEADLINE_MARGIN_SECONDS", 1.0)
+# Per-request timeout, shortened to whatever remains of the invocation
+HTTP_TIMEOUT_SECONDS = log.env_float("HTTP_TIMEOUT_SECONDS", 10.0, minimum=0.5)
+# Sends are not started with less time than this left before the deadline
+MIN_REQUEST_SECONDS = 0.5
+
+# Worker threads used to post records concurrently. 1 keeps delivery serial.
+DELIVERY_WORKERS = log.env_int("DELIVERY_WORKERS", 4)
+_executor: Any = None
+
+# Keep one idle connection per worker so concurrent posts don't churn TLS sessions
+http_pool.POOL.max_idle_per_host = max(http_pool.POOL.max_idle_per_host, DELIVERY_WORKERS)
+
+
+def _get_executor() -> Any:
+    # Created once per container and reused across warm invocations. Imported
+    # lazily: single-record SNS invocations never need it.
+    global _executor
+    if _executor is None:
+        from concurrent.futures import ThreadPoolExecutor
+
+        _executor = ThreadPoolExecutor(max_workers=DELIVERY_WORKERS, thread_name_prefix="slack")
+    return _executor
+
+
+# Root causes listed per anomaly, largest contribution first; the rest become "+K more"
+ROOT_CAUSES_SHOWN = log.env_int("ROOT_CAUSES_SHOWN", 3)
+
+# Consecutive failed attempts that open a webhook's circuit (0 disables the
+# breaker) and seconds before a probe is let through again
+BREAKER_FAILURE_THRESHOLD = log.env_int("BREAKER_FAILURE_THRESHOLD", 5, minimum=0)
+BREAKER_RESET_SECONDS = log.env_float("BREAKER_RESET_SECONDS", 30.0)
+
+# Where undeliverable payloads go for later replay (None unless SPILL_QUEUE_URL or SPILL_DIR)
+SPILL = spill.from_env()
+# Spilled payloads are replayed only from this queue (the spill queue's ARN)
+SPILL_QUEUE_ARN = os.environ.get("SPILL_QUEUE_ARN", "").strip()
+
+# Pack all anomalies of one invocation into as few Slack messages as possible
+DIGEST_MODE = os.environ.get("DIGEST_MODE", "false").strip().lower() in ("1", "true", "yes", "on")
+
+# Collapse correlated anomalies into one "alert storm" message once a group
+# reaches this many anomalies, counting ones delivered in the last
+# STORM_WINDOW_SECONDS; 0 disables correlation
+STORM_MIN_ANOMALIES = log.env_int("STORM_MIN_ANOMALIES", 0, minimum=0)
+STORM_WINDOW_SECONDS = log.env_float("STORM_WINDOW_SECONDS", 3600.0)
+STORM_LIST_LIMIT = log.env_int("STORM_LIST_LIMIT", 10)
+try:
+    STORM_CORRELATE_BY = correlate.parse_dimensions(os.environ.get("STORM_CORRELATE_BY", "service,region"))
+except ValueError as e:
+    log.error("Ignoring invalid STORM_CORRELATE_BY", error=str(e))
+    STORM_CORRELATE_BY = ("service", "region")
+
+# Linked-account names from AWS Organizations (None unless ACCOUNT_NAMES=true)
+ACCOUNTS = accounts.from_env()
+
+# One connection to the DEDUPE_BACKEND store, shared by the deduper, the
+# impact-change filter and the Web API message index
+DEDUPE_STORE = dedupe.backend_from_env()
+DEDUPE_LRU_SIZE = log.env_int("DEDUPE_LRU_SIZE", 1024)
+DEDUPE_TTL_SECONDS = log.env_int("DEDUPE_TTL_SECONDS", 14 * 86400)
+
+# Skips anomaly versions that were already posted (None when DEDUPE_BACKEND=none)
+DEDUPER = dedupe.from_env(DEDUPE_STORE, DEDUPE_LRU_SIZE, DEDUPE_TTL_SECONDS)
+
+# Skips new versions whose impact barely moved since the last delivered one
+# (None unless MIN_IMPACT_CHANGE_USD or MIN_IMPACT_CHANGE_PERCENT is set)
+CHANGES = dedupe.change_filter(
+    DEDUPE_STORE,
+    log.env_float("MIN_IMPACT_CHANGE_USD", 0.0),
+    log.env_float("MIN_IMPACT_CHANGE_PERCENT", 0.0),
+    DEDUPE_LRU_SIZE,
+    DEDUPE_TTL_SECONDS,
+)
+
+# Delivered anomalies, for "N this month" counts and reports (None unless HISTORY_BACKEND is set)
+HISTORY = history.from_env()
+
+# Where each anomaly's Web API message is, so re-notifications edit it (None without SLACK_BOT_TOKEN)
+MESSAGES = (
+    messages.MessageIndex(DEDUPE_STORE, DEDUPE_LRU_SIZE, log.env_int("MESSAGE_INDEX_TTL_SECONDS", 30 * 86400))
+    if sinks.SLACK_BOT_TOKEN else None
+)
+SLACK_API_UPDATE_MODE = messages.update_mode()
+
+
+def _record_message(record: Dict[str, Any]) -> str:
+    """CAD message text of a Lambda record, from direct SNS or SQS-buffered delivery.
+
+    SQS bodies are SNS envelopes (Type=Notification) unless the subscription
+    uses raw message delivery, in which case the body is the message itself.
+    """
+    if record.get("eventSource") == "aws:sqs":
+        body = record.get("body") or ""
+        try:
+            envelope = codec.loads(body)
+        except Exception:
+            return body
+        if isinstance(envelope, dict) and envelope.get("Type") == "Notification" and "Message" in envelope:
+            return envelope["Message"] or ""
+        return body
+    sns = record.get("Sns") or {}
+    return sns.get("Message", "")
+
+
+def _record_id(record: Dict[str, Any], index: int) -> str:
+    """Identifier Lambda expects in batchItemFailures (SQS messageId), else the SNS MessageId."""
+    return (
+        record.get("messageId")
+        or (record.get("Sns") or {}).get("MessageId")
+        or str(index)
+    )
+
+
+def _load_router() -> routing.Router:
+    default = [u for u in [os.environ.get("SLACK_WEBHOOK_URL")] if u]
+    try:
+        routes = routing.parse_table(tables.load(os.environ.get("ROUTING_TABLE")), codec.loads)
+    except ValueError as e:
+        # A bad table must not silence alerts; everything goes to the default webhook
+        log.error("Ignoring invalid ROUTING_TABLE", error=str(e))
+        routes = []
+    return routing.Router(routes, default)
+
+
+# Compiled once per container from ROUTING_TABLE (see tables.py); falls back to SLACK_WEBHOOK_URL
+ROUTER = _load_router()
+
+
+def _load_severity() -> severity.Classifier:
+    try:
+        return severity.Classifier(
+            severity.parse_table(tables.load(os.environ.get("SEVERITY_TIERS")), codec.loads)
+        )
+    except (ValueError, TypeError) as e:
+        # Same policy as the routing table: misconfiguration degrades to the defaults
+        log.error("Ignoring invalid SEVERITY_TIERS", error=str(e))
+        return severity.Classifier(severity.DEFAULT_TABLE)
+
+
+# Compiled once per container from SEVERITY_TIERS; defaults to >$100 HIGH, >$50 MEDIUM
+SEVERITY = _load_severity()
+
+
+def _replay_rejection(record: Dict[str, Any], envelope: Dict[str, Any]) -> Optional[str]:
+    """Why a spill envelope must not be replayed, or None when it may be.
+
+    Replays POST the payload as-is to the URL inside the message, so only the
+    spill queue may feed them, and only to destinations this function is
+    configured with (a forged envelope could otherwise send anywhere, with the
+    bot token for slack-api:// URLs).
+    """
+    if not SPILL_QUEUE_ARN or record.get("eventSourceARN") != SPILL_QUEUE_ARN:
+        return "not from the spill queue"
+    known = {sinks.base(d) for d in ROUTER.all_destinations() + SEVERITY.all_destinations()}
+    if sinks.base(str(envelope["webhook_url"])) not in known:
+        return "unknown destination"
+    return None
+
+
+class Item(NamedTuple):
+    """One input record that still needs delivering."""
+    index: int
+    record_id: str
+    dedupe_key: Optional[Tuple[str, str]]
+    # Fields repeated on the per-record log line (AnomalyId, impact, severity)
+    summary: Dict[str, Any]
+    anomaly: Optional[Anomaly] = None
+    # Sent to several destinations: remember each one that succeeded, so a
+    # redelivery after a partial failure only retries the others
+    fan_out: bool = False
+
+
+class Job(NamedTuple):
+    """One encoded message for one destination, and the records it carries."""
+    items: Tuple[Item, ...]
+    data: bytes
+    webhook_url: str
+    # Replayed spills fail back to their queue instead of being spilled again
+    spillable: bool = True
+    # A new Web API message: remember its ts so later notifications edit it
+    record_ts: bool = False
+
+
+def _summary(anomaly: Optional[Anomaly]) -> Dict[str, Any]:
+    if anomaly is None or not anomaly.anomaly_id:
+        return {"anomaly_id": None, "parsed": False}
+    return {
+        "anomaly_id": anomaly.anomaly_id,
+        "impact": anomaly.total_impact,
+        "severity": _get_severity_details(anomaly).label,
+        "parsed": True,
+    }
+
+
+def _destinations(anomaly: Optional[Anomaly]) -> Tuple[str, ...]:
+    if anomaly is None:
+        return ROUTER.default
+    sev = _get_severity_details(anomaly)
+    if len(ROUTER):
+        rc = anomaly.top_root_cause
+        urls = ROUTER.route(
+            rc.linked_account if rc else None,
+            rc.service if rc else None,
+            rc.region if rc else None,
+            rc.usage_type if rc else None,
+            sev.label,
+        )
+    else:
+        urls = ROUTER.default
+    if sev.webhook_urls:
+        urls = tuple(dict.fromkeys(urls + sev.webhook_urls))
+    return urls
+
+
+def _spillable(error: Exception) -> bool:
+    """Failures a later replay can fix: everything except the destination rejecting the payload.
+
+    Running out of invocation time is not a failure; those records go back to
+    their source for the next invocation instead.
+    """
+    if isinstance(error, (sinks.APIError, ratelimit.DeadlineExceeded)):
+        return False
+    if isinstance(error, http_pool.HTTPStatusError):
+        return error.code == 429 or error.code >= 500
+    return True
+
+
+def _index_message(job: Job, reply: Optional[Dict[str, Any]]) -> None:
+    """Remember the message a Web API job posted (reply), or forget the one it targeted (None)."""
+    if MESSAGES is None:
+        return
+    channel = sinks.parse(job.webhook_url).key or ""
+    for item in job.items:
+        if item.anomaly is None or not item.anomaly.anomaly_id:
+            continue
+        if reply is None:
+            MESSAGES.forget(item.anomaly.anomaly_id, channel)
+        elif reply.get("ts"):
+            # chat.update needs the channel ID, which a channel name resolves to here
+            MESSAGES.record(item.anomaly.anomaly_id, channel, reply.get("channel") or channel, reply["ts"])
+
+
+# Worst outcome of a record's messages wins
+_STATUS_RANK = {"delivered": 0, "spilled": 1, "deferred": 2, "failed": 3}
+
+
+def _deliver_all(
+    jobs: List[Job], deadline: Optional[float] = None, inv: Optional[metrics.Invocation] = None
+) -> List[Dict[str, Any]]:
+    """Post every job, concurrently when more than one worker is configured.
+
+    A failing post never aborts the others. Each record gets one result: it is
+    "delivered" only if every message carrying it (one per destination) went
+    out; each destination a fanned-out record did reach is remembered on its
+    own. Payloads that fail while the webhook looks unhealthy are spilled for
+    replay when a spill sink is configured, and such records count as
+    "spilled" rather than failed. Sends that would not fit in the time left
+    before `deadline` are not started; their records are "deferred" and left
+    to their source for redelivery, never spilled. Delivered records with a dedupe key are
+    remembered so redeliveries of the same anomaly version are skipped, and
+    delivered anomalies are appended to the history store when one is
+    configured. Per-message POST latency goes to `inv` when given.
+    """
+    def deliver(job: Job) -> Dict[str, Any]:
+        started = time.perf_counter()
+        try:
+            reply = _post(job.webhook_url, job.data, deadline)
+            outcome: Dict[str, Any] = {"status": "delivered"}
+            if DEDUPER:
+                for item in job.items:
+                    if item.fan_out and item.dedupe_key:
+                        DEDUPER.mark_sent(*item.dedupe_key, sinks.base(job.webhook_url))
+            if job.record_ts and reply:
+                _index_message(job, reply)
+        except Exception as e:
+            deferred = isinstance(e, ratelimit.DeadlineExceeded)
+            outcome = {"status": "deferred" if deferred else "failed", "error": str(e)}
+            if isinstance(e, sinks.APIError) and e.error in sinks.STALE_MESSAGE_ERRORS:
+                # Deleted or no longer editable: the retry of this record posts a new message
+                _index_message(job, None)
+            if inv is not None and isinstance(e, breaker.CircuitOpen):
+                inv.count("CircuitRejected")
+            if SPILL and job.spillable and _spillable(e):
+                if SPILL.spill(job.webhook_url, job.data, [i.record_id for i in job.items], str(e)):
+                    outcome["status"] = "spilled"
+        elapsed = (time.perf_counter() - started) * 1000
+        if inv is not None and outcome["status"] != "deferred":
+            inv.observe("post", elapsed)
+        outcome["latency_ms"] = round(elapsed, 1)
+        return outcome
+
+    if DELIVERY_WORKERS <= 1 or len(jobs) <= 1:
+        outcomes = [deliver(job) for job in jobs]
+    else:
+        outcomes = list(_get_executor().map(deliver, jobs))
+
+    merged: Dict[int, Tuple[Item, Dict[str, Any]]] = {}
+    for job, outcome in zip(jobs, outcomes):
+        for item in job.items:
+            prev = merged.get(item.index)
+            if prev is None:
+                merged[item.index] = (item, dict(outcome, destinations=1))
+                continue
+            result = prev[1]
+            result["destinations"] += 1
+            result["latency_ms"] = max(result["latency_ms"], outcome["latency_ms"])
+            if _STATUS_RANK[outcome["status"]] > _STATUS_RANK[result["status"]]:
+                result.update(status=outcome["status"], error=outcome["error"])
+
+    results = []
+    for item, outcome in merged.values():
+        result = {"index": item.index, "id": item.record_id, **outcome}
+        delivered = outcome["status"] == "delivered"
+        if DEDUPER and item.dedupe_key and delivered:
+            DEDUPER.mark_delivered(*item.dedupe_key)
+        if CHANGES and item.anomaly is not None and item.anomaly.anomaly_id and delivered:
+            a = item.anomaly
+            CHANGES.mark_delivered(a.anomaly_id, a.total_impact, a.total_impact_pct, item.summary.get("severity"))
+        if HISTORY and item.anomaly is not None and delivered:
+            HISTORY.record(item.anomaly, item.summary.get("severity"))
+        level = "INFO" if delivered else "WARNING" if outcome["status"] in ("spilled", "deferred") else "ERROR"
+        log.emit(level, "record", **result, **item.summary)
+        results.append(result)
+    return results
+
+
+def _render(build: Callable[[], Dict[str, Any]], inv: Optional[metrics.Invocation]) -> bytes:
+    """Build and encode one payload inside a "render" span."""
+    if inv is None:
+        return codec.dumps_bytes(build())
+    with inv.span("render"):
+        return codec.dumps_bytes(build())
+
+
+def _split_slack(destinations: Tuple[str, ...]) -> Tuple[Tuple[str, ...], Tuple[str, ...]]:
+    """(Slack webhooks, other sinks): digests and storm summaries are Slack-only."""
+    slack = tuple(d for d in destinations if sinks.parse(d).kind == sinks.SLACK)
+    return slack, tuple(d for d in destinations if d not in slack)
+
+
+def _slack_api_job(
+    item: Item, anomaly: Anomaly, dest: str, sink: sinks.Destination, inv: Optional[metrics.Invocation]
+) -> Job:
+    """Post the anomaly's first message, then edit it (or reply in its thread) on re-notifications."""
+    posted = MESSAGES.get(anomaly.anomaly_id, sink.key or "") if MESSAGES else None
+    if posted is None:
+        return Job((item,), _render(lambda: _build_sink_payload(sink, anomaly, ""), inv), dest, record_ts=True)
+    channel_id, ts = posted
+    if SLACK_API_UPDATE_MODE == messages.THREAD:
+        # A one-section summary, not a full re-render
+        data = _render(lambda: {"channel": channel_id, "thread_ts": ts, "text": _digest_text(anomaly)}, inv)
+        return Job((item,), data, dest)
+    data = _render(lambda: dict(_build_sink_payload(sink, anomaly, ""), channel=channel_id, ts=ts), inv)
+    return Job((item,), data, f"{dest}#chat.update")
+
+
+def _jobs_for(
+    item: Item,
+    anomaly: Optional[Anomaly],
+    raw_text: str,
+    destinations: Tuple[str, ...],
+    inv: Optional[metrics.Invocation],
+    rendered: Optional[Dict[Tuple[int, str, Optional[str]], bytes]] = None,
+) -> List[Job]:
+    """One job per destination; each sink type's payload is rendered once per record.
+
+    Pass the same `rendered` dict to reuse payloads across calls for a record.
+    """
+    rendered = {} if rendered is None else rendered
+    jobs = []
+    for dest in destinations:
+        sink = sinks.parse(dest)
+        if sink.kind == sinks.SLACK_API and MESSAGES and anomaly is not None and anomaly.anomaly_id:
+            jobs.append(_slack_api_job(item, anomaly, dest, sink, inv))
+            continue
+        key = (item.index, sink.kind, sink.key)
+        if key not in rendered:
+            rendered[key] = _render(lambda: _build_sink_payload(sink, anomaly, raw_text), inv)
+        jobs.append(Job((item,), rendered[key], dest))
+    return jobs
+
+
+def _storm_jobs(
+    pending: List[Tuple[Item, Anomaly, Tuple[str, ...]]], inv: Optional[metrics.Invocation] = None
+) -> Tuple[List[Job], int]:
+    """Jobs for held-back anomalies: one storm message per correlated group and Slack webhook.
+
+    Groups smaller than STORM_MIN_ANOMALIES (earlier deliveries in the history
+    window included) are posted one message per anomaly as usual, and so are
+    all anomalies at non-Slack destinations. Returns the jobs and the number
+    of storm messages among them.
+    """
+    if not pending:
+        return [], 0
+    jobs: List[Job] = []
+    storms = 0
+    rendered: Dict[Tuple[int, str, Optional[str]], bytes] = {}
+
+    def recent(key: correlate.Key) -> List[history.Interval]:
+        return HISTORY.recent(key, STORM_WINDOW_SECONDS)
+
+    use_history = HISTORY is not None and STORM_WINDOW_SECONDS > 0
+    for group in correlate.correlate(
+        [a for _, a, _ in pending], STORM_CORRELATE_BY, recent if use_history else None
+    ):
+        members = [pending[i] for i in group.members]
+        if len(members) + len(group.earlier) < max(2, STORM_MIN_ANOMALIES):
+            for item, anomaly, urls in members:
+                jobs.extend(_jobs_for(item, anomaly, "", urls, inv, rendered))
+            continue
+        by_url: Dict[str, List[Tuple[Item, Anomaly]]] = {}
+        for item, anomaly, urls in members:
+            slack, others = _split_slack(urls)
+            jobs.extend(_jobs_for(item, anomaly, "", others, inv, rendered))
+            for url in slack:
+                by_url.setdefault(url, []).append((item, anomaly))
+        for url, routed in by_url.items():
+            if len(routed) == 1 and not group.earlier:
+                jobs.extend(_jobs_for(routed[0][0], routed[0][1], "", (url,), inv, rendered))
+                continue
+            data = _render(lambda: _build_storm_payload([a for _, a in routed], group), inv)
+            jobs.append(Job(tuple(i for i, _ in routed), data, url))
+            storms += 1
+    return jobs, storms
+
+
+def _deadline(context: Any) -> Optional[float]:
+    """time.monotonic() value by which delivery must give up, from the Lambda context."""
+    remaining = getattr(context, "get_remaining_time_in_millis", None)
+    if remaining is None:
+        return None
+    return time.monotonic() + remaining() / 1000 - DEADLINE_MARGIN_SECONDS
+
+
 def handler(event, context):
-    print("Event object:", json.dumps(event))
+    if profiling.sampled():
+        result = profiling.run(_handle, event, context)
+        result["profiled"] = True
+        return result
+    return _handle(event, context)
+
 
-    webhook_url = os.environ.get("SLACK_WEBHOOK_URL")
-    if not webhook_url:
-        print("Missing SLACK_WEBHOOK_URL environment variable", file=sys.stderr)
+def _handle(event, context):
+    log.event(event)
+
+    if not ROUTER.default:
+        log.error("Missing SLACK_WEBHOOK_URL environment variable")
         # Fail fast so SNS can retry
         raise RuntimeError("SLACK_WEBHOOK_URL not set")
 
-    # SNS -> Lambda event structure
+    if ACCOUNTS:
+        # At most one ListAccounts call per TTL; lookups below are memory hits
+        ACCOUNTS.ensure_fresh()
+
+    # SNS -> Lambda, or SNS -> SQS -> Lambda in batches. Parse, route and
+    # render everything up front so that only the network round trips remain
+    # for the delivery stage.
     records = event.get("Records") or []
-    for record in records:
-        sns = record.get("Sns") or {}
-        msg_str = sns.get("Message", "")
+    inv = metrics.Invocation()
+    inv.count("RecordsReceived", len(records))
+    jobs: List[Job] = []
+    # Digest mode: anomalies grouped by destination webhook
+    digests: Dict[str, List[Tuple[Item, Anomaly]]] = {}
+    # Alert-storm correlation: anomalies held back until groups are known
+    correlated: List[Tuple[Item, Anomaly, Tuple[str, ...]]] = []
+    skipped: List[Dict[str, Any]] = []
+    batch_keys = set()
+    for index, record in enumerate(records):
+        with inv.span("parse"):
+            msg_str = _record_message(record)
+            replay = spill.parse_envelope(msg_str)
+            raw = _parse_message(msg_str) if replay is None else None
+        record_id = _record_id(record, index)
+        if replay is not None:
+            rejection = _replay_rejection(record, replay)
+            if rejection:
+                skipped.append({"index": index, "id": record_id, "status": "rejected"})
+                log.warning("record", **skipped[-1], error=f"spill envelope {rejection}")
+                continue
+            # A spilled payload fed back for replay: post it exactly as rendered
+            item = Item(index, record_id, None, {"anomaly_id": None, "parsed": False, "replay": True})
+            data = codec.dumps_bytes(replay["payload"])
+            jobs.append(Job((item,), data, replay["webhook_url"], spillable=False))
+            continue
+        with inv.span("normalize"):
+            anomaly = normalize(raw) if raw else None
+        inv.count("RecordsParsed" if anomaly is not None and anomaly.anomaly_id else "RecordsFallback")
+
+        dedupe_key = None
+        if DEDUPER and anomaly:
+            dedupe_key = (anomaly.anomaly_id, dedupe.fingerprint(raw))
+            if dedupe_key in batch_keys or DEDUPER.is_duplicate(*dedupe_key):
+                skipped.append({"index": index, "id": record_id, "status": "duplicate"})
+                log.info("record", **skipped[-1], **_summary(anomaly))
+                continue
+            batch_keys.add(dedupe_key)
+
+        summary = _summary(anomaly)
+        if CHANGES and anomaly is not None and anomaly.anomaly_id and CHANGES.is_minor(
+            anomaly.anomaly_id, anomaly.total_impact, anomaly.total_impact_pct, summary.get("severity")
+        ):
+            skipped.append({"index": index, "id": record_id, "status": "unchanged"})
+            log.info("record", **skipped[-1], **summary)
+            continue
+
+        destinations = _destinations(anomaly)
+        if dedupe_key and len(destinations) > 1:
+            # A redelivery after a partial failure only goes where the record is still missing
+            destinations = tuple(d for d in destinations if not DEDUPER.was_sent(*dedupe_key, sinks.base(d)))
+            if not destinations:
+                DEDUPER.mark_delivered(*dedupe_key)
+                skipped.append({"index": index, "id": record_id, "status": "duplicate"})
+                log.info("record", **skipped[-1], **summary)
+                continue
+        item = Item(index, record_id, dedupe_key, summary, anomaly, fan_out=len(destinations) > 1)
+        if DIGEST_MODE and anomaly is not None and anomaly.anomaly_id:
+            slack, others = _split_slack(destinations)
+            for url in slack:
+                digests.setdefault(url, []).append((item, anomaly))
+            jobs.extend(_jobs_for(item, anomaly, msg_str, others, inv))
+        elif STORM_MIN_ANOMALIES and anomaly is not None and anomaly.anomaly_id:
+            # Rendered once the whole batch is known, see _storm_jobs
+            correlated.append((item, anomaly, destinations))
+        else:
+            # Encode once per sink type, fan the same bytes out to its destinations
+            jobs.extend(_jobs_for(item, anomaly, msg_str, destinations, inv))
+
+    for url, digest in digests.items():
+        if len(digest) == 1:
+            item, anomaly = digest[0]
+            jobs.append(Job((item,), _render(lambda: _build_payload(anomaly, ""), inv), url))
+            continue
+        started = time.perf_counter()
+        packed = _build_digest_payloads([a for _, a in digest])
+        for positions, payload in packed:
+            jobs.append(Job(tuple(digest[i][0] for i in positions), codec.dumps_bytes(payload), url))
+        # One sample per message, sharing the batch's build time
+        per_message = (time.perf_counter() - started) * 1000 / len(packed)
+        for _ in packed:
+            inv.observe("render", per_message)
+
+    storm_jobs, storms = _storm_jobs(correlated, inv)
+    jobs.extend(storm_jobs)
+
+    delivered = _deliver_all(jobs, _deadline(context), inv)
+    messages = len(jobs)
+    results = sorted(delivered + skipped, key=lambda r: r["index"])
+    failed = [r for r in results if r["status"] == "failed"]
+    deferred = [r for r in results if r["status"] == "deferred"]
+    spilled = sum(1 for r in delivered if r["status"] == "spilled")
+    unchanged = sum(1 for r in skipped if r["status"] == "unchanged")
+    rejected = sum(1 for r in skipped if r["status"] == "rejected")
+    duplicates = len(skipped) - unchanged - rejected
+    inv.finish()
+    timings = inv.timings()
 
-        # Try to parse the message payload as JSON from AWS CAD
-        anomaly_payload: Optional[Dict[str, Any]] = None
+    log.info(
+        "invocation",
+        records=len(records),
+        delivered=len(delivered) - len(failed) - len(deferred) - spilled,
+        failed=len(failed),
+        deferred=len(deferred),
+        spilled=spilled,
+        duplicates=duplicates,
+        unchanged=unchanged,
+        rejected=rejected,
+        messages=messages,
+        storms=storms,
+        timings=timings,
+    )
+    inv.count("Delivered", len(delivered) - len(failed) - len(deferred) - spilled)
+    inv.count("Failed", len(failed))
+    inv.count("Deferred", len(deferred))
+    inv.count("Spilled", spilled)
+    inv.count("Duplicates", duplicates)
+    inv.count("Unchanged", unchanged)
+    inv.count("Messages", messages)
+    inv.count("Storms", storms)
+    inv.emit()
+
+    if deferred:
+        log.warning("Invocation deadline reached; records left for redelivery", deferred=len(deferred))
+
+    from_sqs = any(r.get("eventSource") == "aws:sqs" for r in records)
+    if (failed or deferred) and not from_sqs:
+        # SNS invokes asynchronously with a single record and has no partial
+        # batch response, so the only way to get a redelivery is to fail.
+        raise RuntimeError(f"{len(failed) + len(deferred)} of {len(results)} record(s) were not delivered")
+
+    return {
+        "status": "partial" if failed or deferred else "ok",
+        "delivered": len(delivered) - len(failed) - len(deferred) - spilled,
+        "failed": len(failed),
+        "deferred": len(deferred),
+        "spilled": spilled,
+        "duplicates": duplicates,
+        "unchanged": unchanged,
+        "rejected": rejected,
+        "messages": messages,
+        "storms": storms,
+        "timings": timings,
+        "results": results,
+        # SQS partial batch response: only these messages are redelivered
+        "batchItemFailures": [{"itemIdentifier": r["id"]} for r in failed + deferred],
+        "connections": http_pool.stats(),
+        "dedupe": DEDUPER.stats() if DEDUPER else None,
+        "impact_changes": CHANGES.stats() if CHANGES else None,
+        "history": HISTORY.stats() if HISTORY else None,
+        "circuits": breaker.stats(),
+        "spill": SPILL.stats() if SPILL else None,
+        "message_index": MESSAGES.stats() if MESSAGES else None,
+    }
+
+
+def _warm_up() -> None:
+    """Init-phase work, so the first invocation doesn't pay for it.
+
+    Opens one TLS connection per destination host into the pool and loads the
+    account directory. Failures are logged and left for the handler to retry.
+    """
+    hosts = {}
+    for dest in ROUTER.all_destinations() + SEVERITY.all_destinations():
+        url = sinks.parse(dest).url
+        hosts.setdefault(url.split("/", 3)[2] if "://" in url else url, url)
+    for url in hosts.values():
         try:
-            parsed = json.loads(msg_str)
-            # If AWS wraps the anomaly in another object, try to extract
-            if isinstance(parsed, dict) and (
-                parsed.get("AnomalyId") or parsed.get("anomalyId")
-            ):
-                anomaly_payload = parsed
-            elif isinstance(parsed, dict):
-                detail = parsed.get("detail", {}) if isinstance(parsed.get("detail"), dict) else {}
-                if detail.get("AnomalyId") or detail.get("anomalyId"):
-                    anomaly_payload = detail
-        except Exception:
-            anomaly_payload = None
+            http_pool.POOL.warm(url)
+        except Exception as e:
+            log.warning("Connection warm-up failed", error=repr(e))
+    if ACCOUNTS:
+        ACCOUNTS.ensure_fresh()
 
-        payload = _build_payload(anomaly_payload, msg_str)
-        _post_to_slack(webhook_url, payload)
 
-    return {"status": "ok", "delivered": len(records)}
+if os.environ.get("WARMUP_ON_INIT", "true").strip().lower() in ("1", "true", "yes", "on"):
+    _warm_up()
@@ -0,0 +1,98 @@
+"""Where each anomaly's Slack message lives, for the Web API destinations.
+
+With a bot token (slack-api:// destinations) the first notification of an
+anomaly is posted with chat.postMessage and the message's (channel ID, ts) is
+remembered under (AnomalyId, configured channel). Later notifications of the
+same anomaly edit that message with chat.update, or reply in its thread
+(SLACK_API_UPDATE_MODE=thread), instead of posting a new one.
+
+The index shares the dedupe store: the warm-container LRU in front of the
+DEDUPE_BACKEND table (DynamoDB or SQLite), under "slack-ts#" keys, so it
+survives cold starts whenever dedupe does and needs no table of its own.
+"""
+import os
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+import log
+from dedupe import LRUCache
+
+KEY_PREFIX = "slack-ts#"
+
+UPDATE = "update"
+THREAD = "thread"
+
+
+class MessageIndex:
+    """AnomalyId and channel -> (channel ID, ts) of the message the anomaly was posted as."""
+
+    def __init__(self, backend: Any, lru_size: int = 1024, ttl: int = 30 * 86400) -> None:
+        self.backend = backend
+        self.ttl = ttl
+        self._lru = LRUCache(lru_size)
+        self._lock = threading.Lock()
+        self._stats = {"lru_hits": 0, "store_hits": 0, "misses": 0, "recorded": 0, "forgotten": 0,
+                       "store_errors": 0}
+
+    def _bump(self, name: str) -> None:
+        with self._lock:
+            self._stats[name] += 1
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._stats, lru_size=len(self._lru))
+
+    @staticmethod
+    def _key(anomaly_id: str, channel: str) -> str:
+        return f"{KEY_PREFIX}{channel}#{anomaly_id}"
+
+    @staticmethod
+    def _decode(value: str) -> Optional[Tuple[str, str]]:
+        channel_id, _, ts = value.partition(" ")
+        return (channel_id, ts) if ts else None
+
+    def get(self, anomaly_id: str, channel: str) -> Optional[Tuple[str, str]]:
+        key = self._key(anomaly_id, channel)
+        value = self._lru.get(key)
+        if value is not None:
+            self._bump("lru_hits")
+            return self._decode(value)
+        try:
+            value = self.backend.get(key)
+        except Exception as e:
+            # Worst case the anomaly gets a new message instead of an edit
+            log.warning("Message index lookup failed", error=repr(e))
+            self._bump("store_errors")
+            return None
+        if not value or self._decode(value) is None:
+            self._bump("misses")
+            return None
+        self._lru.put(key, value)
+        self._bump("store_hits")
+        return self._decode(value)
+
+    def _put(self, anomaly_id: str, channel: str, value: str) -> None:
+        key = self._key(anomaly_id, channel)
+        self._lru.put(key, value)
+        try:
+            self.backend.put(key, value, self.ttl)
+        except Exception as e:
+            log.warning("Message index write failed", error=repr(e))
+            self._bump("store_errors")
+
+    def record(self, anomaly_id: str, channel: str, channel_id: str, ts: str) -> None:
+        self._put(anomaly_id, channel, f"{channel_id} {ts}")
+        self._bump("recorded")
+
+    def forget(self, anomaly_id: str, channel: str) -> None:
+        """Drop a message that can no longer be edited; an empty value reads as missing."""
+        self._put(anomaly_id, channel, "")
+        self._bump("forgotten")
+
+
+def update_mode() -> str:
+    mode = os.environ.get("SLACK_API_UPDATE_MODE", UPDATE).strip().lower()
+    if mode not in (UPDATE, THREAD):
+        log.warning("Unknown SLACK_API_UPDATE_MODE; editing messages in place", mode=mode)
+        return UPDATE
+    return mode
@@ -0,0 +1,121 @@
+"""Per-invocation timing spans and CloudWatch Embedded Metric Format output.
+
+Counters and stage timings (spans around parse, normalize, render and post)
+are accumulated in an `Invocation` while the handler runs. `timings()`
+summarizes the spans for the handler's return value and log line, and `emit`
+writes everything as a single EMF JSON line at the end, so metric
+volume (and log ingestion) does not grow with the batch size. Latencies are
+sent as value arrays, which CloudWatch turns into percentile statistics;
+beyond EMF's 100 values per metric they are reduced to 100 evenly spaced
+quantiles of the observed distribution.
+"""
+import os
+import sys
+import threading
+import time
+from typing import Dict, List
+
+import codec
+
+NAMESPACE = os.environ.get("METRICS_NAMESPACE", "CostAnomalySlackNotifier")
+ENABLED = os.environ.get("METRICS_ENABLED", "true").strip().lower() in ("1", "true", "yes", "on")
+
+# Emitted every invocation, zero included, so alarms and dashboards see gaps as 0
+COUNTERS = (
+    "RecordsReceived", "RecordsParsed", "RecordsFallback", "Delivered", "Failed",
+    "Deferred", "Spilled", "Duplicates", "Unchanged", "Messages", "Storms", "CircuitRejected",
+)
+# Span name -> EMF latency metric
+STAGES = {
+    "parse": "ParseLatency",
+    "normalize": "NormalizeLatency",
+    "render": "RenderLatency",
+    "post": "PostLatency",
+    "invocation": "InvocationLatency",
+}
+
+MAX_VALUES = 100
+
+
+def _reduce(values: List[float]) -> List[float]:
+    if len(values) <= MAX_VALUES:
+        return values
+    ordered = sorted(values)
+    last = len(ordered) - 1
+    return [ordered[round(i * last / (MAX_VALUES - 1))] for i in range(MAX_VALUES)]
+
+
+class _Span:
+    __slots__ = ("_inv", "_stage", "_started")
+
+    def __init__(self, inv: "Invocation", stage: str) -> None:
+        self._inv = inv
+        self._stage = stage
+
+    def __enter__(self) -> None:
+        self._started = time.perf_counter()
+
+    def __exit__(self, *exc: object) -> None:
+        self._inv.observe(self._stage, (time.perf_counter() - self._started) * 1000)
+
+
+class Invocation:
+    """Metrics of one handler invocation; safe to update from worker threads."""
+
+    def __init__(self) -> None:
+        self.counts: Dict[str, float] = dict.fromkeys(COUNTERS, 0)
+        self.latencies: Dict[str, List[float]] = {stage: [] for stage in STAGES}
+        self._lock = threading.Lock()
+        self._started = time.perf_counter()
+
+    def count(self, name: str, n: float = 1) -> None:
+        with self._lock:
+            self.counts[name] = self.counts.get(name, 0) + n
+
+    def observe(self, stage: str, ms: float) -> None:
+        with self._lock:
+            self.latencies[stage].append(round(ms, 3))
+
+    def span(self, stage: str) -> "_Span":
+        """`with inv.span("render"): ...` records the block's duration under `stage`."""
+        return _Span(self, stage)
+
+    def finish(self) -> None:
+        """Close the invocation span; call once, before `timings` and `emit`."""
+        self.observe("invocation", (time.perf_counter() - self._started) * 1000)
+
+    def timings(self) -> Dict[str, Dict[str, float]]:
+        """Per stage: span count, total and max milliseconds."""
+        with self._lock:
+            return {
+                stage: {"count": len(v), "total_ms": round(sum(v), 3), "max_ms": max(v)}
+                for stage, v in self.latencies.items() if v
+            }
+
+    def document(self, dimensions: Dict[str, str]) -> Dict[str, object]:
+        doc: Dict[str, object] = dict(dimensions)
+        definitions = []
+        for name, value in self.counts.items():
+            doc[name] = value
+            definitions.append({"Name": name, "Unit": "Count"})
+        for stage, values in self.latencies.items():
+            if values:
+                doc[STAGES[stage]] = _reduce(values)
+                definitions.append({"Name": STAGES[stage], "Unit": "Milliseconds"})
+        doc["_aws"] = {
+            "Timestamp": int(time.time() * 1000),
+            "CloudWatchMetrics": [{
+                "Namespace": NAMESPACE,
+                "Dimensions": [sorted(dimensions)],
+                "Metrics": definitions,
+            }],
+        }
+        return doc
+
+    def emit(self) -> None:
+        """Write the EMF line to stdout (CloudWatch Logs extracts the metrics)."""
+        if not ENABLED:
+            return
+        function = os.environ.get("AWS_LAMBDA_FUNCTION_NAME", "local")
+        # Not routed through log: metrics must not depend on LOG_LEVEL
+        print(codec.dumps(self.document({"FunctionName": function})), file=sys.stdout)
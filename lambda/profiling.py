@@ -0,0 +1,80 @@
+"""Sampled cProfile runs of whole invocations, for finding hot functions in production.
+
+PROFILE_SAMPLE_RATE (0 to 1, default 0 = off) is the fraction of invocations
+run under cProfile. The PROFILE_TOP_N functions with the highest cumulative
+time are logged as one "profile" line; when PROFILE_OUTPUT names a directory
+(e.g. /tmp) the raw pstats dump is also written there for `python -m pstats`
+or snakeviz. cProfile only sees the invoking thread: with DELIVERY_WORKERS > 1
+the POSTs run on worker threads and show up as time spent waiting on them.
+"""
+import os
+import random
+import time
+from typing import Any, Callable, Dict, List, Tuple
+
+import log
+
+
+SAMPLE_RATE = min(1.0, log.env_float("PROFILE_SAMPLE_RATE", 0.0))
+TOP_N = log.env_int("PROFILE_TOP_N", 25)
+# "log" (default) or a directory that receives one .prof file per profiled invocation
+OUTPUT = os.environ.get("PROFILE_OUTPUT", "log").strip() or "log"
+
+
+def sampled() -> bool:
+    return SAMPLE_RATE > 0 and random.random() < SAMPLE_RATE
+
+
+def _function_name(func: Tuple[str, int, str]) -> str:
+    filename, line, name = func
+    if filename == "~":
+        return name  # built-in
+    return f"{os.path.basename(filename)}:{line}({name})"
+
+
+def top_functions(stats: Any, n: int) -> List[Dict[str, Any]]:
+    """The `n` entries of a pstats.Stats with the highest cumulative time."""
+    rows = sorted(stats.stats.items(), key=lambda kv: kv[1][3], reverse=True)[:n]
+    return [
+        {
+            "function": _function_name(func),
+            "calls": nc,
+            "tottime_ms": round(tt * 1000, 3),
+            "cumtime_ms": round(ct * 1000, 3),
+        }
+        for func, (cc, nc, tt, ct, callers) in rows
+    ]
+
+
+def _report(profiler: Any) -> Dict[str, Any]:
+    import pstats
+
+    stats = pstats.Stats(profiler)
+    report: Dict[str, Any] = {
+        "total_ms": round(stats.total_tt * 1000, 3),
+        "calls": stats.total_calls,
+        "top": top_functions(stats, TOP_N),
+    }
+    if OUTPUT != "log":
+        os.makedirs(OUTPUT, exist_ok=True)
+        path = os.path.join(OUTPUT, f"profile-{int(time.time() * 1000)}-{os.getpid()}.prof")
+        stats.dump_stats(path)
+        report["path"] = path
+    return report
+
+
+def run(fn: Callable[..., Any], *args: Any) -> Any:
+    """Call fn(*args) under cProfile and log its hottest functions, also when it raises."""
+    import cProfile  # only loaded by sampled invocations
+
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        return fn(*args)
+    finally:
+        profiler.disable()
+        try:
+            log.info("profile", **_report(profiler))
+        except Exception as e:
+            # A profiling problem must never fail the invocation
+            log.warning("Profile report failed", error=repr(e))
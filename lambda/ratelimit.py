@@ -0,0 +1,86 @@
+"""Per-webhook token-bucket rate limiting and retry backoff.
+
+Slack Incoming Webhooks accept roughly one message per second per channel and
+answer bursts with 429 + Retry-After. Buckets are kept per webhook URL at
+module level, so every worker thread of the warm container shares them.
+"""
+import random
+import threading
+import time
+from typing import Dict, Optional
+
+
+class DeadlineExceeded(Exception):
+    """Not enough of the invocation's time budget is left to start a send."""
+
+
+class RateLimitTimeout(DeadlineExceeded):
+    """A token would not become available before the caller's deadline."""
+
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: float) -> None:
+        self.rate = rate
+        self.burst = max(1.0, burst)
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, deadline: Optional[float] = None) -> float:
+        """Take one token, sleeping until one is available. Returns seconds waited.
+
+        Raises RateLimitTimeout instead of sleeping past `deadline` (time.monotonic()).
+        """
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if now >= self._blocked_until and self._tokens >= 1:
+                    self._tokens -= 1
+                    return waited
+                wait = max(self._blocked_until - now, (1 - self._tokens) / self.rate)
+            if deadline is not None and now + wait > deadline:
+                raise RateLimitTimeout(f"no send slot within the remaining time (needed {wait:.2f}s)")
+            time.sleep(wait)
+            waited += wait
+
+    def block_for(self, seconds: float) -> None:
+        """Stop handing out tokens for `seconds` (server asked us to back off)."""
+        with self._lock:
+            now = time.monotonic()
+            self._blocked_until = max(self._blocked_until, now + seconds)
+            self._tokens = 0.0
+            self._updated = now
+
+
+_buckets: Dict[str, TokenBucket] = {}
+_buckets_lock = threading.Lock()
+
+
+def bucket_for(key: str, rate: float, burst: float) -> TokenBucket:
+    with _buckets_lock:
+        bucket = _buckets.get(key)
+        if bucket is None:
+            bucket = _buckets[key] = TokenBucket(rate, burst)
+        return bucket
+
+
+def backoff_delay(attempt: int, base: float = 0.5, cap: float = 8.0) -> float:
+    """Full-jitter exponential backoff for retry number `attempt` (1-based)."""
+    return random.uniform(0, min(cap, base * (2 ** (attempt - 1))))
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Seconds from a Retry-After header (delta-seconds form only)."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        return None
@@ -0,0 +1,133 @@
+"""Route anomalies to Slack webhooks by account, service, region, usage type and severity.
+
+The routing table is a list of routes; a route matches when every dimension it
+constrains matches (omitted dimensions are wildcards), and an anomaly is sent
+to the union of the destinations of all matching routes, or to the default
+destination when none match:
+
+    [
+      {"accounts": ["111111111111"], "webhook_urls": ["https://hooks.slack.com/..."]},
+      {"services": ["AWS Lambda"], "regions": ["eu-west-1"], "severities": ["HIGH"],
+       "webhook_urls": ["https://hooks.slack.com/..."]},
+      {"usage_type_prefixes": ["DataTransfer"], "webhook_urls": ["https://hooks.slack.com/..."]}
+    ]
+
+The table is compiled once into per-dimension hash indexes of route bitmasks
+(plus a prefix-length index for usage types), so matching an anomaly costs a
+handful of dict lookups and integer ANDs regardless of how many routes exist.
+"""
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Route fields matched by exact value
+_DIMENSIONS = ("accounts", "services", "regions", "severities")
+
+RouteKey = Tuple[Optional[str], Optional[str], Optional[str], Optional[str], Optional[str]]
+
+
+class _Index:
+    """value -> bitmask of routes listing that value, plus routes that don't constrain it."""
+
+    def __init__(self) -> None:
+        self.by_value: Dict[str, int] = {}
+        self.wildcard = 0
+
+    def add(self, bit: int, values: Optional[Iterable[str]]) -> None:
+        if not values:
+            self.wildcard |= bit
+            return
+        for value in values:
+            key = str(value).strip()
+            self.by_value[key] = self.by_value.get(key, 0) | bit
+
+    def match(self, value: Optional[str]) -> int:
+        if value is None:
+            return self.wildcard
+        return self.wildcard | self.by_value.get(value, 0)
+
+
+class _PrefixIndex(_Index):
+    """Like _Index, but values are prefixes; only prefix lengths present are probed."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.lengths: List[int] = []
+
+    def add(self, bit: int, values: Optional[Iterable[str]]) -> None:
+        super().add(bit, values)
+        self.lengths = sorted({len(v) for v in self.by_value})
+
+    def match(self, value: Optional[str]) -> int:
+        mask = self.wildcard
+        if value:
+            for n in self.lengths:
+                if n > len(value):
+                    break
+                mask |= self.by_value.get(value[:n], 0)
+        return mask
+
+
+class Router:
+    def __init__(self, routes: Sequence[Dict[str, Any]], default: Sequence[str]) -> None:
+        self.default: Tuple[str, ...] = tuple(default)
+        self._indexes = {dim: _Index() for dim in _DIMENSIONS}
+        self._usage = _PrefixIndex()
+        self._destinations: List[Tuple[str, ...]] = []
+        self._cache: Dict[RouteKey, Tuple[str, ...]] = {}
+        for n, route in enumerate(routes):
+            bit = 1 << n
+            for dim, index in self._indexes.items():
+                index.add(bit, route.get(dim))
+            self._usage.add(bit, route.get("usage_type_prefixes"))
+            self._destinations.append(tuple(route.get("webhook_urls") or ()))
+
+    def __len__(self) -> int:
+        return len(self._destinations)
+
+    def all_destinations(self) -> Tuple[str, ...]:
+        """Every webhook the router can send to, default included."""
+        seen: Dict[str, None] = dict.fromkeys(self.default)
+        for urls in self._destinations:
+            seen.update(dict.fromkeys(urls))
+        return tuple(seen)
+
+    def route(
+        self,
+        account: Optional[str],
+        service: Optional[str],
+        region: Optional[str],
+        usage_type: Optional[str],
+        severity: Optional[str],
+    ) -> Tuple[str, ...]:
+        """Destinations for an anomaly with these attributes, in table order."""
+        key = (account, service, region, usage_type, severity)
+        cached = self._cache.get(key)
+        if cached is not None:
+            return cached
+
+        idx = self._indexes
+        mask = (
+            idx["accounts"].match(account)
+            & idx["services"].match(service)
+            & idx["regions"].match(region)
+            & idx["severities"].match(severity)
+            & self._usage.match(usage_type)
+        )
+        seen: Dict[str, None] = {}
+        while mask:
+            low = mask & -mask
+            for url in self._destinations[low.bit_length() - 1]:
+                seen.setdefault(url)
+            mask ^= low
+        result = tuple(seen) or self.default
+        if len(self._cache) < 4096:
+            self._cache[key] = result
+        return result
+
+
+def parse_table(text: Optional[str], loads: Any) -> List[Dict[str, Any]]:
+    if not text or not text.strip():
+        return []
+    table = loads(text)
+    if not isinstance(table, list) or not all(isinstance(r, dict) for r in table):
+        raise ValueError("routing table must be a JSON list of route objects")
+    return table
@@ -0,0 +1,170 @@
+"""Severity tiers from absolute (USD) and relative (%) impact, tunable per account/service.
+
+Tiers are listed from least to most severe. A tier is reached when the total
+impact is strictly above its `impact_above` or the impact percentage is
+strictly above its `impact_pct_above`; the most severe tier reached wins and
+the first tier is the floor. An anomaly is UNKNOWN when it has no value the
+tiers set thresholds for (e.g. only a percentage while no tier has an
+`impact_pct_above`). Overrides replace thresholds for anomalies whose
+top root cause matches their accounts and/or services:
+
+    {
+      "tiers": [
+        {"label": "LOW", "color": "#2196F3", "emoji": ":information_source:"},
+        {"label": "MEDIUM", "impact_above": 50, "impact_pct_above": 25},
+        {"label": "HIGH", "impact_above": 100, "impact_pct_above": 100,
+         "webhook_urls": ["https://hooks.slack.com/..."]}
+      ],
+      "overrides": [
+        {"accounts": ["111111111111"], "services": ["Amazon Elastic Compute Cloud - Compute"],
+         "thresholds": {"MEDIUM": {"impact_above": 500}, "HIGH": {"impact_above": 2000}}}
+      ]
+    }
+
+Each threshold set is compiled once into sorted arrays searched with bisect,
+and overrides into a dict keyed by (account, service), so classifying an
+anomaly is a few dict lookups and two binary searches over at most a handful
+of tiers. A tier's `webhook_urls` are added to the anomaly's destinations.
+"""
+from bisect import bisect_left
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+
+class Tier(NamedTuple):
+    label: str
+    color: str
+    emoji: str
+    webhook_urls: Tuple[str, ...] = ()
+
+
+UNKNOWN = Tier("UNKNOWN", "#78909C", ":information_source:")
+
+# The historical fixed tiers: >$100 HIGH, >$50 MEDIUM, else LOW
+DEFAULT_TABLE: Dict[str, Any] = {
+    "tiers": [
+        {"label": "LOW", "color": "#2196F3", "emoji": ":information_source:"},
+        {"label": "MEDIUM", "color": "#FFC107", "emoji": ":warning:", "impact_above": 50},
+        {"label": "HIGH", "color": "#C62828", "emoji": ":rotating_light:", "impact_above": 100},
+    ],
+}
+
+Thresholds = Dict[str, Dict[str, Optional[float]]]
+
+
+class _Ladder:
+    """Sorted thresholds; level(value) is the most severe tier whose threshold value exceeds.
+
+    -1 when there is nothing to grade: no value, or no tier with a threshold for it.
+    """
+
+    def __init__(self, pairs: Sequence[Tuple[float, int]], name: str) -> None:
+        self.thresholds: List[float] = []
+        self.levels: List[int] = []
+        for threshold, level in pairs:
+            if self.thresholds and threshold < self.thresholds[-1]:
+                raise ValueError(f"{name} thresholds must not decrease from one tier to the next")
+            self.thresholds.append(threshold)
+            self.levels.append(level)
+
+    def level(self, value: Optional[float]) -> int:
+        if value is None or not self.thresholds:
+            return -1
+        crossed = bisect_left(self.thresholds, value)
+        return self.levels[crossed - 1] if crossed else 0
+
+
+class _Scheme:
+    def __init__(self, labels: Sequence[str], thresholds: Thresholds) -> None:
+        impact, pct = [], []
+        for level, label in enumerate(labels):
+            t = thresholds.get(label) or {}
+            if level and t.get("impact_above") is not None:
+                impact.append((float(t["impact_above"]), level))  # type: ignore[arg-type]
+            if level and t.get("impact_pct_above") is not None:
+                pct.append((float(t["impact_pct_above"]), level))  # type: ignore[arg-type]
+        self._impact = _Ladder(impact, "impact_above")
+        self._pct = _Ladder(pct, "impact_pct_above")
+
+    def level(self, impact: Optional[float], impact_pct: Optional[float]) -> int:
+        return max(self._impact.level(impact), self._pct.level(impact_pct))
+
+
+def _threshold_fields(d: Dict[str, Any]) -> Dict[str, Optional[float]]:
+    return {k: d.get(k) for k in ("impact_above", "impact_pct_above")}
+
+
+class Classifier:
+    def __init__(self, table: Dict[str, Any]) -> None:
+        tiers = table.get("tiers") or []
+        if not tiers or not all(isinstance(t, dict) and t.get("label") for t in tiers):
+            raise ValueError("severity table needs a non-empty list of tiers with labels")
+        base = DEFAULT_TABLE["tiers"][0]
+        self.tiers: List[Tier] = [
+            Tier(
+                str(t["label"]),
+                t.get("color") or base["color"],
+                t.get("emoji") or base["emoji"],
+                tuple(t.get("webhook_urls") or ()),
+            )
+            for t in tiers
+        ]
+        labels = [t.label for t in self.tiers]
+        defaults: Thresholds = {str(t["label"]): _threshold_fields(t) for t in tiers}
+        self._default = _Scheme(labels, defaults)
+
+        # (account, service) -> scheme, None acting as the wildcard; first match in table order wins
+        self._overrides: Dict[Tuple[Optional[str], Optional[str]], _Scheme] = {}
+        for o in table.get("overrides") or []:
+            if not isinstance(o, dict) or not isinstance(o.get("thresholds"), dict):
+                raise ValueError("severity overrides need a thresholds object")
+            if not o.get("accounts") and not o.get("services"):
+                raise ValueError("severity overrides need accounts or services; edit the tiers instead")
+            unknown = set(o["thresholds"]) - set(labels)
+            if unknown:
+                raise ValueError(f"severity override names unknown tiers: {sorted(unknown)}")
+            merged = {label: dict(defaults[label]) for label in labels}
+            for label, t in o["thresholds"].items():
+                if not isinstance(t, dict):
+                    raise ValueError(f"severity override for {label} must be an object")
+                merged[label].update({k: v for k, v in _threshold_fields(t).items() if v is not None})
+            scheme = _Scheme(labels, merged)
+            for account in o.get("accounts") or [None]:
+                for service in o.get("services") or [None]:
+                    key = (str(account).strip() if account else None, service or None)
+                    self._overrides.setdefault(key, scheme)
+
+    def _scheme(self, account: Optional[str], service: Optional[str]) -> _Scheme:
+        if self._overrides:
+            for key in ((account, service), (account, None), (None, service)):
+                scheme = self._overrides.get(key)
+                if scheme is not None:
+                    return scheme
+        return self._default
+
+    def classify(
+        self,
+        impact: Optional[float],
+        impact_pct: Optional[float],
+        account: Optional[str] = None,
+        service: Optional[str] = None,
+    ) -> Tier:
+        level = self._scheme(account, service).level(impact, impact_pct)
+        return self.tiers[level] if level >= 0 else UNKNOWN
+
+    def all_destinations(self) -> Tuple[str, ...]:
+        """Every webhook any tier adds."""
+        seen: Dict[str, None] = {}
+        for tier in self.tiers:
+            seen.update(dict.fromkeys(tier.webhook_urls))
+        return tuple(seen)
+
+
+def parse_table(text: Optional[str], loads: Any) -> Dict[str, Any]:
+    if not text or not text.strip():
+        return DEFAULT_TABLE
+    table = loads(text)
+    if table is None:
+        return DEFAULT_TABLE
+    if not isinstance(table, dict):
+        raise ValueError("severity table must be a JSON object with a tiers list")
+    return table
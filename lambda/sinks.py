@@ -0,0 +1,272 @@
+"""Destination types beyond Slack webhooks: Slack Web API, Teams, generic JSON webhooks and PagerDuty.
+
+Every destination string (SLACK_WEBHOOK_URL, a route's or a severity tier's
+`webhook_urls`) names its sink by prefix; plain URLs stay Slack webhooks:
+
+    https://hooks.slack.com/services/...          Slack Incoming Webhook
+    slack-api://<channel id>                      Slack Web API with SLACK_BOT_TOKEN (chat.postMessage/update)
+    teams+https://....webhook.office.com/...      Teams Incoming Webhook / Workflows, as an Adaptive Card
+    webhook+https://example.com/cost-anomalies    the normalized anomaly as a JSON document
+    pagerduty://<integration key>                 PagerDuty Events API v2 (PAGERDUTY_EVENTS_URL)
+
+All sinks render from the same normalized `Anomaly` plus the `Facts` main.py
+resolves once per anomaly, and are delivered by the same HTTP engine (pooled
+connections, per-destination rate limiting, retries and circuit breaker).
+Slack's Block Kit rendering, digests and storm summaries live in main.py; the
+other sinks get one message per anomaly.
+
+Web API destinations may carry the method to call after a "#"
+("slack-api://C0123#chat.update"); main.py uses that to edit the message an
+anomaly was first posted as.
+"""
+import os
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+import codec
+from anomaly import Anomaly
+
+SLACK = "slack"
+SLACK_API = "slack_api"
+TEAMS = "teams"
+WEBHOOK = "webhook"
+PAGERDUTY = "pagerduty"
+
+PAGERDUTY_EVENTS_URL = os.environ.get("PAGERDUTY_EVENTS_URL", "https://events.pagerduty.com/v2/enqueue")
+SLACK_API_URL = os.environ.get("SLACK_API_URL", "https://slack.com/api").rstrip("/")
+SLACK_BOT_TOKEN = os.environ.get("SLACK_BOT_TOKEN", "")
+
+# Web API errors meaning the indexed message is gone; the next notification posts a new one
+STALE_MESSAGE_ERRORS = frozenset(
+    ("message_not_found", "cant_update_message", "edit_window_closed", "thread_not_found")
+)
+
+# PagerDuty rejects longer summaries
+MAX_PAGERDUTY_SUMMARY = 1024
+
+SOURCE = "aws-cost-anomaly-detection"
+
+
+class Destination(NamedTuple):
+    kind: str
+    # Endpoint the payload is POSTed to
+    url: str
+    # PagerDuty integration key or Slack channel ID; part of the payload, not the URL
+    key: Optional[str] = None
+
+
+_parsed: Dict[str, Destination] = {}
+
+
+def parse(destination: str) -> Destination:
+    """Sink type and endpoint of a destination string (cached; called per message)."""
+    parsed = _parsed.get(destination)
+    if parsed is not None:
+        return parsed
+    prefix, sep, rest = destination.partition("+")
+    if sep and prefix in (TEAMS, WEBHOOK) and "://" in rest:
+        parsed = Destination(prefix, rest)
+    elif destination.startswith(PAGERDUTY + "://"):
+        parsed = Destination(PAGERDUTY, PAGERDUTY_EVENTS_URL, destination[len(PAGERDUTY) + 3:].strip("/"))
+    elif destination.startswith("slack-api://"):
+        channel, _, method = destination[len("slack-api://"):].partition("#")
+        parsed = Destination(SLACK_API, f"{SLACK_API_URL}/{method or 'chat.postMessage'}", channel.strip("/"))
+    else:
+        parsed = Destination(SLACK, destination)
+    if len(_parsed) < 4096:
+        _parsed[destination] = parsed
+    return parsed
+
+
+def base(destination: str) -> str:
+    """The configured destination without a Web API method, e.g. for per-channel rate limits."""
+    return destination.partition("#")[0] if destination.startswith("slack-api://") else destination
+
+
+def headers(dest: Destination) -> Dict[str, str]:
+    if dest.kind == SLACK_API:
+        return {"Content-Type": "application/json; charset=utf-8", "Authorization": f"Bearer {SLACK_BOT_TOKEN}"}
+    return {"Content-Type": "application/json"}
+
+
+class APIError(Exception):
+    """The Slack Web API answered 200 with ok=false; `error` is Slack's error code."""
+
+    def __init__(self, error: str) -> None:
+        super().__init__(f"Slack API error: {error}")
+        self.error = error
+
+
+def api_reply(body: bytes) -> Dict[str, Any]:
+    """Decoded Web API reply; raises APIError unless ok."""
+    try:
+        reply = codec.loads(body)
+    except Exception:
+        raise APIError("invalid_response") from None
+    if isinstance(reply, dict) and reply.get("ok"):
+        return reply
+    error = reply.get("error") if isinstance(reply, dict) else None
+    raise APIError(str(error or "invalid_response"))
+
+
+class Facts(NamedTuple):
+    """Per-anomaly values every sink shows, resolved once by main.py."""
+    severity: str
+    # Tier position counted from the most severe (0); None for UNKNOWN
+    from_top: Optional[int]
+    account_id: Optional[str]
+    account_name: Optional[str]
+    console_url: str
+    # Other anomalies of the same service and account this month (history store)
+    seen_this_month: Optional[int] = None
+
+
+def _money(value: Optional[float]) -> str:
+    return f"${value:,.2f}" if value is not None else "n/a"
+
+
+def _day(value: Optional[str]) -> Optional[str]:
+    return value.split("T", 1)[0] if isinstance(value, str) else value
+
+
+def _account(facts: Facts) -> Optional[str]:
+    if facts.account_name:
+        return f"{facts.account_name} ({facts.account_id})"
+    return f"Account: {facts.account_id}" if facts.account_id else None
+
+
+def _by_rank(facts: Facts, names: Tuple[str, ...], default: str) -> str:
+    """names[0] for the most severe tier, names[1] for the next, `default` below and for UNKNOWN."""
+    if facts.from_top is None or facts.from_top >= len(names):
+        return default
+    return names[facts.from_top]
+
+
+def document(anomaly: Anomaly, facts: Facts) -> Dict[str, Any]:
+    """Sink-neutral JSON view of an anomaly: the generic webhook body and PagerDuty details."""
+    return {
+        "type": "cost_anomaly",
+        "anomaly_id": anomaly.anomaly_id,
+        "severity": facts.severity,
+        "total_impact": anomaly.total_impact,
+        "total_impact_pct": anomaly.total_impact_pct,
+        "start_date": anomaly.start_date,
+        "end_date": anomaly.end_date,
+        "account_id": facts.account_id,
+        "account_name": facts.account_name,
+        "root_causes": [
+            {
+                "service": rc.service,
+                "region": rc.region,
+                "usage_type": rc.usage_type,
+                "linked_account": rc.linked_account,
+                "linked_account_name": rc.linked_account_name,
+                "contribution": rc.contribution,
+            }
+            for rc in anomaly.top_root_causes(len(anomaly.root_causes))
+        ],
+        "anomalies_this_month": facts.seen_this_month,
+        "console_url": facts.console_url,
+    }
+
+
+def _teams_message(title: str, color: str, body: List[Dict[str, Any]], url: Optional[str]) -> Dict[str, Any]:
+    card: Dict[str, Any] = {
+        "$schema": "http://adaptivecards.io/schemas/adaptive-card.json",
+        "type": "AdaptiveCard",
+        "version": "1.4",
+        "body": [{"type": "TextBlock", "text": title, "size": "Large", "weight": "Bolder",
+                  "color": color, "wrap": True}] + body,
+    }
+    if url:
+        card["actions"] = [{"type": "Action.OpenUrl", "title": "Open in AWS Console", "url": url}]
+    return {
+        "type": "message",
+        "attachments": [{"contentType": "application/vnd.microsoft.card.adaptive", "content": card}],
+    }
+
+
+def _teams(anomaly: Anomaly, facts: Facts, root_causes_shown: int) -> Dict[str, Any]:
+    color = _by_rank(facts, ("Attention", "Warning"), "Default")
+    facts_set = [
+        {"title": "Window", "value": f"{_day(anomaly.start_date) or '-'} → {_day(anomaly.end_date) or '-'}"},
+        {"title": "Estimated impact", "value": f"{_money(anomaly.total_impact)} USD"},
+        {"title": "Impact %", "value": f"{anomaly.total_impact_pct:,.2f}%" if anomaly.total_impact_pct is not None else "n/a"},
+    ]
+    if facts.seen_this_month is not None:
+        facts_set.append({"title": "Same service & account", "value": f"{facts.seen_this_month} other this month"})
+    facts_set.append({"title": "Anomaly ID", "value": anomaly.anomaly_id or "-"})
+    body: List[Dict[str, Any]] = []
+    account = _account(facts)
+    if account:
+        body.append({"type": "TextBlock", "text": account, "isSubtle": True, "wrap": True})
+    body.append({"type": "FactSet", "facts": facts_set})
+    top = anomaly.top_root_causes(root_causes_shown)
+    lines = []
+    for rc in top:
+        line = " | ".join(v for v in (rc.service, rc.region, rc.usage_type) if v)
+        if rc.contribution is not None:
+            line = f"{line} · {_money(rc.contribution)}" if line else _money(rc.contribution)
+        if line:
+            lines.append(f"- {line}")
+    if len(anomaly.root_causes) > len(top):
+        lines.append(f"- +{len(anomaly.root_causes) - len(top)} more")
+    if lines:
+        body.append({"type": "TextBlock", "text": "**Top root causes**\n\n" + "\n".join(lines), "wrap": True})
+    return _teams_message(f"AWS Cost Anomaly Detected: {facts.severity}", color, body, facts.console_url)
+
+
+def _pagerduty(anomaly: Anomaly, facts: Facts, routing_key: str) -> Dict[str, Any]:
+    rc = anomaly.top_root_cause
+    where = ", ".join(v for v in (rc.service if rc else None, facts.account_name or facts.account_id) if v)
+    summary = f"AWS cost anomaly {facts.severity}: {_money(anomaly.total_impact)} USD" + (f" ({where})" if where else "")
+    payload: Dict[str, Any] = {
+        "summary": summary[:MAX_PAGERDUTY_SUMMARY],
+        "source": SOURCE,
+        "severity": _by_rank(facts, ("error", "warning"), "info"),
+        "class": "cost_anomaly",
+        "custom_details": document(anomaly, facts),
+    }
+    if rc is not None and rc.service:
+        payload["component"] = rc.service
+    if facts.account_id:
+        payload["group"] = facts.account_id
+    return {
+        "routing_key": routing_key,
+        "event_action": "trigger",
+        # Re-notifications of a growing anomaly update the same PagerDuty alert
+        "dedup_key": f"cost-anomaly-{anomaly.anomaly_id}",
+        "payload": payload,
+        "links": [{"href": facts.console_url, "text": "Open in AWS Console"}],
+        "client": "AWS Cost Anomaly Detection",
+    }
+
+
+def render(dest: Destination, anomaly: Anomaly, facts: Facts, root_causes_shown: int = 3) -> Dict[str, Any]:
+    """Payload for a parsed anomaly at a non-Slack destination."""
+    if dest.kind == TEAMS:
+        return _teams(anomaly, facts, root_causes_shown)
+    if dest.kind == PAGERDUTY:
+        return _pagerduty(anomaly, facts, dest.key or "")
+    return document(anomaly, facts)
+
+
+def render_unparsed(dest: Destination, text: str, limit: int = 3000) -> Dict[str, Any]:
+    """Payload for a message that isn't a recognizable anomaly, passed on as text."""
+    text = text if len(text) <= limit else text[: limit - 1] + "…"
+    if dest.kind == TEAMS:
+        return _teams_message("AWS Cost Anomaly Notification", "Default",
+                              [{"type": "TextBlock", "text": text, "fontType": "Monospace", "wrap": True}], None)
+    if dest.kind == PAGERDUTY:
+        return {
+            "routing_key": dest.key or "",
+            "event_action": "trigger",
+            "payload": {
+                "summary": "AWS Cost Anomaly Notification (unrecognized message)",
+                "source": SOURCE,
+                "severity": "info",
+                "class": "cost_anomaly",
+                "custom_details": {"message": text},
+            },
+            "client": "AWS Cost Anomaly Detection",
+        }
+    return {"type": "cost_anomaly_unparsed", "message": text}
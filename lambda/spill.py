@@ -0,0 +1,106 @@
+"""Dead-letter sink for Slack payloads that could not be delivered.
+
+When a destination's circuit is open (or delivery fails for good) the
+rendered payload is spilled instead of failing the invocation, so SNS doesn't
+keep retrying into an outage. Each spilled message is an envelope carrying the
+webhook URL and the exact payload; fed back to the Lambda as an SQS record it
+is posted as-is (see `parse_envelope`), which is how spills are replayed.
+main.py replays envelopes only from SPILL_QUEUE_ARN and to configured
+destinations.
+"""
+import os
+import threading
+import time
+from typing import Any, Dict, Optional, Sequence
+
+import codec
+import log
+
+ENVELOPE_VERSION = 1
+
+
+def envelope(webhook_url: str, data: bytes, record_ids: Sequence[str], error: str) -> bytes:
+    return codec.dumps_bytes({
+        "spill_version": ENVELOPE_VERSION,
+        "webhook_url": webhook_url,
+        "payload": codec.loads(data),
+        "records": list(record_ids),
+        "error": error,
+        "spilled_at": int(time.time()),
+    })
+
+
+def parse_envelope(message: str) -> Optional[Dict[str, Any]]:
+    """The envelope if `message` is a spilled payload, else None (cheap for normal messages)."""
+    if '"spill_version"' not in message:
+        return None
+    try:
+        env = codec.loads(message)
+    except Exception:
+        return None
+    if not isinstance(env, dict) or not env.get("webhook_url") or "payload" not in env:
+        return None
+    return env
+
+
+class SQSSpill:
+    """Spill to an SQS queue (production)."""
+
+    def __init__(self, queue_url: str) -> None:
+        import boto3  # provided by the Lambda runtime; only needed for this sink
+
+        self._client = boto3.client("sqs")
+        self.queue_url = queue_url
+
+    def put(self, body: bytes) -> None:
+        self._client.send_message(QueueUrl=self.queue_url, MessageBody=body.decode("utf-8"))
+
+
+class DirectorySpill:
+    """One JSON file per spilled payload (local runs)."""
+
+    def __init__(self, directory: str) -> None:
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+
+    def put(self, body: bytes) -> None:
+        path = os.path.join(self.directory, f"{int(time.time() * 1000)}-{os.urandom(8).hex()}.json")
+        with open(path, "wb") as f:
+            f.write(body)
+
+
+class Spiller:
+    def __init__(self, sink: Any) -> None:
+        self.sink = sink
+        self._lock = threading.Lock()
+        self._stats = {"spilled": 0, "errors": 0}
+
+    def _bump(self, name: str) -> None:
+        with self._lock:
+            self._stats[name] += 1
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._stats)
+
+    def spill(self, webhook_url: str, data: bytes, record_ids: Sequence[str], error: str) -> bool:
+        """True when the payload is safely stored for replay."""
+        try:
+            self.sink.put(envelope(webhook_url, data, record_ids, error))
+        except Exception as e:
+            log.error("Spilling undelivered payload failed", error=repr(e))
+            self._bump("errors")
+            return False
+        self._bump("spilled")
+        return True
+
+
+def from_env() -> Optional[Spiller]:
+    """Spiller configured by SPILL_QUEUE_URL or SPILL_DIR; None when neither is set."""
+    queue_url = os.environ.get("SPILL_QUEUE_URL", "").strip()
+    if queue_url:
+        return Spiller(SQSSpill(queue_url))
+    directory = os.environ.get("SPILL_DIR", "").strip()
+    if directory:
+        return Spiller(DirectorySpill(directory))
+    return None
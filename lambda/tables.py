@@ -0,0 +1,64 @@
+"""Where the routing and severity tables are read from.
+
+ROUTING_TABLE and SEVERITY_TIERS hold the JSON table itself, which is fine
+for small setups. Lambda caps all environment variables together at 4 KB, so
+larger tables (hundreds of accounts, per-team channels) are kept elsewhere
+and the variable names the source instead:
+
+    ssm:/cad/routing-table             SSM Parameter Store (SecureString decrypted)
+    s3://bucket/path/routing.json      an S3 object
+    file:routing.json                  a file bundled next to main.py (or an absolute path)
+
+Tables are read once per container, at import.
+"""
+import os
+from typing import Optional
+
+SSM = "ssm:"
+S3 = "s3://"
+FILE = "file:"
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def _ssm(name: str) -> str:
+    import boto3  # provided by the Lambda runtime; only needed for this source
+
+    client = boto3.client("ssm", endpoint_url=os.environ.get("SSM_ENDPOINT_URL") or None)
+    return client.get_parameter(Name=name, WithDecryption=True)["Parameter"]["Value"]
+
+
+def _s3(uri: str) -> str:
+    import boto3  # provided by the Lambda runtime; only needed for this source
+
+    bucket, _, key = uri[len(S3):].partition("/")
+    if not bucket or not key:
+        raise ValueError(f"expected s3://bucket/key, got {uri!r}")
+    client = boto3.client("s3", endpoint_url=os.environ.get("S3_ENDPOINT_URL") or None)
+    return client.get_object(Bucket=bucket, Key=key)["Body"].read().decode("utf-8")
+
+
+def _file(path: str) -> str:
+    with open(os.path.join(_HERE, path), encoding="utf-8") as f:
+        return f.read()
+
+
+def load(value: Optional[str]) -> Optional[str]:
+    """The table text `value` names, or `value` itself when it is inline JSON.
+
+    Raises ValueError when the source can't be read; callers treat that like an
+    invalid table.
+    """
+    if not value:
+        return value
+    text = value.strip()
+    try:
+        if text.startswith(SSM):
+            return _ssm(text[len(SSM):])
+        if text.startswith(S3):
+            return _s3(text)
+        if text.startswith(FILE):
+            return _file(text[len(FILE):])
+    except Exception as e:
+        raise ValueError(f"could not read {text}: {e}") from None
+    return value
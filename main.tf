@@ -2,6 +2,24 @@ locals {
   monitor_name      = coalesce(var.monitor_name, "${var.name_prefix}-cad-monitor")
   subscription_name = coalesce(var.subscription_name, "${var.name_prefix}-cad-subscription")
 
+  create_dedupe_table  = var.enable_slack && var.enable_dedupe_table
+  create_history_table = var.enable_slack && var.enable_history_table
+  create_sqs_buffer    = var.enable_slack && var.enable_sqs_buffer
+  create_spill_queue   = var.enable_slack && var.enable_spill_queue
+  create_monitoring    = var.enable_slack && var.enable_monitoring
+  lookup_account_name  = var.enable_slack && var.enable_account_names
+  direct_sns_to_slack  = var.enable_slack && !var.enable_sqs_buffer
+  tables_in_ssm        = var.enable_slack && var.table_store == "ssm"
+  tables_in_s3         = var.enable_slack && var.table_store == "s3"
+
+  routing_table_json  = jsonencode(var.slack_routes)
+  severity_tiers_json = var.severity_tiers == null ? "" : jsonencode(var.severity_tiers)
+
+  # CloudWatch namespace of the Lambda's embedded metrics (dimension: FunctionName)
+  metrics_namespace      = "CostAnomalySlackNotifier"
+  notifier_function_name = "${var.name_prefix}-cad-slack-notifier"
+  notifier_metric        = { FunctionName = local.notifier_function_name }
+
   monitor_dimension     = var.monitor_type == "DIMENSIONAL" ? var.monitor_dimension : null
   monitor_specification = (var.monitor_type == "CUSTOM" || var.monitor_type == "COST_CATEGORY") ? var.monitor_specification : null
 
@@ -95,18 +113,209 @@ resource "aws_iam_role_policy_attachment" "lambda_basic" {
   policy_arn = "arn:aws:iam::aws:policy/service-role/AWSLambdaBasicExecutionRole"
 }
 
+resource "aws_dynamodb_table" "dedupe" {
+  count        = local.create_dedupe_table ? 1 : 0
+  name         = "${var.name_prefix}-cad-slack-dedupe"
+  billing_mode = "PAY_PER_REQUEST"
+  hash_key     = "pk"
+
+  attribute {
+    name = "pk"
+    type = "S"
+  }
+
+  ttl {
+    attribute_name = "expires_at"
+    enabled        = true
+  }
+
+  tags = var.tags
+}
+
+data "aws_iam_policy_document" "lambda_dedupe" {
+  count = local.create_dedupe_table ? 1 : 0
+  statement {
+    effect    = "Allow"
+    actions   = ["dynamodb:GetItem", "dynamodb:PutItem"]
+    resources = [aws_dynamodb_table.dedupe[0].arn]
+  }
+}
+
+resource "aws_iam_role_policy" "lambda_dedupe" {
+  count  = local.create_dedupe_table ? 1 : 0
+  name   = "dedupe-table"
+  role   = aws_iam_role.lambda[0].id
+  policy = data.aws_iam_policy_document.lambda_dedupe[0].json
+}
+
+resource "aws_dynamodb_table" "history" {
+  count        = local.create_history_table ? 1 : 0
+  name         = "${var.name_prefix}-cad-slack-history"
+  billing_mode = "PAY_PER_REQUEST"
+  hash_key     = "pk"
+  range_key    = "sk"
+
+  attribute {
+    name = "pk"
+    type = "S"
+  }
+
+  attribute {
+    name = "sk"
+    type = "S"
+  }
+
+  ttl {
+    attribute_name = "expires_at"
+    enabled        = true
+  }
+
+  tags = var.tags
+}
+
+data "aws_iam_policy_document" "lambda_history" {
+  count = local.create_history_table ? 1 : 0
+  statement {
+    effect    = "Allow"
+    actions   = ["dynamodb:PutItem", "dynamodb:BatchWriteItem", "dynamodb:Query"]
+    resources = [aws_dynamodb_table.history[0].arn]
+  }
+}
+
+resource "aws_iam_role_policy" "lambda_history" {
+  count  = local.create_history_table ? 1 : 0
+  name   = "history-table"
+  role   = aws_iam_role.lambda[0].id
+  policy = data.aws_iam_policy_document.lambda_history[0].json
+}
+
+data "aws_iam_policy_document" "lambda_organizations" {
+  count = local.lookup_account_name ? 1 : 0
+  statement {
+    effect    = "Allow"
+    actions   = ["organizations:ListAccounts", "organizations:DescribeAccount"]
+    resources = ["*"]
+  }
+}
+
+resource "aws_iam_role_policy" "lambda_organizations" {
+  count  = local.lookup_account_name ? 1 : 0
+  name   = "organizations-list-accounts"
+  role   = aws_iam_role.lambda[0].id
+  policy = data.aws_iam_policy_document.lambda_organizations[0].json
+}
+
+# Routing and severity tables too large for Lambda's 4 KB of environment variables
+resource "aws_ssm_parameter" "routing_table" {
+  count = local.tables_in_ssm ? 1 : 0
+  name  = "/${var.name_prefix}/cad-slack-notifier/routing-table"
+  type  = "SecureString"
+  # Moves to the advanced tier (up to 8 KB) only when the value needs it
+  tier  = "Intelligent-Tiering"
+  value = local.routing_table_json
+  tags  = var.tags
+}
+
+resource "aws_ssm_parameter" "severity_tiers" {
+  count = local.tables_in_ssm ? 1 : 0
+  name  = "/${var.name_prefix}/cad-slack-notifier/severity-tiers"
+  type  = "SecureString"
+  tier  = "Intelligent-Tiering"
+  # "null" keeps the default tiers
+  value = jsonencode(var.severity_tiers)
+  tags  = var.tags
+}
+
+resource "aws_s3_object" "routing_table" {
+  count                  = local.tables_in_s3 ? 1 : 0
+  bucket                 = var.table_s3_bucket
+  key                    = "${var.name_prefix}/cad-slack-notifier/routing-table.json"
+  content                = local.routing_table_json
+  content_type           = "application/json"
+  server_side_encryption = "AES256"
+  tags                   = var.tags
+}
+
+resource "aws_s3_object" "severity_tiers" {
+  count                  = local.tables_in_s3 ? 1 : 0
+  bucket                 = var.table_s3_bucket
+  key                    = "${var.name_prefix}/cad-slack-notifier/severity-tiers.json"
+  content                = jsonencode(var.severity_tiers)
+  content_type           = "application/json"
+  server_side_encryption = "AES256"
+  tags                   = var.tags
+}
+
+data "aws_iam_policy_document" "lambda_tables" {
+  count = local.tables_in_ssm || local.tables_in_s3 ? 1 : 0
+  statement {
+    effect    = "Allow"
+    actions   = local.tables_in_ssm ? ["ssm:GetParameter"] : ["s3:GetObject"]
+    resources = local.tables_in_ssm ? [aws_ssm_parameter.routing_table[0].arn, aws_ssm_parameter.severity_tiers[0].arn] : ["arn:aws:s3:::${var.table_s3_bucket}/${var.name_prefix}/cad-slack-notifier/*"]
+  }
+}
+
+# Inline JSON for table_store = "env", else where the Lambda reads the table from (see lambda/tables.py)
+locals {
+  routing_table_env  = local.tables_in_ssm ? "ssm:${try(aws_ssm_parameter.routing_table[0].name, "")}" : local.tables_in_s3 ? "s3://${var.table_s3_bucket}/${try(aws_s3_object.routing_table[0].key, "")}" : local.routing_table_json
+  severity_tiers_env = local.tables_in_ssm ? "ssm:${try(aws_ssm_parameter.severity_tiers[0].name, "")}" : local.tables_in_s3 ? "s3://${var.table_s3_bucket}/${try(aws_s3_object.severity_tiers[0].key, "")}" : local.severity_tiers_json
+  tables_version     = var.table_store == "env" ? "" : substr(sha256("${local.routing_table_json}\n${local.severity_tiers_json}"), 0, 16)
+}
+
+resource "aws_iam_role_policy" "lambda_tables" {
+  count  = local.tables_in_ssm || local.tables_in_s3 ? 1 : 0
+  name   = "routing-tables"
+  role   = aws_iam_role.lambda[0].id
+  policy = data.aws_iam_policy_document.lambda_tables[0].json
+}
+
 resource "aws_lambda_function" "slack_notifier" {
   count            = var.enable_slack ? 1 : 0
-  function_name    = "${var.name_prefix}-cad-slack-notifier"
+  function_name    = local.notifier_function_name
   role             = aws_iam_role.lambda[0].arn
   runtime          = "python3.12"
   handler          = "main.handler"
   filename         = "${path.module}/lambda/cad-slack-notifier.zip"
   source_code_hash = filebase64sha256("${path.module}/lambda/cad-slack-notifier.zip")
+  timeout          = var.lambda_timeout
 
   environment {
     variables = {
-      SLACK_WEBHOOK_URL = var.slack_webhook_url
+      SLACK_WEBHOOK_URL         = var.slack_webhook_url
+      SLACK_BOT_TOKEN           = var.slack_bot_token == null ? "" : var.slack_bot_token
+      SLACK_API_UPDATE_MODE     = var.slack_api_update_mode
+      DELIVERY_WORKERS          = tostring(var.delivery_workers)
+      DEDUPE_BACKEND            = local.create_dedupe_table ? "dynamodb" : "memory"
+      DEDUPE_TABLE              = local.create_dedupe_table ? aws_dynamodb_table.dedupe[0].name : ""
+      DEDUPE_TTL_SECONDS        = tostring(var.dedupe_ttl_seconds)
+      MIN_IMPACT_CHANGE_USD     = tostring(var.min_impact_change_usd)
+      MIN_IMPACT_CHANGE_PERCENT = tostring(var.min_impact_change_percent)
+      HISTORY_BACKEND           = local.create_history_table ? "dynamodb" : "none"
+      HISTORY_TABLE             = local.create_history_table ? aws_dynamodb_table.history[0].name : ""
+      HISTORY_TTL_SECONDS       = tostring(var.history_ttl_seconds)
+      LOG_LEVEL                 = var.log_level
+      LOG_EVENT_SAMPLE_RATE     = tostring(var.log_event_sample_rate)
+      PROFILE_SAMPLE_RATE       = tostring(var.profile_sample_rate)
+      DIGEST_MODE               = tostring(var.digest_mode)
+      STORM_MIN_ANOMALIES       = tostring(var.storm_min_anomalies)
+      STORM_CORRELATE_BY        = join(",", var.storm_correlate_by)
+      STORM_WINDOW_SECONDS      = tostring(var.storm_window_seconds)
+      ROOT_CAUSES_SHOWN         = tostring(var.root_causes_shown)
+      SLACK_RATE_PER_SECOND     = tostring(var.slack_rate_limit_per_second)
+      SLACK_BURST               = tostring(var.slack_rate_limit_burst)
+      SLACK_MAX_RETRIES         = tostring(var.slack_max_retries)
+      HTTP_TIMEOUT_SECONDS      = tostring(var.http_timeout_seconds)
+      ROUTING_TABLE             = local.routing_table_env
+      BREAKER_FAILURE_THRESHOLD = tostring(var.circuit_breaker_failure_threshold)
+      BREAKER_RESET_SECONDS     = tostring(var.circuit_breaker_reset_seconds)
+      SPILL_QUEUE_URL           = local.create_spill_queue ? aws_sqs_queue.spill[0].id : ""
+      SPILL_QUEUE_ARN           = local.create_spill_queue ? aws_sqs_queue.spill[0].arn : ""
+      METRICS_NAMESPACE         = local.metrics_namespace
+      SEVERITY_TIERS            = local.severity_tiers_env
+      # Tables are read once per container; a changed table changes this and so starts fresh containers
+      TABLES_VERSION            = local.tables_version
+      ACCOUNT_NAMES             = tostring(var.enable_account_names)
+      ACCOUNT_NAMES_TTL_SECONDS = tostring(var.account_names_ttl_seconds)
     }
   }
 
@@ -121,7 +330,7 @@ resource "aws_lambda_function" "slack_notifier" {
 }
 
 resource "aws_lambda_permission" "allow_sns" {
-  count         = var.enable_slack ? 1 : 0
+  count         = local.direct_sns_to_slack ? 1 : 0
   statement_id  = "AllowExecutionFromSNS"
   action        = "lambda:InvokeFunction"
   function_name = aws_lambda_function.slack_notifier[0].function_name
@@ -130,10 +339,322 @@ resource "aws_lambda_permission" "allow_sns" {
 }
 
 resource "aws_sns_topic_subscription" "lambda" {
-  count     = var.enable_slack ? 1 : 0
+  count     = local.direct_sns_to_slack ? 1 : 0
   topic_arn = aws_sns_topic.anomaly.arn
   protocol  = "lambda"
   endpoint  = aws_lambda_function.slack_notifier[0].arn
 
   depends_on = [aws_lambda_permission.allow_sns]
 }
+
+# Optional SQS buffer: SNS -> SQS -> Lambda, so one invocation handles a
+# batch of anomalies and bursts are smoothed by the queue.
+resource "aws_sqs_queue" "buffer_dlq" {
+  count                     = local.create_sqs_buffer ? 1 : 0
+  name                      = "${var.name_prefix}-cad-slack-dlq"
+  message_retention_seconds = 1209600
+  sqs_managed_sse_enabled   = true
+  tags                      = var.tags
+}
+
+resource "aws_sqs_queue" "buffer" {
+  count = local.create_sqs_buffer ? 1 : 0
+  name  = "${var.name_prefix}-cad-slack-buffer"
+
+  # AWS recommends at least six times the function timeout for SQS event sources
+  visibility_timeout_seconds = var.lambda_timeout * 6
+  sqs_managed_sse_enabled    = true
+
+  redrive_policy = jsonencode({
+    deadLetterTargetArn = aws_sqs_queue.buffer_dlq[0].arn
+    maxReceiveCount     = var.sqs_max_receive_count
+  })
+
+  tags = var.tags
+}
+
+data "aws_iam_policy_document" "buffer_queue" {
+  count = local.create_sqs_buffer ? 1 : 0
+  statement {
+    sid    = "AllowAnomalyTopicToSend"
+    effect = "Allow"
+    principals {
+      type        = "Service"
+      identifiers = ["sns.amazonaws.com"]
+    }
+    actions   = ["sqs:SendMessage"]
+    resources = [aws_sqs_queue.buffer[0].arn]
+    condition {
+      test     = "ArnEquals"
+      variable = "aws:SourceArn"
+      values   = [aws_sns_topic.anomaly.arn]
+    }
+  }
+}
+
+resource "aws_sqs_queue_policy" "buffer" {
+  count     = local.create_sqs_buffer ? 1 : 0
+  queue_url = aws_sqs_queue.buffer[0].id
+  policy    = data.aws_iam_policy_document.buffer_queue[0].json
+}
+
+resource "aws_sns_topic_subscription" "buffer" {
+  count     = local.create_sqs_buffer ? 1 : 0
+  topic_arn = aws_sns_topic.anomaly.arn
+  protocol  = "sqs"
+  endpoint  = aws_sqs_queue.buffer[0].arn
+
+  depends_on = [aws_sqs_queue_policy.buffer]
+}
+
+data "aws_iam_policy_document" "lambda_sqs" {
+  count = local.create_sqs_buffer ? 1 : 0
+  statement {
+    effect    = "Allow"
+    actions   = ["sqs:ReceiveMessage", "sqs:DeleteMessage", "sqs:GetQueueAttributes"]
+    resources = [aws_sqs_queue.buffer[0].arn]
+  }
+}
+
+resource "aws_iam_role_policy" "lambda_sqs" {
+  count  = local.create_sqs_buffer ? 1 : 0
+  name   = "sqs-buffer"
+  role   = aws_iam_role.lambda[0].id
+  policy = data.aws_iam_policy_document.lambda_sqs[0].json
+}
+
+resource "aws_lambda_event_source_mapping" "buffer" {
+  count                              = local.create_sqs_buffer ? 1 : 0
+  event_source_arn                   = aws_sqs_queue.buffer[0].arn
+  function_name                      = aws_lambda_function.slack_notifier[0].arn
+  batch_size                         = var.sqs_batch_size
+  maximum_batching_window_in_seconds = var.sqs_maximum_batching_window_seconds
+
+  # The handler returns batchItemFailures so only failed records are retried
+  function_response_types = ["ReportBatchItemFailures"]
+
+  depends_on = [aws_iam_role_policy.lambda_sqs]
+}
+
+resource "aws_sqs_queue" "spill_dlq" {
+  count                     = local.create_spill_queue ? 1 : 0
+  name                      = "${var.name_prefix}-cad-slack-spill-dlq"
+  message_retention_seconds = 1209600
+  sqs_managed_sse_enabled   = true
+  tags                      = var.tags
+}
+
+resource "aws_sqs_queue" "spill" {
+  count = local.create_spill_queue ? 1 : 0
+  name  = "${var.name_prefix}-cad-slack-spill"
+
+  visibility_timeout_seconds = var.lambda_timeout * 6
+  message_retention_seconds  = 1209600
+  sqs_managed_sse_enabled    = true
+
+  # Replays that keep failing (e.g. a permanent 4xx) stop cycling after this many attempts
+  redrive_policy = jsonencode({
+    deadLetterTargetArn = aws_sqs_queue.spill_dlq[0].arn
+    maxReceiveCount     = var.sqs_max_receive_count
+  })
+
+  tags = var.tags
+}
+
+data "aws_iam_policy_document" "lambda_spill" {
+  count = local.create_spill_queue ? 1 : 0
+  statement {
+    effect    = "Allow"
+    actions   = ["sqs:SendMessage", "sqs:ReceiveMessage", "sqs:DeleteMessage", "sqs:GetQueueAttributes"]
+    resources = [aws_sqs_queue.spill[0].arn]
+  }
+}
+
+resource "aws_iam_role_policy" "lambda_spill" {
+  count  = local.create_spill_queue ? 1 : 0
+  name   = "spill-queue"
+  role   = aws_iam_role.lambda[0].id
+  policy = data.aws_iam_policy_document.lambda_spill[0].json
+}
+
+# Replays spilled payloads; switch on with spill_replay_enabled once Slack has recovered
+resource "aws_lambda_event_source_mapping" "spill_replay" {
+  count            = local.create_spill_queue ? 1 : 0
+  event_source_arn = aws_sqs_queue.spill[0].arn
+  function_name    = aws_lambda_function.slack_notifier[0].arn
+  enabled          = var.spill_replay_enabled
+  batch_size       = 10
+
+  # Replays that fail again stay on the queue instead of being spilled twice
+  function_response_types = ["ReportBatchItemFailures"]
+
+  depends_on = [aws_iam_role_policy.lambda_spill]
+}
+
+data "aws_region" "current" {}
+
+resource "aws_cloudwatch_dashboard" "notifier" {
+  count          = local.create_monitoring ? 1 : 0
+  dashboard_name = "${var.name_prefix}-cad-slack-notifier"
+
+  dashboard_body = jsonencode({
+    widgets = [
+      {
+        type   = "metric"
+        x      = 0
+        y      = 0
+        width  = 12
+        height = 6
+        properties = {
+          title  = "Records"
+          region = data.aws_region.current.name
+          stat   = "Sum"
+          period = 300
+          metrics = [
+            for name in ["RecordsReceived", "RecordsParsed", "RecordsFallback", "Duplicates", "Unchanged"] :
+            [local.metrics_namespace, name, "FunctionName", local.notifier_function_name]
+          ]
+        }
+      },
+      {
+        type   = "metric"
+        x      = 12
+        y      = 0
+        width  = 12
+        height = 6
+        properties = {
+          title  = "Delivery"
+          region = data.aws_region.current.name
+          stat   = "Sum"
+          period = 300
+          metrics = [
+            for name in ["Messages", "Delivered", "Failed", "Deferred", "Spilled", "Storms", "CircuitRejected"] :
+            [local.metrics_namespace, name, "FunctionName", local.notifier_function_name]
+          ]
+        }
+      },
+      {
+        type   = "metric"
+        x      = 0
+        y      = 6
+        width  = 12
+        height = 6
+        properties = {
+          title  = "Slack POST latency (ms)"
+          region = data.aws_region.current.name
+          period = 300
+          metrics = [
+            for stat in ["p50", "p95", "p99"] :
+            [local.metrics_namespace, "PostLatency", "FunctionName", local.notifier_function_name, { stat = stat, label = "POST ${stat}" }]
+          ]
+        }
+      },
+      {
+        type   = "metric"
+        x      = 12
+        y      = 6
+        width  = 12
+        height = 6
+        properties = {
+          title  = "Stage latency p99 (ms)"
+          region = data.aws_region.current.name
+          stat   = "p99"
+          period = 300
+          metrics = [
+            for name in ["ParseLatency", "NormalizeLatency", "RenderLatency", "InvocationLatency"] :
+            [local.metrics_namespace, name, "FunctionName", local.notifier_function_name]
+          ]
+        }
+      },
+      {
+        type   = "metric"
+        x      = 0
+        y      = 12
+        width  = 24
+        height = 6
+        properties = {
+          title  = "Lambda"
+          region = data.aws_region.current.name
+          stat   = "Sum"
+          period = 300
+          metrics = [
+            for name in ["Invocations", "Errors", "Throttles"] :
+            ["AWS/Lambda", name, "FunctionName", local.notifier_function_name]
+          ]
+        }
+      },
+    ]
+  })
+}
+
+resource "aws_cloudwatch_metric_alarm" "delivery_failed" {
+  count               = local.create_monitoring ? 1 : 0
+  alarm_name          = "${var.name_prefix}-cad-slack-delivery-failed"
+  alarm_description   = "Anomaly notifications failed Slack delivery (and were not spilled)."
+  namespace           = local.metrics_namespace
+  metric_name         = "Failed"
+  dimensions          = local.notifier_metric
+  statistic           = "Sum"
+  period              = 300
+  evaluation_periods  = 1
+  threshold           = 0
+  comparison_operator = "GreaterThanThreshold"
+  treat_missing_data  = "notBreaching"
+  alarm_actions       = var.alarm_actions
+  ok_actions          = var.alarm_actions
+  tags                = var.tags
+}
+
+resource "aws_cloudwatch_metric_alarm" "circuit_open" {
+  count               = local.create_monitoring ? 1 : 0
+  alarm_name          = "${var.name_prefix}-cad-slack-circuit-open"
+  alarm_description   = "Sends to a Slack webhook are being rejected by an open circuit breaker."
+  namespace           = local.metrics_namespace
+  metric_name         = "CircuitRejected"
+  dimensions          = local.notifier_metric
+  statistic           = "Sum"
+  period              = 300
+  evaluation_periods  = 1
+  threshold           = 0
+  comparison_operator = "GreaterThanThreshold"
+  treat_missing_data  = "notBreaching"
+  alarm_actions       = var.alarm_actions
+  ok_actions          = var.alarm_actions
+  tags                = var.tags
+}
+
+resource "aws_cloudwatch_metric_alarm" "post_latency" {
+  count               = local.create_monitoring ? 1 : 0
+  alarm_name          = "${var.name_prefix}-cad-slack-post-latency"
+  alarm_description   = "p99 Slack POST latency is above ${var.alarm_post_latency_p99_ms} ms."
+  namespace           = local.metrics_namespace
+  metric_name         = "PostLatency"
+  dimensions          = local.notifier_metric
+  extended_statistic  = "p99"
+  period              = 300
+  evaluation_periods  = 3
+  threshold           = var.alarm_post_latency_p99_ms
+  comparison_operator = "GreaterThanThreshold"
+  treat_missing_data  = "notBreaching"
+  alarm_actions       = var.alarm_actions
+  ok_actions          = var.alarm_actions
+  tags                = var.tags
+}
+
+resource "aws_cloudwatch_metric_alarm" "lambda_errors" {
+  count               = local.create_monitoring ? 1 : 0
+  alarm_name          = "${var.name_prefix}-cad-slack-lambda-errors"
+  alarm_description   = "The Slack notifier Lambda is failing invocations."
+  namespace           = "AWS/Lambda"
+  metric_name         = "Errors"
+  dimensions          = local.notifier_metric
+  statistic           = "Sum"
+  period              = 300
+  evaluation_periods  = 1
+  threshold           = 0
+  comparison_operator = "GreaterThanThreshold"
+  treat_missing_data  = "notBreaching"
+  alarm_actions       = var.alarm_actions
+  ok_actions          = var.alarm_actions
+  tags                = var.tags
+}
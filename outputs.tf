@@ -17,3 +17,38 @@ output "slack_lambda_function_arn" {
   description = "ARN of the Lambda that posts to the Slack webhook (if enabled)."
   value       = try(aws_lambda_function.slack_notifier[0].arn, null)
 }
+
+output "dedupe_table_name" {
+  description = "Name of the DynamoDB table used to deduplicate Slack notifications (if enabled)."
+  value       = try(aws_dynamodb_table.dedupe[0].name, null)
+}
+
+output "history_table_name" {
+  description = "Name of the DynamoDB anomaly history table (if enabled)."
+  value       = try(aws_dynamodb_table.history[0].name, null)
+}
+
+output "sqs_buffer_queue_arn" {
+  description = "ARN of the SQS queue buffering anomalies for the Slack Lambda (if enabled)."
+  value       = try(aws_sqs_queue.buffer[0].arn, null)
+}
+
+output "sqs_buffer_dlq_arn" {
+  description = "ARN of the dead-letter queue for anomalies the Slack Lambda could not deliver (if enabled)."
+  value       = try(aws_sqs_queue.buffer_dlq[0].arn, null)
+}
+
+output "spill_queue_arn" {
+  description = "ARN of the queue holding Slack payloads that could not be delivered (if enabled)."
+  value       = try(aws_sqs_queue.spill[0].arn, null)
+}
+
+output "spill_dlq_arn" {
+  description = "ARN of the dead-letter queue for spilled payloads whose replay kept failing (if enabled)."
+  value       = try(aws_sqs_queue.spill_dlq[0].arn, null)
+}
+
+output "dashboard_name" {
+  description = "Name of the CloudWatch dashboard for the Slack notifier (if enabled)."
+  value       = try(aws_cloudwatch_dashboard.notifier[0].dashboard_name, null)
+}
@@ -68,12 +68,324 @@ variable "enable_slack" {
 }
 
 variable "slack_webhook_url" {
-  description = "Slack Incoming Webhook URL to post anomaly notifications."
+  description = "Slack Incoming Webhook URL to post anomaly notifications (or any other destination, e.g. slack-api://<channel id> with slack_bot_token)."
   type        = string
   default     = null
   sensitive   = true
 }
 
+variable "slack_bot_token" {
+  description = "Slack bot token (xoxb-..., chat:write scope) for slack-api://<channel id> destinations, which post one message per anomaly and edit it on re-notifications."
+  type        = string
+  default     = null
+  sensitive   = true
+}
+
+variable "slack_api_update_mode" {
+  description = "How slack-api destinations handle re-notifications of an anomaly: update (edit the original message) or thread (reply in its thread with a short summary)."
+  type        = string
+  default     = "update"
+  validation {
+    condition     = contains(["update", "thread"], var.slack_api_update_mode)
+    error_message = "slack_api_update_mode must be update or thread."
+  }
+}
+
+variable "delivery_workers" {
+  description = "Number of worker threads the Lambda uses to post records of one invocation to Slack concurrently. 1 delivers serially."
+  type        = number
+  default     = 4
+  validation {
+    condition     = var.delivery_workers >= 1
+    error_message = "delivery_workers must be at least 1."
+  }
+}
+
+variable "enable_dedupe_table" {
+  description = "Create a DynamoDB table the Lambda uses to skip anomaly notifications it has already delivered. When false, deduplication only uses the warm Lambda container's in-memory cache."
+  type        = bool
+  default     = false
+}
+
+variable "dedupe_ttl_seconds" {
+  description = "How long a delivered anomaly version is remembered for deduplication."
+  type        = number
+  default     = 1209600
+}
+
+variable "min_impact_change_usd" {
+  description = "Skip a re-notification of an anomaly when its total impact moved by less than this many USD since the last delivered notification (0 disables). A change of severity tier is always delivered."
+  type        = number
+  default     = 0
+  validation {
+    condition     = var.min_impact_change_usd >= 0
+    error_message = "min_impact_change_usd must not be negative."
+  }
+}
+
+variable "min_impact_change_percent" {
+  description = "Skip a re-notification of an anomaly when its total impact moved by less than this percentage of the last delivered impact (0 disables)."
+  type        = number
+  default     = 0
+  validation {
+    condition     = var.min_impact_change_percent >= 0
+    error_message = "min_impact_change_percent must not be negative."
+  }
+}
+
+variable "enable_history_table" {
+  description = "Create a DynamoDB table recording every delivered anomaly by account, service and region. Messages then show how many other anomalies the same service had in the same account that month."
+  type        = bool
+  default     = false
+}
+
+variable "history_ttl_seconds" {
+  description = "How long anomaly history is kept."
+  type        = number
+  default     = 34560000
+}
+
+variable "log_level" {
+  description = "Log level of the Slack notifier Lambda: DEBUG, INFO, WARNING or ERROR. DEBUG also dumps every incoming event."
+  type        = string
+  default     = "INFO"
+  validation {
+    condition     = contains(["DEBUG", "INFO", "WARNING", "ERROR"], var.log_level)
+    error_message = "log_level must be one of DEBUG, INFO, WARNING or ERROR."
+  }
+}
+
+variable "log_event_sample_rate" {
+  description = "Fraction (0-1) of invocations whose full, size-capped Lambda event is written to the logs."
+  type        = number
+  default     = 0
+  validation {
+    condition     = var.log_event_sample_rate >= 0 && var.log_event_sample_rate <= 1
+    error_message = "log_event_sample_rate must be between 0 and 1."
+  }
+}
+
+variable "profile_sample_rate" {
+  description = "Fraction (0-1) of invocations run under cProfile; their hottest functions are logged as a \"profile\" line."
+  type        = number
+  default     = 0
+  validation {
+    condition     = var.profile_sample_rate >= 0 && var.profile_sample_rate <= 1
+    error_message = "profile_sample_rate must be between 0 and 1."
+  }
+}
+
+variable "digest_mode" {
+  description = "Pack all anomalies delivered by one Lambda invocation into as few Slack messages as possible (sorted by impact) instead of one message per anomaly."
+  type        = bool
+  default     = false
+}
+
+variable "storm_min_anomalies" {
+  description = "Collapse anomalies that share the storm_correlate_by root-cause dimensions and have overlapping windows into one alert-storm message once a group reaches this many anomalies (counting ones delivered in the last storm_window_seconds when the history table is enabled). 0 disables correlation; ignored when digest_mode is on."
+  type        = number
+  default     = 0
+
+  validation {
+    condition     = var.storm_min_anomalies == 0 || var.storm_min_anomalies >= 2
+    error_message = "storm_min_anomalies must be 0 (disabled) or at least 2."
+  }
+}
+
+variable "storm_correlate_by" {
+  description = "Top root-cause dimensions correlated anomalies must share: any of account, service, region."
+  type        = list(string)
+  default     = ["service", "region"]
+
+  validation {
+    condition     = length(var.storm_correlate_by) > 0 && alltrue([for d in var.storm_correlate_by : contains(["account", "service", "region"], d)])
+    error_message = "storm_correlate_by must list some of account, service, region."
+  }
+}
+
+variable "storm_window_seconds" {
+  description = "How far back already-delivered anomalies count towards an alert storm (requires enable_history_table)."
+  type        = number
+  default     = 3600
+}
+
+variable "root_causes_shown" {
+  description = "Root causes listed per anomaly, ranked by contribution; the remainder is summarized as \"+K more\"."
+  type        = number
+  default     = 3
+
+  validation {
+    condition     = var.root_causes_shown >= 1 && var.root_causes_shown <= 10
+    error_message = "root_causes_shown must be between 1 and 10."
+  }
+}
+
+variable "slack_rate_limit_per_second" {
+  description = "Sustained Slack messages per second per webhook, shared by all delivery threads of a Lambda container. 0 disables rate limiting."
+  type        = number
+  default     = 1
+}
+
+variable "slack_rate_limit_burst" {
+  description = "Number of Slack messages that may be sent back-to-back before slack_rate_limit_per_second applies."
+  type        = number
+  default     = 4
+}
+
+variable "slack_max_retries" {
+  description = "Retries of a Slack post after HTTP 429 (honoring Retry-After), 5xx or network errors, using jittered exponential backoff within the Lambda's remaining time."
+  type        = number
+  default     = 3
+}
+
+variable "http_timeout_seconds" {
+  description = "Timeout of one POST to a destination in seconds. Each attempt is also capped by the time left before the Lambda's timeout."
+  type        = number
+  default     = 10
+}
+
+variable "lambda_timeout" {
+  description = "Timeout of the Slack notifier Lambda in seconds. Delivery, rate limiting and retries stop before it is reached."
+  type        = number
+  default     = 30
+}
+
+variable "enable_sqs_buffer" {
+  description = "Put an SQS queue (with a dead-letter queue) between the SNS topic and the Slack notifier Lambda so one invocation processes a batch of anomalies."
+  type        = bool
+  default     = false
+}
+
+variable "sqs_batch_size" {
+  description = "Maximum number of queued anomalies per Lambda invocation when enable_sqs_buffer is true."
+  type        = number
+  default     = 10
+}
+
+variable "sqs_maximum_batching_window_seconds" {
+  description = "How long the SQS event source waits to fill a batch before invoking the Lambda (0-300)."
+  type        = number
+  default     = 30
+  validation {
+    condition     = var.sqs_maximum_batching_window_seconds >= 0 && var.sqs_maximum_batching_window_seconds <= 300
+    error_message = "sqs_maximum_batching_window_seconds must be between 0 and 300."
+  }
+}
+
+variable "sqs_max_receive_count" {
+  description = "Delivery attempts for a queued anomaly (or a replayed spill) before it is moved to its dead-letter queue."
+  type        = number
+  default     = 5
+}
+
+variable "circuit_breaker_failure_threshold" {
+  description = "Consecutive failed attempts (timeouts, connection errors, 5xx) after which the Lambda stops calling a webhook and fails fast until a probe succeeds. 0 disables the circuit breaker."
+  type        = number
+  default     = 5
+}
+
+variable "circuit_breaker_reset_seconds" {
+  description = "How long an open circuit fails fast before one probe request is let through."
+  type        = number
+  default     = 30
+}
+
+variable "enable_spill_queue" {
+  description = "Create an SQS queue that receives rendered Slack payloads the Lambda could not deliver (open circuit, 5xx, timeouts), so outages do not burn retries; replay them with spill_replay_enabled."
+  type        = bool
+  default     = false
+}
+
+variable "spill_replay_enabled" {
+  description = "Feed the spill queue back into the Lambda, which posts each spilled payload as-is. Turn on after Slack has recovered."
+  type        = bool
+  default     = false
+}
+
+variable "enable_monitoring" {
+  description = "Create a CloudWatch dashboard and alarms over the Lambda's embedded metrics (records, deliveries, failures, spills, circuit rejections, stage latencies)."
+  type        = bool
+  default     = false
+}
+
+variable "alarm_actions" {
+  description = "ARNs (e.g. SNS topics) notified when a monitoring alarm changes state."
+  type        = list(string)
+  default     = []
+}
+
+variable "alarm_post_latency_p99_ms" {
+  description = "Alarm when the p99 Slack POST latency stays above this many milliseconds for 15 minutes."
+  type        = number
+  default     = 5000
+}
+
+variable "slack_routes" {
+  description = "Routing table sending anomalies to additional Slack webhooks. A route matches when every attribute it sets matches the anomaly's top root cause (usage_type_prefixes by prefix, severities by tier label, HIGH/MEDIUM/LOW/UNKNOWN by default); unset attributes match anything. Anomalies go to the webhooks of all matching routes, or to slack_webhook_url when none match. webhook_urls may also name teams+https://..., webhook+https://... and pagerduty://<integration key> destinations."
+  type = list(object({
+    accounts            = optional(list(string))
+    services            = optional(list(string))
+    regions             = optional(list(string))
+    usage_type_prefixes = optional(list(string))
+    severities          = optional(list(string))
+    webhook_urls        = list(string)
+  }))
+  default   = []
+  sensitive = true
+}
+
+variable "severity_tiers" {
+  description = "Severity tiers from least to most severe. A tier is reached when the anomaly's total impact exceeds impact_above (USD) or its impact percentage exceeds impact_pct_above; the most severe tier reached wins. Overrides replace thresholds for anomalies whose top root cause matches their accounts and/or services. A tier's webhook_urls receive its anomalies in addition to the routed destinations. null keeps the defaults (>$100 HIGH, >$50 MEDIUM, else LOW)."
+  type = object({
+    tiers = list(object({
+      label            = string
+      impact_above     = optional(number)
+      impact_pct_above = optional(number)
+      color            = optional(string)
+      emoji            = optional(string)
+      webhook_urls     = optional(list(string))
+    }))
+    overrides = optional(list(object({
+      accounts = optional(list(string))
+      services = optional(list(string))
+      thresholds = map(object({
+        impact_above     = optional(number)
+        impact_pct_above = optional(number)
+      }))
+    })))
+  })
+  default   = null
+  sensitive = true
+}
+
+variable "table_store" {
+  description = "Where slack_routes and severity_tiers are kept for the Lambda: env (inline environment variables, limited to Lambda's 4 KB for all variables together), ssm (SecureString SSM parameters, up to 8 KB each) or s3 (objects in table_s3_bucket, no size limit)."
+  type        = string
+  default     = "env"
+  validation {
+    condition     = contains(["env", "ssm", "s3"], var.table_store)
+    error_message = "table_store must be env, ssm or s3."
+  }
+}
+
+variable "table_s3_bucket" {
+  description = "Existing S3 bucket receiving the routing and severity tables when table_store is s3 (under <name_prefix>/cad-slack-notifier/)."
+  type        = string
+  default     = null
+}
+
+variable "enable_account_names" {
+  description = "Resolve linked-account names with AWS Organizations ListAccounts (cached by the Lambda) when the anomaly payload does not include them. The module must be deployed in the management account or a delegated administrator account."
+  type        = bool
+  default     = false
+}
+
+variable "account_names_ttl_seconds" {
+  description = "How long the Lambda caches the Organizations account list before reloading it."
+  type        = number
+  default     = 86400
+}
+
 // threshold_expression input removed: the module now defines a provider-native
 // threshold_expression block using subscription_threshold. If you need a
 // custom expression later, we can re-introduce this as a structured input.